@@ -1,20 +1,191 @@
+from array import array
 from pathlib import Path
 from urllib.parse import urlparse
+import os
+import sys
+from collections.abc import Callable, Iterable, Iterator, Sequence
 from ._libxiangqi import Board as _Board
+from ._libxiangqi import Book as _Book
+from ._libxiangqi import Game as _Game
+from ._libxiangqi import GameDatabase as _GameDatabase
+from ._libxiangqi import GameReader as _GameReader
 from ._libxiangqi import IllegalMove as IllegalMove
+from ._libxiangqi import MATE_SCORE as MATE_SCORE
+from ._libxiangqi import MctsResult as MctsResult
+from ._libxiangqi import Move as Move
+from ._libxiangqi import NUM_ACTIONS as NUM_ACTIONS
+from ._libxiangqi import OpeningExplorer as _OpeningExplorer
+from ._libxiangqi import SearchResult as SearchResult
+from ._libxiangqi import START_FEN as START_FEN
+from ._libxiangqi import SimulationResult as SimulationResult
+from ._libxiangqi import Square as Square
+from ._libxiangqi import action_to_move as action_to_move
+from ._libxiangqi import build_book as _build_book
+from ._libxiangqi import build_explorer as _build_explorer
+from ._libxiangqi import encode_boards as _encode_boards
+from ._libxiangqi import Tablebase as _Tablebase
+from ._libxiangqi import VecBoard as _VecBoard
+from ._libxiangqi import generate_tablebase as _generate_tablebase
+from ._libxiangqi import legal_move_masks as _legal_move_masks
+from ._libxiangqi import load_fens as _load_fens
+from ._libxiangqi import move_to_action as move_to_action
+from ._libxiangqi import simulate_games as _simulate_games
 
 
 class Board:
-  def __init__(self):
-    self._b = _Board()
+  def __init__(self, backend: str = "mailbox"):
+    self._b = _Board(backend)
+
+  @classmethod
+  def _wrap(cls, b: _Board) -> "Board":
+    board = cls.__new__(cls)
+    board._b = b
+    return board
+
+  @classmethod
+  def from_fen(cls, fen: str, backend: str = "mailbox") -> "Board":
+    return cls._wrap(_Board.from_fen(fen, backend))
+
+  def fen(self) -> str:
+    return self._b.fen()
 
   def make_move(self, *x):
     self._b.make_move(*x)
 
+  def push(self, move: tuple[int, int, int, int]):
+    self._b.push(move)
+
+  def pop(self) -> tuple[int, int, int, int]:
+    return self._b.pop()
+
+  def push_packed(self, move: int):
+    """Play a move packed as from_square | to_square << 7 (see Move), with squares numbered rank * 9 + file."""
+    self._b.push_packed(move)
+
+  def make_moves(self, moves):
+    """Play a whole sequence of moves in one call, the fast way to replay a game.
+
+    moves is an array("H") or numpy uint16 array of packed moves, bytes of little endian packed moves such as
+    SimulationResult.moves, or a sequence of packed ints and Move objects. Raises IllegalMove, playing none of them, if
+    a move is not legal in turn.
+    """
+    self._b.make_moves(moves)
+
+  def perft(self, depth: int, threads: int = 1) -> int:
+    return self._b.perft(depth, threads)
+
+  def perft_divide(self, depth: int, threads: int = 1) -> list[tuple[tuple[int, int, int, int], int]]:
+    return self._b.perft_divide(depth, threads)
+
+  def search(
+    self, depth: int | None = None, movetime_ms: int | None = None, nodes: int | None = None, hash_mb: int = 16, threads: int = 1
+  ) -> SearchResult:
+    """Search for the best move within a depth, time and/or node limit. The GIL is released while searching.
+
+    With threads > 1 (0 for every core) the threads share one transposition table, the node limit is then approximate.
+    """
+    return self._b.search(depth, movetime_ms, nodes, hash_mb, threads)
+
+  def mcts(
+    self, evaluate: Callable[[memoryview], tuple], simulations: int = 800, batch_size: int = 16, threads: int = 1, c_puct: float = 1.5
+  ) -> MctsResult:
+    """Monte Carlo tree search with PUCT, the leaves evaluated in batches by evaluate.
+
+    evaluate gets the float32 feature planes of up to batch_size positions, shape (k, 15, 10, 9) (see Board.planes),
+    and returns (policy, values): a (k, NUM_ACTIONS) policy over actions (see action_to_move) and k values in [-1, 1]
+    for the side to move, as numpy arrays or flat sequences. Only the policy of the legal moves is used, renormalized.
+    threads search threads (0 for every core) select leaves with virtual losses, the GIL released, taking turns to walk
+    the tree.
+    """
+    return self._b.mcts(lambda planes: evaluate(memoryview(planes)), simulations, batch_size, threads, c_puct)
+
+  def evaluate(self) -> int:
+    """Tapered material and piece-square score in centipawns for the side to move, maintained incrementally."""
+    return self._b.evaluate()
+
+  def see(self, move: tuple[int, int, int, int]) -> int:
+    """Static exchange evaluation of a move in centipawns, negative if the exchange it starts loses material."""
+    return self._b.see(move)
+
+  def is_check(self) -> bool:
+    return self._b.is_check()
+
+  def is_checkmate(self) -> bool:
+    return self._b.is_checkmate()
+
+  def is_stalemate(self) -> bool:
+    return self._b.is_stalemate()
+
+  def has_legal_move(self) -> bool:
+    return self._b.has_legal_move()
+
+  def is_repetition(self, count: int = 3) -> bool:
+    """Whether the position has occurred count times in the moves played, counting back to the last capture."""
+    return self._b.is_repetition(count)
+
+  def adjudicate_repetition(self, count: int = 3, rules: str = "asian") -> str | None:
+    """Result of the game once the position has occurred count times, None before that.
+
+    The side that gave check with every move since the first of those occurrences loses ("0-1" or "1-0"). Under the
+    "asian" rules so does a side that checked or chased with every move, but perpetual check loses to perpetual chase.
+    Under the "check" rules chasing is free. Anything else is a draw, "1/2-1/2". A move chases when the piece moved
+    newly attacks an enemy piece that can't be recaptured, or a chariot with a horse or a cannon.
+    """
+    return self._b.adjudicate_repetition(count, rules)
+
+  def get_piece(self, file: int, rank: int):
+    return self._b.get_piece(file, rank)
+
+  def get_legal_moves(self) -> list[tuple[int, int, int, int]]:
+    return self._b.get_legal_moves()
+
+  def legal_moves_packed(self) -> array:
+    """Legal moves as an array("H") of packed moves (see Move), without a Python object per move."""
+    moves = array("H")
+    moves.frombytes(self._b.legal_moves_packed())
+    if sys.byteorder == "big":
+      moves.byteswap()
+    return moves
+
+  def legal_move_objects(self) -> list[Move]:
+    return self._b.legal_move_objects()
+
+  def iter_legal_moves(self, captures_first: bool = True) -> Iterator[tuple[int, int, int, int]]:
+    """Yield legal moves lazily, captures first by most valuable victim unless captures_first is False."""
+    return self._b.iter_legal_moves(captures_first)
+
+  def legal_move_mask(self, full: bool = False) -> bytes:
+    """One byte per action, 1 for the legal moves of the position: NUM_ACTIONS actions, or 90 * 90 with full=True.
+
+    See action_to_move for the numbering. numpy.frombuffer(mask, dtype=bool) gives a mask for a policy head.
+    """
+    return self._b.legal_move_mask(full)
+
+  def planes(self, dtype: str = "uint8") -> memoryview:
+    """Feature planes of the position as a read-only (15, 10, 9) array of "uint8" or "float32" values.
+
+    Planes 0-6 hold the red general, advisors, elephants, horses, chariots, cannons and soldiers, planes 7-13 the
+    black ones, and plane 14 is all ones when red is to move. Ranks are indexed from red's side. numpy.asarray() of the
+    result shares its memory.
+    """
+    return memoryview(self._b.planes(dtype))
+
   @property
   def turn(self):
     return self._b.turn()
 
+  @property
+  def zobrist_hash(self) -> int:
+    return self._b.zobrist_hash()
+
+  def __hash__(self) -> int:
+    return self._b.zobrist_hash()
+
+  def __eq__(self, other) -> bool:
+    if not isinstance(other, Board):
+      return NotImplemented
+    return self._b.same_position(other._b)
+
   def __repr__(self) -> str:
     return self._b.ascii()
 
@@ -96,3 +267,255 @@ class Board:
       server.serve_forever(poll_interval=0.1)
     except KeyboardInterrupt:
       print("libxiangqi server shutdown...")
+
+
+def load_fens(source: str | os.PathLike | Iterable[str], backend: str = "mailbox") -> list[Board]:
+  """Parse a file with one FEN per line, or an iterable of FEN strings, in a single call."""
+  return [Board._wrap(b) for b in _load_fens(source, backend)]
+
+
+def simulate_games(
+  n: int, policy: str = "random", max_plies: int = 400, threads: int = 0, fen: str | None = None, seed: int = 0, record: bool = False
+) -> SimulationResult:
+  """Play n games to the end in Rust, from the start position or fen, on threads threads (0 for every core).
+
+  policy is "random" (any legal move) or "capture_first" (a random capture when there is one). A game is lost by the
+  side with no legal move and drawn after max_plies plies. seed fixes the games played whatever the number of threads.
+  With record=True the result holds every game's moves, packed as u16 from | to << 7 with squares numbered
+  rank * 9 + file, and its result.
+  """
+  return _simulate_games(n, policy, max_plies, threads, fen, seed, record)
+
+
+def encode_boards(boards: Sequence[Board], out):
+  """Write the feature planes of boards (see Board.planes) into out, a writable C-contiguous uint8 or float32 buffer
+  of len(boards) * 15 * 10 * 9 values such as a numpy array of shape (len(boards), 15, 10, 9). Returns out.
+  """
+  _encode_boards([b._b for b in boards], out)
+  return out
+
+
+def legal_move_masks(boards: Sequence[Board], out, full: bool = False):
+  """Write the legal move masks of boards (see Board.legal_move_mask) into out, a writable C-contiguous uint8, bool or
+  float32 buffer such as a numpy array of shape (len(boards), NUM_ACTIONS), or (len(boards), 8100) with full=True.
+  Returns out.
+  """
+  _legal_move_masks([b._b for b in boards], out, full)
+  return out
+
+
+class VecBoard:
+  """n games stepped together in Rust, for self-play: one call plays a move in every game.
+
+  Observations are the feature planes of every game (see Board.planes), shape (n, 15, 10, 9). Actions are numbered as
+  by action_to_move. A game ends when the side to move has no legal move, a win for the other side, or after
+  max_plies plies, a draw, and is then reset to the start position (fen, or the standard one) within the same step.
+  Every array returned is read-only and numpy.asarray() of it shares its memory.
+  """
+
+  def __init__(self, n: int, fen: str | None = None, max_plies: int = 400, dtype: str = "uint8"):
+    self._env = _VecBoard(n, fen, max_plies, dtype)
+
+  def __len__(self) -> int:
+    return len(self._env)
+
+  def board(self, i: int) -> Board:
+    """Copy of the position of game i."""
+    return Board._wrap(self._env.board(i))
+
+  def observations(self) -> memoryview:
+    return memoryview(self._env.observations())
+
+  def reset(self) -> memoryview:
+    """Reset every game to the start position. Returns the observations."""
+    return memoryview(self._env.reset())
+
+  def legal_move_masks(self, full: bool = False) -> memoryview:
+    """uint8 masks of the legal moves of every game, shape (n, NUM_ACTIONS) or (n, 8100) with full=True."""
+    return memoryview(self._env.legal_move_masks(full))
+
+  def step(self, actions) -> tuple[memoryview, memoryview, memoryview]:
+    """Play actions[i] in game i, actions being a sequence or an int32/int64 buffer such as a numpy array.
+
+    Returns (observations, rewards, dones): rewards are float32, 1.0 for a move that wins its game and 0.0 otherwise,
+    and dones are bool. Raises IllegalMove, without playing anything, if an action is not legal in its game, and
+    ValueError unless there is one action per game.
+    """
+    observations, rewards, dones = self._env.step(actions)
+    return memoryview(observations), memoryview(rewards), memoryview(dones)
+
+
+class Tablebase:
+  """Endgame tablebases memory-mapped from a directory written by generate_tablebase.
+
+  The files are mapped rather than read, so processes probing the same directory share one copy of the tables.
+  """
+
+  def __init__(self, path: str | os.PathLike):
+    self._tb = _Tablebase(path)
+
+  @property
+  def materials(self) -> list[str]:
+    return self._tb.materials()
+
+  def probe_wdl(self, board: Board) -> int | None:
+    """1 if the side to move wins, 0 for a draw, -1 if it loses, None when no table covers the position."""
+    return self._tb.probe_wdl(board._b)
+
+  def probe_dtm(self, board: Board) -> int | None:
+    """Plies to mate, positive when the side to move wins and negative when it loses, 0 for a draw."""
+    return self._tb.probe_dtm(board._b)
+
+
+def generate_tablebase(material: str, path: str | os.PathLike, threads: int = 0) -> list[str]:
+  """Generate the tablebase of a material such as "KRKAA" (up to 5 men) into a directory, with the smaller tables its
+  captures lead to. Tables already in the directory are reused. Returns the materials of the tables written.
+  """
+  return _generate_tablebase(material, path, threads)
+
+
+class Book:
+  """Opening book memory-mapped from a file written by build_book.
+
+  Entries are sorted by position hash, so a lookup is a binary search over the mapped file and nothing is read up front.
+  """
+
+  def __init__(self, path: str | os.PathLike):
+    self._book = _Book(path)
+
+  def __len__(self) -> int:
+    return len(self._book)
+
+  def moves(self, board: Board) -> list[tuple[tuple[int, int, int, int], int, int]]:
+    """Legal book moves of a position as (move, weight, learn), most played first. Empty when it is out of book."""
+    return self._book.moves(board._b)
+
+  def best_move(self, board: Board) -> tuple[int, int, int, int] | None:
+    """Most played book move of a position, None when it is out of book."""
+    return self._book.best_move(board._b)
+
+
+def build_book(path: str | os.PathLike, games: Iterable[Iterable[tuple[int, int, int, int]]], max_ply: int = 30, min_count: int = 1) -> int:
+  """Write an opening book from games played from the start position, given as sequences of moves.
+
+  The first max_ply moves of each game are entered, and a move is kept if it was played in at least min_count games.
+  Returns the number of entries written. Raises IllegalMove if a game contains an illegal move.
+  """
+  return _build_book(path, games, max_ply, min_count)
+
+
+class Game:
+  """A game read by read_games: its headers, the moves replayed and, if asked for, the positions reached."""
+
+  def __init__(self, game: _Game):
+    self._game = game
+
+  @property
+  def headers(self) -> dict[str, str]:
+    return dict(self._game.headers)
+
+  @property
+  def moves(self) -> list[tuple[int, int, int, int]]:
+    """Moves up to the end of the game, or up to the first move that could not be played."""
+    return self._game.moves
+
+  @property
+  def result(self) -> str | None:
+    """Result of the game, "1-0", "0-1" or "1/2-1/2", None if the record doesn't say."""
+    return self._game.result
+
+  @property
+  def error(self) -> str | None:
+    """Why the replay stopped before the end of the game, None if every move was played."""
+    return self._game.error
+
+  @property
+  def positions(self) -> list[Board] | None:
+    """Start position and the position after each move, None unless read with positions=True."""
+    positions = self._game.positions
+    return None if positions is None else [Board._wrap(b) for b in positions]
+
+  def __repr__(self) -> str:
+    return f"<Game {len(self.moves)} moves {self.result or '*'}>"
+
+
+def read_games(path: str | os.PathLike, positions: bool = False) -> Iterator[Game]:
+  """Stream the games of a PGN file, moves in ICCS ("h2e2") or WXF ("C2.5") notation, replaying each in Rust.
+
+  The file is read one game at a time, so memory use doesn't grow with its size. A game stops at the first move that
+  is illegal or can't be read, see Game.error. With positions=True each game also holds the positions it reached.
+  """
+  for game in _GameReader(path, positions):
+    yield Game(game)
+
+
+class GameDatabase:
+  """Games stored in a directory as memory-mapped columns of packed moves, with an index from position to games.
+
+  Games are played from the start position and only ever appended. Finding the games that reached a position is a
+  lookup in the index, not a replay of the archive. The directory is created if it doesn't exist.
+  """
+
+  def __init__(self, path: str | os.PathLike):
+    self._db = _GameDatabase(path)
+
+  def __len__(self) -> int:
+    return len(self._db)
+
+  def add_games(self, games: Iterable[Game | Sequence[tuple[int, int, int, int]]]) -> int:
+    """Append games read by read_games, or plain move sequences with no result. Returns the number added.
+
+    Like add_pgn, games that stopped on an error or whose FEN header sets up another position are skipped. Raises
+    IllegalMove, without adding anything, if a move sequence has a move that is not legal.
+    """
+    return self._db.add_games(g._game if isinstance(g, Game) else (g, None) for g in games)
+
+  def add_pgn(self, path: str | os.PathLike) -> int:
+    """Append the games of a PGN file that start from the start position and replay without error. Returns how many."""
+    return self._db.add_pgn(path)
+
+  def game(self, id: int) -> tuple[list[tuple[int, int, int, int]], str | None]:
+    """Moves and result of a game, by id in the order games were added."""
+    return self._db.game(id)
+
+  def find(self, board: Board) -> list[int]:
+    """Ids of the games that reached the position of board, in increasing order."""
+    return self._db.find(board._b)
+
+
+class OpeningExplorer:
+  """Move frequencies and results by position, memory-mapped from a file written by build_explorer.
+
+  Statistics are (games, red_wins, draws, black_wins), games without a known result only count towards games.
+  """
+
+  def __init__(self, path: str | os.PathLike):
+    self._explorer = _OpeningExplorer(path)
+
+  @property
+  def games(self) -> int:
+    """Number of games counted."""
+    return self._explorer.games()
+
+  def moves(self, board: Board) -> list[tuple[tuple[int, int, int, int], tuple[int, int, int, int]]]:
+    """Moves played in a position with their statistics, most played first."""
+    return self._explorer.moves(board._b)
+
+  def stats(self, board: Board) -> tuple[int, int, int, int]:
+    """Statistics of a position, summed over the moves played in it."""
+    return self._explorer.stats(board._b)
+
+
+def build_explorer(
+  path: str | os.PathLike, source: GameDatabase | Iterable[str | os.PathLike], max_ply: int = 40, threads: int = 0, update: bool = False
+) -> int:
+  """Count the moves of the first max_ply plies of every game of a GameDatabase or of PGN files into an explorer file.
+
+  The games are replayed in Rust on threads threads (0 for every core), each counting into its own table, and the
+  tables are merged at the end. With update=True the new counts are added to those already in the file, which must
+  have been built with the same max_ply (ValueError otherwise): games of a database that were counted before are
+  skipped, PGN files are always counted in full. Returns the games counted.
+  """
+  if isinstance(source, GameDatabase):
+    return _build_explorer(path, source._db, max_ply, threads, update)
+  return _build_explorer(path, list(source), max_ply, threads, update)
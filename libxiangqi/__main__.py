@@ -0,0 +1,184 @@
+import argparse
+import sys
+import time
+from array import array
+
+from . import START_FEN, Board, Move, generate_tablebase, read_games, simulate_games
+
+
+def perft(args: argparse.Namespace):
+  b = Board.from_fen(args.fen, backend=args.backend)
+  start = time.perf_counter()
+  if args.divide:
+    nodes = 0
+    for move, count in sorted(b.perft_divide(args.depth, args.threads)):
+      print(f"{move}: {count}")
+      nodes += count
+  else:
+    nodes = b.perft(args.depth, args.threads)
+  elapsed = time.perf_counter() - start
+  nps = nodes / elapsed if elapsed > 0 else float("inf")
+  print(f"depth {args.depth}: {nodes} nodes in {elapsed:.3f}s ({nps / 1e6:.2f} Mnps, {args.threads} threads)")
+  if args.expect is not None and nodes != args.expect:
+    raise SystemExit(f"expected {args.expect} nodes, got {nodes}")
+
+
+def search(args: argparse.Namespace):
+  b = Board.from_fen(args.fen, backend=args.backend)
+  if args.depth is None and args.movetime is None and args.nodes is None:
+    args.movetime = 1000
+  start = time.perf_counter()
+  result = b.search(args.depth, args.movetime, args.nodes, args.hash, args.threads)
+  elapsed = time.perf_counter() - start
+  nps = result.nodes / elapsed if elapsed > 0 else float("inf")
+  print(f"depth {result.depth} score {result.score} nodes {result.nodes} in {elapsed:.3f}s ({nps / 1e6:.2f} Mnps)")
+  print("pv " + " ".join(str(move) for move in result.pv))
+  print(f"bestmove {result.best_move}")
+
+
+def scaling(args: argparse.Namespace):
+  b = Board.from_fen(args.fen, backend=args.backend)
+  print(f"time to depth {args.depth}")
+  print(f"{'threads':>8} {'time':>9} {'speedup':>8} {'nodes':>12} {'Mnps':>7}  bestmove")
+  baseline = None
+  for threads in args.threads:
+    start = time.perf_counter()
+    result = b.search(depth=args.depth, hash_mb=args.hash, threads=threads)
+    elapsed = time.perf_counter() - start
+    baseline = baseline or elapsed
+    nps = result.nodes / elapsed if elapsed > 0 else float("inf")
+    print(f"{threads:>8} {elapsed:>8.3f}s {baseline / elapsed:>7.2f}x {result.nodes:>12} {nps / 1e6:>7.2f}  {result.best_move}")
+
+
+def tablebase(args: argparse.Namespace):
+  start = time.perf_counter()
+  written = generate_tablebase(args.material, args.dir, args.threads)
+  elapsed = time.perf_counter() - start
+  print(f"wrote {' '.join(written) or 'nothing'} to {args.dir} in {elapsed:.3f}s")
+
+
+def games(args: argparse.Namespace):
+  start = time.perf_counter()
+  count = moves = errors = 0
+  for path in args.files:
+    for game in read_games(path):
+      count += 1
+      moves += len(game.moves)
+      if game.error is not None:
+        errors += 1
+        if args.verbose:
+          print(f"{path} game {count}: {game.error}")
+  elapsed = time.perf_counter() - start
+  rate = count / elapsed * 60 if elapsed > 0 else float("inf")
+  print(f"{count} games, {moves} moves, {errors} with errors in {elapsed:.3f}s ({rate:.0f} games/min)")
+
+
+def overhead(args: argparse.Namespace):
+  recorded = simulate_games(args.games, max_plies=args.plies, fen=args.fen, seed=args.seed, record=True).moves
+  assert recorded is not None
+  packed = []
+  for moves in recorded:
+    game = array("H")
+    game.frombytes(moves)
+    if sys.byteorder == "big":
+      game.byteswap()
+    packed.append(game)
+  tuples = [[Move.from_packed(mv).tuple() for mv in game] for game in packed]
+  plies = sum(len(game) for game in packed)
+  print(f"replaying {len(packed)} random games, {plies} moves")
+
+  def replay(name, play):
+    boards = [Board.from_fen(args.fen) for _ in packed]
+    start = time.perf_counter()
+    for i, b in enumerate(boards):
+      play(b, i)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {elapsed / plies * 1e9:>8.0f} ns/move")
+
+  def make_move(b, i):
+    for move in tuples[i]:
+      b.make_move(*move)
+
+  def push(b, i):
+    for move in tuples[i]:
+      b.push(move)
+
+  def push_packed(b, i):
+    for move in packed[i]:
+      b.push_packed(move)
+
+  replay("make_move(*move)", make_move)
+  replay("push(move)", push)
+  replay("push_packed(move)", push_packed)
+  replay("make_moves(array('H'))", lambda b, i: b.make_moves(packed[i]))
+  replay("make_moves(bytes)", lambda b, i: b.make_moves(recorded[i]))
+
+  b = Board.from_fen(args.fen)
+  for name, generate in [
+    ("get_legal_moves()", b.get_legal_moves),
+    ("legal_move_objects()", b.legal_move_objects),
+    ("legal_moves_packed()", b.legal_moves_packed),
+  ]:
+    start = time.perf_counter()
+    for _ in range(args.calls):
+      generate()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {elapsed / args.calls * 1e9:>8.0f} ns/call")
+
+
+def main():
+  parser = argparse.ArgumentParser(prog="python -m libxiangqi")
+  commands = parser.add_subparsers(dest="command", required=True)
+
+  p = commands.add_parser("perft", help="count leaf nodes of the move tree and report nodes per second")
+  p.add_argument("depth", type=int)
+  p.add_argument("--fen", default=START_FEN, help="position to count from, the start position by default")
+  p.add_argument("--divide", action="store_true", help="print the node count below each root move")
+  p.add_argument("--backend", choices=("mailbox", "bitboard"), default="mailbox")
+  p.add_argument("--threads", type=int, default=1, help="worker threads, 0 uses every available core")
+  p.add_argument("--expect", type=int, help="exit with an error unless this many nodes are counted")
+  p.set_defaults(func=perft)
+
+  p = commands.add_parser("search", help="search a position for the best move, one second by default")
+  p.add_argument("--fen", default=START_FEN, help="position to search, the start position by default")
+  p.add_argument("--depth", type=int, help="maximum depth in plies")
+  p.add_argument("--movetime", type=int, help="time budget in milliseconds")
+  p.add_argument("--nodes", type=int, help="node budget")
+  p.add_argument("--hash", type=int, default=16, help="transposition table size in MB")
+  p.add_argument("--threads", type=int, default=1, help="search threads, 0 uses every available core")
+  p.add_argument("--backend", choices=("mailbox", "bitboard"), default="mailbox")
+  p.set_defaults(func=search)
+
+  p = commands.add_parser("scaling", help="time a fixed depth search with more and more threads")
+  p.add_argument("--fen", default=START_FEN, help="position to search, the start position by default")
+  p.add_argument("--depth", type=int, default=7)
+  p.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="thread counts to compare")
+  p.add_argument("--hash", type=int, default=64, help="transposition table size in MB")
+  p.add_argument("--backend", choices=("mailbox", "bitboard"), default="mailbox")
+  p.set_defaults(func=scaling)
+
+  p = commands.add_parser("tablebase", help="generate an endgame tablebase and the smaller ones it needs")
+  p.add_argument("material", help="pieces of each side after its general, red first, such as KRKAA")
+  p.add_argument("--dir", default="tablebases", help="directory to write the tables to")
+  p.add_argument("--threads", type=int, default=0, help="worker threads, 0 uses every available core")
+  p.set_defaults(func=tablebase)
+
+  p = commands.add_parser("games", help="replay the games of PGN files, checking every move")
+  p.add_argument("files", nargs="+", help="PGN files with moves in ICCS or WXF notation")
+  p.add_argument("--verbose", action="store_true", help="print why each game that failed stopped")
+  p.set_defaults(func=games)
+
+  p = commands.add_parser("overhead", help="time the per-call cost of playing moves and listing legal moves")
+  p.add_argument("--fen", default=START_FEN, help="position the games start from, the start position by default")
+  p.add_argument("--games", type=int, default=200, help="random games to replay")
+  p.add_argument("--plies", type=int, default=200, help="longest game in plies")
+  p.add_argument("--seed", type=int, default=0)
+  p.add_argument("--calls", type=int, default=100000, help="legal move lists to generate")
+  p.set_defaults(func=overhead)
+
+  args = parser.parse_args()
+  args.func(args)
+
+
+if __name__ == "__main__":
+  main()
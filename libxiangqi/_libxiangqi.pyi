@@ -1 +1,242 @@
-def add(left: int, right: int) -> int: ...
\ No newline at end of file
+import os
+from collections.abc import Callable, Iterable, Iterator
+
+START_FEN: str
+MATE_SCORE: int
+NUM_ACTIONS: int
+
+class IllegalMove(Exception): ...
+class Piece: ...
+
+class Square:
+  A1: Square
+  B1: Square
+  C1: Square
+  D1: Square
+  E1: Square
+  F1: Square
+  G1: Square
+  H1: Square
+  I1: Square
+  A2: Square
+  B2: Square
+  C2: Square
+  D2: Square
+  E2: Square
+  F2: Square
+  G2: Square
+  H2: Square
+  I2: Square
+  A3: Square
+  B3: Square
+  C3: Square
+  D3: Square
+  E3: Square
+  F3: Square
+  G3: Square
+  H3: Square
+  I3: Square
+  A4: Square
+  B4: Square
+  C4: Square
+  D4: Square
+  E4: Square
+  F4: Square
+  G4: Square
+  H4: Square
+  I4: Square
+  A5: Square
+  B5: Square
+  C5: Square
+  D5: Square
+  E5: Square
+  F5: Square
+  G5: Square
+  H5: Square
+  I5: Square
+  A6: Square
+  B6: Square
+  C6: Square
+  D6: Square
+  E6: Square
+  F6: Square
+  G6: Square
+  H6: Square
+  I6: Square
+  A7: Square
+  B7: Square
+  C7: Square
+  D7: Square
+  E7: Square
+  F7: Square
+  G7: Square
+  H7: Square
+  I7: Square
+  A8: Square
+  B8: Square
+  C8: Square
+  D8: Square
+  E8: Square
+  F8: Square
+  G8: Square
+  H8: Square
+  I8: Square
+  A9: Square
+  B9: Square
+  C9: Square
+  D9: Square
+  E9: Square
+  F9: Square
+  G9: Square
+  H9: Square
+  I9: Square
+  A10: Square
+  B10: Square
+  C10: Square
+  D10: Square
+  E10: Square
+  F10: Square
+  G10: Square
+  H10: Square
+  I10: Square
+  def __int__(self) -> int: ...
+
+class Move:
+  from_square: Square
+  to_square: Square
+  packed: int
+  def __init__(self, from_square: Square, to_square: Square) -> None: ...
+  @staticmethod
+  def from_packed(mv: int) -> Move: ...
+  @staticmethod
+  def from_tuple(mv: tuple[int, int, int, int]) -> Move: ...
+  def tuple(self) -> tuple[int, int, int, int]: ...
+  def __int__(self) -> int: ...
+  def __hash__(self) -> int: ...
+
+class SearchResult:
+  best_move: tuple[int, int, int, int] | None
+  score: int
+  pv: list[tuple[int, int, int, int]]
+  depth: int
+  nodes: int
+
+class MctsResult:
+  best_move: tuple[int, int, int, int] | None
+  moves: list[tuple[tuple[int, int, int, int], int, float]]
+  value: float
+
+class SimulationResult:
+  games: int
+  red_wins: int
+  black_wins: int
+  draws: int
+  plies: int
+  moves: list[bytes] | None
+  results: list[str] | None
+
+class LegalMoveIter(Iterator[tuple[int, int, int, int]]):
+  def __iter__(self) -> LegalMoveIter: ...
+  def __next__(self) -> tuple[int, int, int, int]: ...
+
+class Board:
+  def __init__(self, backend: str = "mailbox") -> None: ...
+  @staticmethod
+  def from_fen(fen: str, backend: str = "mailbox") -> Board: ...
+  def fen(self) -> str: ...
+  def get_piece(self, file: int, rank: int) -> Piece | None: ...
+  def get_legal_moves(self) -> list[tuple[int, int, int, int]]: ...
+  def iter_legal_moves(self, captures_first: bool = True) -> LegalMoveIter: ...
+  def make_move(self, from_file: int, from_rank: int, to_file: int, to_rank: int) -> None: ...
+  def is_check(self) -> bool: ...
+  def is_checkmate(self) -> bool: ...
+  def is_stalemate(self) -> bool: ...
+  def has_legal_move(self) -> bool: ...
+  def is_repetition(self, count: int = 3) -> bool: ...
+  def adjudicate_repetition(self, count: int = 3, rules: str = "asian") -> str | None: ...
+  def push(self, move: tuple[int, int, int, int]) -> None: ...
+  def pop(self) -> tuple[int, int, int, int]: ...
+  def push_packed(self, mv: int) -> None: ...
+  def make_moves(self, moves: object) -> None: ...
+  def legal_moves_packed(self) -> bytes: ...
+  def legal_move_objects(self) -> list[Move]: ...
+  def perft(self, depth: int, threads: int = 1) -> int: ...
+  def perft_divide(self, depth: int, threads: int = 1) -> list[tuple[tuple[int, int, int, int], int]]: ...
+  def search(
+    self, depth: int | None = None, movetime_ms: int | None = None, nodes: int | None = None, hash_mb: int = 16, threads: int = 1
+  ) -> SearchResult: ...
+  def mcts(
+    self, evaluate: Callable[[Array], tuple[object, object]], simulations: int = 800, batch_size: int = 16, threads: int = 1, c_puct: float = 1.5
+  ) -> MctsResult: ...
+  def evaluate(self) -> int: ...
+  def see(self, mv: tuple[int, int, int, int]) -> int: ...
+  def ascii(self) -> str: ...
+  def zobrist_hash(self) -> int: ...
+  def same_position(self, other: Board) -> bool: ...
+  def turn(self) -> bool: ...
+  def legal_move_mask(self, full: bool = False) -> bytes: ...
+  def planes(self, dtype: str = "uint8") -> Array: ...
+
+class Array:
+  def __buffer__(self, flags: int, /) -> memoryview: ...
+
+class VecBoard:
+  def __init__(self, n: int, fen: str | None = None, max_plies: int = 400, dtype: str = "uint8") -> None: ...
+  def __len__(self) -> int: ...
+  def board(self, i: int) -> Board: ...
+  def observations(self) -> Array: ...
+  def reset(self) -> Array: ...
+  def legal_move_masks(self, full: bool = False) -> Array: ...
+  def step(self, actions: object) -> tuple[Array, Array, Array]: ...
+
+class Tablebase:
+  def __init__(self, path: str | os.PathLike) -> None: ...
+  def materials(self) -> list[str]: ...
+  def probe_wdl(self, board: Board) -> int | None: ...
+  def probe_dtm(self, board: Board) -> int | None: ...
+
+class Book:
+  def __init__(self, path: str | os.PathLike) -> None: ...
+  def __len__(self) -> int: ...
+  def moves(self, board: Board) -> list[tuple[tuple[int, int, int, int], int, int]]: ...
+  def best_move(self, board: Board) -> tuple[int, int, int, int] | None: ...
+
+class Game:
+  headers: list[tuple[str, str]]
+  moves: list[tuple[int, int, int, int]]
+  result: str | None
+  error: str | None
+  positions: list[Board] | None
+
+class GameReader(Iterator[Game]):
+  def __init__(self, path: str | os.PathLike, positions: bool = False) -> None: ...
+  def __iter__(self) -> GameReader: ...
+  def __next__(self) -> Game: ...
+
+class GameDatabase:
+  def __init__(self, path: str | os.PathLike) -> None: ...
+  def __len__(self) -> int: ...
+  def add_games(self, games: Iterable[Game | tuple[Iterable[tuple[int, int, int, int]], str | None]]) -> int: ...
+  def add_pgn(self, path: str | os.PathLike) -> int: ...
+  def game(self, id: int) -> tuple[list[tuple[int, int, int, int]], str | None]: ...
+  def find(self, board: Board) -> list[int]: ...
+
+class OpeningExplorer:
+  def __init__(self, path: str | os.PathLike) -> None: ...
+  def games(self) -> int: ...
+  def moves(self, board: Board) -> list[tuple[tuple[int, int, int, int], tuple[int, int, int, int]]]: ...
+  def stats(self, board: Board) -> tuple[int, int, int, int]: ...
+
+def action_to_move(action: int, full: bool = False) -> tuple[int, int, int, int]: ...
+def build_book(path: str | os.PathLike, games: Iterable[Iterable[tuple[int, int, int, int]]], max_ply: int = 30, min_count: int = 1) -> int: ...
+def build_explorer(
+  path: str | os.PathLike, source: GameDatabase | list[str | os.PathLike], max_ply: int = 40, threads: int = 0, update: bool = False
+) -> int: ...
+def encode_boards(boards: list[Board], out: object) -> None: ...
+def generate_tablebase(material: str, path: str | os.PathLike, threads: int = 0) -> list[str]: ...
+def legal_move_masks(boards: list[Board], out: object, full: bool = False) -> None: ...
+def load_fens(source: str | os.PathLike | Iterable[str], backend: str = "mailbox") -> list[Board]: ...
+def move_to_action(mv: tuple[int, int, int, int], full: bool = False) -> int: ...
+def simulate_games(
+  n: int, policy: str = "random", max_plies: int = 400, threads: int = 0, fen: str | None = None, seed: int = 0, record: bool = False
+) -> SimulationResult: ...
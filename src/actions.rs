@@ -0,0 +1,111 @@
+// Fixed action spaces for policy networks.
+//
+// The compact space has the 2086 (from, to) square pairs that some piece can move between on an empty board: every
+// pair on a shared rank or file, every horse jump, the advisor steps between the palace centre and its corners and the
+// elephant steps on its own side of the river. Actions are numbered in increasing order of `from * 90 + to`, squares
+// numbered `rank * 9 + file`, so the numbering never changes. The full space numbers all 90 x 90 pairs as
+// `from * 90 + to`, most of which are never legal.
+
+use std::cell::Cell;
+
+use crate::bitboard::{idx_to_sq, sq_to_idx, NUM_SQUARES};
+use crate::Board;
+
+pub(crate) const NUM_ACTIONS: usize = 2086;
+pub(crate) const NUM_FULL_ACTIONS: usize = NUM_SQUARES * NUM_SQUARES;
+const NO_ACTION: u16 = u16::MAX;
+
+struct Actions {
+  // (from, to) squares of each compact action
+  moves: [(u8, u8); NUM_ACTIONS],
+  // Compact action of each `from * 90 + to`, NO_ACTION if there is none
+  index: [u16; NUM_FULL_ACTIONS],
+}
+
+const fn palace_centre(file: usize, rank: usize) -> bool {
+  file == 4 && (rank == 1 || rank == 8)
+}
+
+const fn elephant_square(file: usize, rank: usize) -> bool {
+  let rank = if rank > 4 { 9 - rank } else { rank };
+  file % 2 == 0 && rank % 2 == 0 && (file + rank) % 4 == 2
+}
+
+// Whether some piece can move from `from` to `to` on an empty board
+const fn reachable(from: usize, to: usize) -> bool {
+  let (ff, fr, tf, tr) = (from % 9, from / 9, to % 9, to / 9);
+  let (df, dr) = (ff.abs_diff(tf), fr.abs_diff(tr));
+  let line = from != to && (df == 0 || dr == 0);
+  let horse = (df == 1 && dr == 2) || (df == 2 && dr == 1);
+  let advisor = df == 1 && dr == 1 && (palace_centre(ff, fr) || palace_centre(tf, tr));
+  let elephant = df == 2 && dr == 2 && (fr <= 4) == (tr <= 4) && elephant_square(ff, fr);
+  line || horse || advisor || elephant
+}
+
+const fn build_actions() -> Actions {
+  let mut actions = Actions {
+    moves: [(0, 0); NUM_ACTIONS],
+    index: [NO_ACTION; NUM_FULL_ACTIONS],
+  };
+  let (mut pair, mut n) = (0, 0);
+  while pair < NUM_FULL_ACTIONS {
+    if reachable(pair / NUM_SQUARES, pair % NUM_SQUARES) {
+      actions.moves[n] = ((pair / NUM_SQUARES) as u8, (pair % NUM_SQUARES) as u8);
+      actions.index[pair] = n as u16;
+      n += 1;
+    }
+    pair += 1;
+  }
+  assert!(n == NUM_ACTIONS);
+  actions
+}
+
+static ACTIONS: Actions = build_actions();
+
+pub(crate) fn num_actions(full: bool) -> usize {
+  if full {
+    NUM_FULL_ACTIONS
+  } else {
+    NUM_ACTIONS
+  }
+}
+
+// Action of the move between mailbox indices `from` and `to`, None if the compact space has no such action
+pub(crate) fn action(from: usize, to: usize, full: bool) -> Option<usize> {
+  let pair = idx_to_sq(from) * NUM_SQUARES + idx_to_sq(to);
+  match full {
+    true => Some(pair),
+    false => match ACTIONS.index[pair] {
+      NO_ACTION => None,
+      action => Some(action as usize),
+    },
+  }
+}
+
+// (from, to) mailbox indices of `action`, None if it is out of range
+pub(crate) fn action_move(action: usize, full: bool) -> Option<(usize, usize)> {
+  let (from, to) = match full {
+    true if action < NUM_FULL_ACTIONS => (action / NUM_SQUARES, action % NUM_SQUARES),
+    false if action < NUM_ACTIONS => (ACTIONS.moves[action].0 as usize, ACTIONS.moves[action].1 as usize),
+    _ => return None,
+  };
+  Some((sq_to_idx(from), sq_to_idx(to)))
+}
+
+impl Board {
+  // Write the legal move mask of this position to `out`, which holds one value per action: 1 for legal moves and 0 for
+  // the rest. A legal move the compact space has no action for, which only a position set up with an advisor or an
+  // elephant off its usual squares has, is left out. `moves` is scratch space.
+  pub(crate) fn write_legal_mask<T: Copy + From<bool>>(&self, full: bool, moves: &mut Vec<(u8, u8)>, out: &[Cell<T>]) {
+    for value in out {
+      value.set(T::from(false));
+    }
+    moves.clear();
+    self.generate_legal(moves);
+    for &(from, to) in moves.iter() {
+      if let Some(action) = action(from as usize, to as usize, full) {
+        out[action].set(T::from(true));
+      }
+    }
+  }
+}
@@ -0,0 +1,315 @@
+// Bitboard board representation.
+//
+// Squares are numbered 0..90 as `rank * 9 + file`, the same numbering as `Square`, and a set of squares is a u128
+// with one bit per square. Leaper attacks (general, advisor, elephant, horse, soldier) come from tables built once;
+// elephant and horse tables are indexed by which of their eye/leg squares are occupied. Chariot and cannon use
+// per-line tables indexed by the occupancy of the rank or file they move along.
+
+use std::sync::OnceLock;
+
+use crate::{Color, PieceType, FILE_SZ, RANK_SZ};
+
+pub(crate) const NUM_SQUARES: usize = 90;
+const NO_SQUARE: u8 = u8::MAX;
+
+pub(crate) const fn sq_to_idx(sq: usize) -> usize {
+  (sq / 9 + 1) * 12 + sq % 9 + 1
+}
+
+pub(crate) const fn idx_to_sq(idx: usize) -> usize {
+  (idx / 12 - 1) * 9 + idx % 12 - 1
+}
+
+pub(crate) const fn piece_index(piece_type: PieceType) -> usize {
+  match piece_type {
+    PieceType::General => 0,
+    PieceType::Advisor => 1,
+    PieceType::Elephant => 2,
+    PieceType::Horse => 3,
+    PieceType::Chariot => 4,
+    PieceType::Cannon => 5,
+    PieceType::Soldier => 6,
+  }
+}
+
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+pub(crate) struct Bitboards {
+  // Indexed by `Color::index` then `piece_index`
+  pieces: [[u128; 7]; 2],
+  occupied: [u128; 2],
+}
+
+impl Bitboards {
+  pub(crate) fn put(&mut self, sq: usize, piece_type: PieceType, side: Color) {
+    let bit = 1u128 << sq;
+    self.pieces[side.index()][piece_index(piece_type)] |= bit;
+    self.occupied[side.index()] |= bit;
+  }
+
+  pub(crate) fn remove(&mut self, sq: usize, piece_type: PieceType, side: Color) {
+    let bit = !(1u128 << sq);
+    self.pieces[side.index()][piece_index(piece_type)] &= bit;
+    self.occupied[side.index()] &= bit;
+  }
+
+  pub(crate) fn general_square(&self, side: Color) -> Option<usize> {
+    let generals = self.pieces[side.index()][piece_index(PieceType::General)];
+    (generals != 0).then(|| generals.trailing_zeros() as usize)
+  }
+
+  // Generate every move for `side` as (from, to) mailbox indices.
+  pub(crate) fn generate_moves(&self, side: Color, moves: &mut Vec<(u8, u8)>) {
+    let t = tables();
+    let us = side.index();
+    let own = self.occupied[us];
+    let enemy = self.occupied[1 - us];
+    let occ = own | enemy;
+
+    let mut emit = |from: usize, mut targets: u128| {
+      let from_idx = sq_to_idx(from) as u8;
+      while targets != 0 {
+        let to = targets.trailing_zeros() as usize;
+        targets &= targets - 1;
+        moves.push((from_idx, sq_to_idx(to) as u8));
+      }
+    };
+
+    for (i, &pieces) in self.pieces[us].iter().enumerate() {
+      let mut pieces = pieces;
+      while pieces != 0 {
+        let from = pieces.trailing_zeros() as usize;
+        pieces &= pieces - 1;
+        let targets = match i {
+          0 => t.general[us][from] & !own,
+          1 => t.advisor[us][from] & !own,
+          2 => t.elephant[us][from][blocker_index(&t.elephant_eyes[from], occ)] & !own,
+          3 => t.horse[from][blocker_index(&t.horse_legs[from], occ)] & !own,
+          4 => t.slide(from, occ) & !own,
+          5 => (t.slide(from, occ) & !occ) | (t.screen_jump(from, occ) & enemy),
+          _ => t.soldier[us][from] & !own,
+        };
+        emit(from, targets);
+      }
+    }
+  }
+}
+
+// Pack the occupancy of up to four eye/leg squares into a table index.
+#[inline]
+fn blocker_index(squares: &[u8; 4], occ: u128) -> usize {
+  let mut index = 0;
+  for (bit, &sq) in squares.iter().enumerate() {
+    if sq != NO_SQUARE && occ & (1u128 << sq) != 0 {
+      index |= 1 << bit;
+    }
+  }
+  index
+}
+
+pub(crate) struct Tables {
+  general: [[u128; NUM_SQUARES]; 2],
+  advisor: [[u128; NUM_SQUARES]; 2],
+  soldier: [[u128; NUM_SQUARES]; 2],
+  elephant: [[[u128; 16]; NUM_SQUARES]; 2],
+  elephant_eyes: [[u8; 4]; NUM_SQUARES],
+  horse: [[u128; 16]; NUM_SQUARES],
+  horse_legs: [[u8; 4]; NUM_SQUARES],
+  // Line tables give the reachable positions along a rank (9 bits) or file (10 bits) for a slider standing at a
+  // position given the line occupancy. `*_slide` includes the first blocker, `*_jump` is the piece behind the screen.
+  rank_slide: [[u16; 512]; FILE_SZ as usize],
+  rank_jump: [[u16; 512]; FILE_SZ as usize],
+  file_slide: [[u16; 1024]; RANK_SZ as usize],
+  file_jump: [[u16; 1024]; RANK_SZ as usize],
+  // Spread a 10-bit file mask onto file 0 of the board
+  file_spread: [u128; 1024],
+}
+
+impl Tables {
+  #[inline]
+  fn rank_occ(sq: usize, occ: u128) -> usize {
+    ((occ >> (sq - sq % 9)) & 0x1FF) as usize
+  }
+
+  #[inline]
+  fn file_occ(sq: usize, occ: u128) -> usize {
+    let column = occ >> (sq % 9);
+    let mut bits = 0;
+    for rank in 0..RANK_SZ as usize {
+      bits |= (((column >> (rank * 9)) & 1) as usize) << rank;
+    }
+    bits
+  }
+
+  // Chariot attacks from `sq`, including the first blocker in each direction.
+  #[inline]
+  pub(crate) fn slide(&self, sq: usize, occ: u128) -> u128 {
+    let (file, rank) = (sq % 9, sq / 9);
+    let along_rank = (self.rank_slide[file][Self::rank_occ(sq, occ)] as u128) << (rank * 9);
+    let along_file = self.file_spread[self.file_slide[rank][Self::file_occ(sq, occ)] as usize] << file;
+    along_rank | along_file
+  }
+
+  // Squares a cannon on `sq` could capture on: the first piece behind a screen in each direction.
+  #[inline]
+  pub(crate) fn screen_jump(&self, sq: usize, occ: u128) -> u128 {
+    let (file, rank) = (sq % 9, sq / 9);
+    let along_rank = (self.rank_jump[file][Self::rank_occ(sq, occ)] as u128) << (rank * 9);
+    let along_file = self.file_spread[self.file_jump[rank][Self::file_occ(sq, occ)] as usize] << file;
+    along_rank | along_file
+  }
+}
+
+fn on_board(file: i32, rank: i32) -> Option<usize> {
+  if (0..FILE_SZ as i32).contains(&file) && (0..RANK_SZ as i32).contains(&rank) {
+    Some((rank * 9 + file) as usize)
+  } else {
+    None
+  }
+}
+
+fn in_palace(file: i32, rank: i32, side: Color) -> bool {
+  (3..=5).contains(&file)
+    && match side {
+      Color::Red => (0..=2).contains(&rank),
+      Color::Black => (7..=9).contains(&rank),
+    }
+}
+
+fn at_home(rank: i32, side: Color) -> bool {
+  match side {
+    Color::Red => rank <= 4,
+    Color::Black => rank >= 5,
+  }
+}
+
+// Walk a line of `len` positions from `pos`, returning (slide, jump) masks for occupancy `occ`.
+fn line_attacks(pos: usize, occ: usize, len: usize) -> (u16, u16) {
+  let (mut slide, mut jump) = (0u16, 0u16);
+  for step in [-1i32, 1] {
+    let mut p = pos as i32 + step;
+    let mut screened = false;
+    while (0..len as i32).contains(&p) {
+      let blocked = occ & (1 << p) != 0;
+      if screened {
+        if blocked {
+          jump |= 1 << p;
+          break;
+        }
+      } else {
+        slide |= 1 << p;
+        screened = blocked;
+      }
+      p += step;
+    }
+  }
+  (slide, jump)
+}
+
+fn build_tables() -> Box<Tables> {
+  let mut t = Box::new(Tables {
+    general: [[0; NUM_SQUARES]; 2],
+    advisor: [[0; NUM_SQUARES]; 2],
+    soldier: [[0; NUM_SQUARES]; 2],
+    elephant: [[[0; 16]; NUM_SQUARES]; 2],
+    elephant_eyes: [[NO_SQUARE; 4]; NUM_SQUARES],
+    horse: [[0; 16]; NUM_SQUARES],
+    horse_legs: [[NO_SQUARE; 4]; NUM_SQUARES],
+    rank_slide: [[0; 512]; FILE_SZ as usize],
+    rank_jump: [[0; 512]; FILE_SZ as usize],
+    file_slide: [[0; 1024]; RANK_SZ as usize],
+    file_jump: [[0; 1024]; RANK_SZ as usize],
+    file_spread: [0; 1024],
+  });
+
+  for sq in 0..NUM_SQUARES {
+    let (file, rank) = ((sq % 9) as i32, (sq / 9) as i32);
+
+    for side in [Color::Red, Color::Black] {
+      let s = side.index();
+      for (df, dr) in [(0, 1), (0, -1), (1, 0), (-1, 0)] {
+        if in_palace(file + df, rank + dr, side) {
+          t.general[s][sq] |= 1u128 << on_board(file + df, rank + dr).unwrap();
+        }
+      }
+      for (df, dr) in [(1, 1), (-1, 1), (1, -1), (-1, -1)] {
+        if in_palace(file + df, rank + dr, side) {
+          t.advisor[s][sq] |= 1u128 << on_board(file + df, rank + dr).unwrap();
+        }
+      }
+
+      let forward = if side == Color::Red { 1 } else { -1 };
+      let mut steps = vec![(0, forward)];
+      if !at_home(rank, side) {
+        steps.extend([(1, 0), (-1, 0)]);
+      }
+      for (df, dr) in steps {
+        if let Some(to) = on_board(file + df, rank + dr) {
+          t.soldier[s][sq] |= 1u128 << to;
+        }
+      }
+
+      for (bit, (df, dr)) in [(1, 1), (-1, 1), (1, -1), (-1, -1)].into_iter().enumerate() {
+        let (Some(eye), Some(to)) = (on_board(file + df, rank + dr), on_board(file + 2 * df, rank + 2 * dr)) else {
+          continue;
+        };
+        t.elephant_eyes[sq][bit] = eye as u8;
+        if !at_home(rank + 2 * dr, side) {
+          continue;
+        }
+        for blockers in 0..16 {
+          if blockers & (1 << bit) == 0 {
+            t.elephant[s][sq][blockers] |= 1u128 << to;
+          }
+        }
+      }
+    }
+
+    // Each leg blocks the two jumps that start in its direction
+    for (bit, (df, dr)) in [(0, 1), (0, -1), (1, 0), (-1, 0)].into_iter().enumerate() {
+      let Some(leg) = on_board(file + df, rank + dr) else {
+        continue;
+      };
+      t.horse_legs[sq][bit] = leg as u8;
+      let jumps = if df == 0 {
+        [(1, 2 * dr), (-1, 2 * dr)]
+      } else {
+        [(2 * df, 1), (2 * df, -1)]
+      };
+      for (jf, jr) in jumps {
+        let Some(to) = on_board(file + jf, rank + jr) else {
+          continue;
+        };
+        for blockers in 0..16 {
+          if blockers & (1 << bit) == 0 {
+            t.horse[sq][blockers] |= 1u128 << to;
+          }
+        }
+      }
+    }
+  }
+
+  for pos in 0..FILE_SZ as usize {
+    for occ in 0..512 {
+      (t.rank_slide[pos][occ], t.rank_jump[pos][occ]) = line_attacks(pos, occ, FILE_SZ as usize);
+    }
+  }
+  for pos in 0..RANK_SZ as usize {
+    for occ in 0..1024 {
+      (t.file_slide[pos][occ], t.file_jump[pos][occ]) = line_attacks(pos, occ, RANK_SZ as usize);
+    }
+  }
+  for mask in 0..1024 {
+    for rank in 0..RANK_SZ as usize {
+      if mask & (1 << rank) != 0 {
+        t.file_spread[mask] |= 1u128 << (rank * 9);
+      }
+    }
+  }
+
+  t
+}
+
+pub(crate) fn tables() -> &'static Tables {
+  static TABLES: OnceLock<Box<Tables>> = OnceLock::new();
+  TABLES.get_or_init(build_tables)
+}
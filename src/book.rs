@@ -0,0 +1,167 @@
+// Opening book.
+//
+// A book file is a 16 byte header, the magic `XQBOOK01` and the number of entries (little endian), followed by fixed
+// size entries sorted by position hash and then move, all little endian:
+//
+//   hash    u64  Zobrist key of the position, as `Board.zobrist_hash`
+//   move    u16  `from | to << 7`, squares numbered `rank * 9 + file`
+//   weight  u16  number of games the move was played in, saturating
+//   learn   u32  left for learning data, written as 0
+//
+// `Book` memory-maps the file and finds the entries of a position by binary search over the mapped entries, so opening
+// a book costs the same whatever its size and a lookup only touches the log2(n) pages the search visits.
+
+use std::fs::File;
+use std::io::{self, BufWriter, Write};
+use std::path::Path;
+
+use crate::mmap::Mmap;
+use crate::movegen::{pack_move, unpack_move};
+use crate::Board;
+
+const MAGIC: &[u8; 8] = b"XQBOOK01";
+const HEADER_LEN: usize = 16;
+const ENTRY_LEN: usize = 16;
+
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub(crate) struct Entry {
+  pub(crate) hash: u64,
+  pub(crate) mv: u16,
+  pub(crate) weight: u16,
+  pub(crate) learn: u32,
+}
+
+impl Entry {
+  fn to_bytes(self) -> [u8; ENTRY_LEN] {
+    let mut bytes = [0; ENTRY_LEN];
+    bytes[..8].copy_from_slice(&self.hash.to_le_bytes());
+    bytes[8..10].copy_from_slice(&self.mv.to_le_bytes());
+    bytes[10..12].copy_from_slice(&self.weight.to_le_bytes());
+    bytes[12..].copy_from_slice(&self.learn.to_le_bytes());
+    bytes
+  }
+
+  fn from_bytes(bytes: &[u8]) -> Entry {
+    Entry {
+      hash: u64::from_le_bytes(bytes[..8].try_into().unwrap()),
+      mv: u16::from_le_bytes(bytes[8..10].try_into().unwrap()),
+      weight: u16::from_le_bytes(bytes[10..12].try_into().unwrap()),
+      learn: u32::from_le_bytes(bytes[12..16].try_into().unwrap()),
+    }
+  }
+}
+
+// Play the first `max_ply` moves of each game from `start` and collect (position hash, packed move) for every move,
+// once per game even if a repetition plays it again so that `write` counts games. Moves are (from_file, from_rank,
+// to_file, to_rank); an illegal one fails with a message naming the game and ply.
+pub(crate) fn replay(
+  start: &Board,
+  games: &[Vec<(u8, u8, u8, u8)>],
+  max_ply: usize,
+) -> Result<Vec<(u64, u16)>, String> {
+  let mut positions = Vec::new();
+  for (game, moves) in games.iter().enumerate() {
+    let first = positions.len();
+    let mut board = start.clone();
+    for (ply, &mv) in moves.iter().take(max_ply).enumerate() {
+      let (from, to) = board
+        .legal_move(mv)
+        .ok_or_else(|| format!("game {game}, ply {ply}: {mv:?} is not a legal move"))?;
+      positions.push((board.hash, pack_move(from, to)));
+      board.apply_move(from, to);
+    }
+    let mut played = positions.split_off(first);
+    played.sort_unstable();
+    played.dedup();
+    positions.append(&mut played);
+  }
+  Ok(positions)
+}
+
+// Write the book of the (hash, move) pairs found by `replay`, keeping the moves played in at least `min_count` games.
+// Returns the number of entries written.
+pub(crate) fn write(mut positions: Vec<(u64, u16)>, min_count: u32, path: &Path) -> io::Result<usize> {
+  positions.sort_unstable();
+  let mut entries = Vec::new();
+  for run in positions.chunk_by(|a, b| a == b) {
+    if run.len() >= min_count as usize {
+      entries.push(Entry {
+        hash: run[0].0,
+        mv: run[0].1,
+        weight: u16::try_from(run.len()).unwrap_or(u16::MAX),
+        learn: 0,
+      });
+    }
+  }
+
+  let mut out = BufWriter::new(File::create(path)?);
+  out.write_all(MAGIC)?;
+  out.write_all(&(entries.len() as u64).to_le_bytes())?;
+  for entry in &entries {
+    out.write_all(&entry.to_bytes())?;
+  }
+  out.flush()?;
+  Ok(entries.len())
+}
+
+pub(crate) struct Book {
+  data: Mmap,
+  len: usize,
+}
+
+impl Book {
+  pub(crate) fn open(path: &Path) -> io::Result<Book> {
+    let data = Mmap::open(path)?;
+    let len = match data.get(8..HEADER_LEN) {
+      Some(count) if data.starts_with(MAGIC) => u64::from_le_bytes(count.try_into().unwrap()) as usize,
+      _ => return Err(io::Error::new(io::ErrorKind::InvalidData, "not an opening book file")),
+    };
+    if Some(data.len()) != len.checked_mul(ENTRY_LEN).and_then(|body| body.checked_add(HEADER_LEN)) {
+      return Err(io::Error::new(
+        io::ErrorKind::InvalidData,
+        "truncated opening book file",
+      ));
+    }
+    Ok(Book { data, len })
+  }
+
+  pub(crate) fn len(&self) -> usize {
+    self.len
+  }
+
+  fn entry(&self, i: usize) -> Entry {
+    let start = HEADER_LEN + i * ENTRY_LEN;
+    Entry::from_bytes(&self.data[start..start + ENTRY_LEN])
+  }
+
+  // Entries of the position with Zobrist key `hash`, in file order
+  pub(crate) fn lookup(&self, hash: u64) -> Vec<Entry> {
+    let (mut lo, mut hi) = (0, self.len);
+    while lo < hi {
+      let mid = lo + (hi - lo) / 2;
+      let key = u64::from_le_bytes(self.data[HEADER_LEN + mid * ENTRY_LEN..][..8].try_into().unwrap());
+      if key < hash {
+        lo = mid + 1;
+      } else {
+        hi = mid;
+      }
+    }
+    (lo..self.len)
+      .map(|i| self.entry(i))
+      .take_while(|entry| entry.hash == hash)
+      .collect()
+  }
+
+  // Book moves of `board` as (from, to) mailbox indices with their entries, most played first. Moves that aren't
+  // legal, from a hash collision or a corrupt file, are left out.
+  pub(crate) fn moves(&self, board: &Board) -> Vec<((usize, usize), Entry)> {
+    let mut moves: Vec<_> = self
+      .lookup(board.hash)
+      .into_iter()
+      .filter_map(|entry| Some((unpack_move(entry.mv)?, entry)))
+      .filter(|&((from, to), _)| board.is_pseudo_legal(from, to) && board.is_legal(from, to))
+      .collect();
+    moves.sort_by_key(|&(_, entry)| std::cmp::Reverse(entry.weight));
+    moves
+  }
+}
@@ -0,0 +1,344 @@
+// Game database.
+//
+// A database is a directory of column files, each a flat little endian array:
+//
+//   moves.u16    the moves of every game one after the other, packed as `from | to << 7` (see `movegen::pack_move`)
+//   offsets.u64  where each game starts in `moves.u16`, plus one entry for the end of the last game
+//   results.u8   the result of each game, see `RESULT_NAMES`
+//   index.u64    the number of games indexed up to each run of the position index
+//   index.N.bin  the run of the index that ends after N games: an 8 byte magic, then (position hash, game id) pairs
+//                of every position its games reached, sorted
+//
+// Games are played from the start position and are only ever appended. The moves and results go in first and the new
+// offsets last, so the offsets decide which games exist and anything beyond them, left by an append that didn't finish,
+// is overwritten by the next one.
+//
+// Each append indexes its games in a new run, merged with the runs before it that are no larger than what is being
+// merged, so the runs shrink geometrically: there are O(log n) of them and a position pair is rewritten O(log n) times
+// in all. The merged run is written to a new file and `index.u64` replaced by a rename before the runs merged into it
+// are deleted, so a reader that has the old runs mapped keeps them and one opening the database sees either list
+// whole. Games an append didn't get to index are indexed again by the next one.
+//
+// Every file is memory-mapped, so opening a database reads nothing and looking up the games that reached a position
+// is a binary search over each mapped run.
+
+use std::fs::{self, File, OpenOptions};
+use std::io::{self, BufReader, Seek, SeekFrom, Write};
+use std::path::{Path, PathBuf};
+
+use crate::mmap::Mmap;
+use crate::movegen::{pack_move, unpack_move};
+use crate::{pgn, Board};
+
+const MOVES: &str = "moves.u16";
+const OFFSETS: &str = "offsets.u64";
+const RESULTS: &str = "results.u8";
+const RUNS: &str = "index.u64";
+
+const INDEX_MAGIC: &[u8; 8] = b"XQGIDX02";
+const HEADER_LEN: usize = 8;
+// Position hash u64 and game id u32
+const ENTRY_LEN: usize = 12;
+
+// Result codes of `results.u8`, by the result string they stand for. 0 is an unknown result.
+pub(crate) const RESULT_NAMES: [&str; 3] = ["1-0", "0-1", "1/2-1/2"];
+
+pub(crate) fn result_code(result: Option<&str>) -> Result<u8, String> {
+  match result {
+    None => Ok(0),
+    Some(result) => match RESULT_NAMES.iter().position(|&name| name == result) {
+      Some(i) => Ok(i as u8 + 1),
+      None => Err(format!(
+        "unknown result {result:?}, expected one of {RESULT_NAMES:?} or None"
+      )),
+    },
+  }
+}
+
+pub(crate) fn result_name(code: u8) -> Option<&'static str> {
+  RESULT_NAMES.get((code as usize).checked_sub(1)?).copied()
+}
+
+// A game to append: its moves as (from, to) mailbox indices, legal from the start position, and its result code
+pub(crate) struct Record {
+  pub(crate) moves: Vec<(u8, u8)>,
+  pub(crate) result: u8,
+}
+
+pub(crate) struct Database {
+  dir: PathBuf,
+  moves: Mmap,
+  offsets: Mmap,
+  results: Mmap,
+  // Each run of the index with the number of games indexed up to it
+  runs: Vec<(Mmap, usize)>,
+  games: usize,
+  // Games covered by the index, the first `indexed` ones
+  indexed: usize,
+}
+
+fn invalid(what: &str) -> io::Error {
+  io::Error::new(io::ErrorKind::InvalidData, format!("corrupt game database: {what}"))
+}
+
+fn read_u64(data: &[u8], at: usize) -> u64 {
+  u64::from_le_bytes(data[at..at + 8].try_into().unwrap())
+}
+
+fn run_path(dir: &Path, games: usize) -> PathBuf {
+  dir.join(format!("index.{games}.bin"))
+}
+
+// Pairs in a run of the index
+fn run_len(run: &Mmap) -> usize {
+  (run.len() - HEADER_LEN) / ENTRY_LEN
+}
+
+fn run_entry(run: &Mmap, i: usize) -> (u64, u32) {
+  let at = HEADER_LEN + i * ENTRY_LEN;
+  let id = u32::from_le_bytes(run[at + 8..at + 12].try_into().unwrap());
+  (read_u64(run, at), id)
+}
+
+// Write `data` to `path` through a temporary file renamed over it, so that it is never seen half written
+fn replace(path: &Path, data: &[u8]) -> io::Result<()> {
+  let tmp = path.with_extension("tmp");
+  let mut file = File::create(&tmp)?;
+  file.write_all(data)?;
+  file.sync_data()?;
+  fs::rename(&tmp, path)
+}
+
+impl Database {
+  // Open the database in `dir`, creating an empty one if there is none
+  pub(crate) fn open(dir: &Path) -> io::Result<Database> {
+    fs::create_dir_all(dir)?;
+    let columns = [
+      (MOVES, &[][..]),
+      (OFFSETS, &[0; 8][..]),
+      (RESULTS, &[][..]),
+      (RUNS, &[][..]),
+    ];
+    for (name, initial) in columns {
+      if !dir.join(name).exists() {
+        fs::write(dir.join(name), initial)?;
+      }
+    }
+
+    let offsets = Mmap::open(&dir.join(OFFSETS))?;
+    let Some(games) = (offsets.len() / 8).checked_sub(1) else {
+      return Err(invalid("no offsets"));
+    };
+    let moves = Mmap::open(&dir.join(MOVES))?;
+    let results = Mmap::open(&dir.join(RESULTS))?;
+    if read_u64(&offsets, 8 * games) as usize * 2 > moves.len() || results.len() < games {
+      return Err(invalid("columns shorter than the offsets"));
+    }
+    let runs = Database::open_runs(dir, games)?;
+    let indexed = runs.last().map_or(0, |&(_, indexed)| indexed);
+    Ok(Database {
+      dir: dir.to_path_buf(),
+      moves,
+      offsets,
+      results,
+      runs,
+      games,
+      indexed,
+    })
+  }
+
+  // Map the runs listed in `RUNS`. An append by another handle may delete runs between reading the list and opening
+  // them, in which case the list it replaced is read again.
+  fn open_runs(dir: &Path, games: usize) -> io::Result<Vec<(Mmap, usize)>> {
+    let mut listed = Vec::new();
+    loop {
+      let list = fs::read(dir.join(RUNS))?;
+      let ends: Vec<usize> = list.chunks_exact(8).map(|n| read_u64(n, 0) as usize).collect();
+      if list.len() % 8 != 0 || ends.windows(2).any(|pair| pair[0] >= pair[1]) {
+        return Err(invalid("bad run list"));
+      }
+      if ends.last().is_some_and(|&n| n > games) {
+        return Err(invalid("index runs past the games"));
+      }
+      let mut runs = Vec::new();
+      for &n in &ends {
+        let run = match Mmap::open(&run_path(dir, n)) {
+          Err(err) if err.kind() == io::ErrorKind::NotFound && list != listed => break,
+          run => run?,
+        };
+        if run.len() < HEADER_LEN || !run.starts_with(INDEX_MAGIC) || (run.len() - HEADER_LEN) % ENTRY_LEN != 0 {
+          return Err(invalid("bad index run"));
+        }
+        runs.push((run, n));
+      }
+      if runs.len() == ends.len() {
+        return Ok(runs);
+      }
+      listed = list;
+    }
+  }
+
+  pub(crate) fn len(&self) -> usize {
+    self.games
+  }
+
+  // Moves of game `id` as (from, to) mailbox indices, and its result code
+  pub(crate) fn game(&self, id: usize) -> Option<(Vec<(u8, u8)>, u8)> {
+    if id >= self.games {
+      return None;
+    }
+    let (start, end) = (read_u64(&self.offsets, 8 * id), read_u64(&self.offsets, 8 * id + 8));
+    let moves = (start as usize..end as usize)
+      .map(|i| {
+        let (from, to) = unpack_move(u16::from_le_bytes([self.moves[2 * i], self.moves[2 * i + 1]]))?;
+        Some((from as u8, to as u8))
+      })
+      .collect::<Option<_>>()?;
+    Some((moves, self.results[id]))
+  }
+
+  // Ids of the games that reached the position with Zobrist key `hash`, in increasing order. Each run holds games
+  // after those of the runs before it.
+  pub(crate) fn games_with(&self, hash: u64) -> Vec<u32> {
+    let mut ids = Vec::new();
+    for (run, _) in &self.runs {
+      let (mut lo, mut hi) = (0, run_len(run));
+      while lo < hi {
+        let mid = lo + (hi - lo) / 2;
+        if run_entry(run, mid).0 < hash {
+          lo = mid + 1;
+        } else {
+          hi = mid;
+        }
+      }
+      let entries = (lo..run_len(run)).map(|i| run_entry(run, i));
+      ids.extend(entries.take_while(|&(key, _)| key == hash).map(|(_, id)| id));
+    }
+    ids
+  }
+
+  // Append `records` and index them, along with any game an earlier append left unindexed
+  pub(crate) fn append(&mut self, records: &[Record]) -> io::Result<()> {
+    let first = self.games;
+    if first + records.len() > u32::MAX as usize {
+      return Err(io::Error::other("a game database holds at most 2^32 - 1 games"));
+    }
+    if records.is_empty() && self.indexed == first {
+      return Ok(());
+    }
+    let mut positions = Vec::new();
+    for id in self.indexed..first {
+      let (moves, _) = self.game(id).ok_or_else(|| invalid("unreadable move"))?;
+      add_positions(&mut positions, id as u32, &moves);
+    }
+    for (i, record) in records.iter().enumerate() {
+      add_positions(&mut positions, (first + i) as u32, &record.moves);
+    }
+    positions.sort_unstable();
+    positions.dedup();
+
+    let mut end = read_u64(&self.offsets, 8 * first);
+    let mut offsets = Vec::with_capacity(records.len());
+    let mut moves = Vec::new();
+    for record in records {
+      for &(from, to) in &record.moves {
+        moves.extend(pack_move(from as usize, to as usize).to_le_bytes());
+      }
+      end += record.moves.len() as u64;
+      offsets.extend(end.to_le_bytes());
+    }
+    let results: Vec<u8> = records.iter().map(|record| record.result).collect();
+    append_at(&self.dir.join(MOVES), 2 * read_u64(&self.offsets, 8 * first), &moves)?;
+    append_at(&self.dir.join(RESULTS), first as u64, &results)?;
+    append_at(&self.dir.join(OFFSETS), 8 * (first as u64 + 1), &offsets)?;
+
+    // Merge the runs at the end that are no larger than the new one into it
+    let mut kept = self.runs.len();
+    let mut run = positions;
+    while kept > 0 && run_len(&self.runs[kept - 1].0) <= run.len() {
+      let old = &self.runs[kept - 1].0;
+      run = merge_sorted((0..run_len(old)).map(|i| run_entry(old, i)), run.into_iter()).collect();
+      kept -= 1;
+    }
+    let mut data = Vec::with_capacity(HEADER_LEN + run.len() * ENTRY_LEN);
+    data.extend(INDEX_MAGIC);
+    for (hash, id) in run {
+      data.extend(hash.to_le_bytes());
+      data.extend(id.to_le_bytes());
+    }
+    let indexed = first + records.len();
+    replace(&run_path(&self.dir, indexed), &data)?;
+    let mut list = Vec::with_capacity(8 * (kept + 1));
+    for n in self.runs[..kept].iter().map(|&(_, n)| n).chain([indexed]) {
+      list.extend((n as u64).to_le_bytes());
+    }
+    replace(&self.dir.join(RUNS), &list)?;
+    for &(_, n) in &self.runs[kept..] {
+      // A run that fails to be deleted is only left behind unused
+      let _ = fs::remove_file(run_path(&self.dir, n));
+    }
+
+    *self = Database::open(&self.dir)?;
+    Ok(())
+  }
+}
+
+// Games appended at a time by `append_pgn`, which bounds the memory an import takes
+const PGN_BATCH: usize = 1 << 16;
+
+impl Database {
+  // Append the games of a PGN file that start from the start position and replay to the end. Returns how many.
+  pub(crate) fn append_pgn(&mut self, path: &Path) -> io::Result<usize> {
+    let start = Board::new();
+    let mut games = pgn::Reader::new(BufReader::new(File::open(path)?), false);
+    let mut added = 0;
+    loop {
+      let mut records = Vec::with_capacity(PGN_BATCH);
+      for game in games.by_ref() {
+        let game = game?;
+        if game.error.is_none() && game.start.board == start.board && game.start.turn == start.turn {
+          records.push(Record {
+            moves: game.moves,
+            result: result_code(game.result).unwrap(),
+          });
+        }
+        if records.len() == PGN_BATCH {
+          break;
+        }
+      }
+      if records.is_empty() {
+        return Ok(added);
+      }
+      self.append(&records)?;
+      added += records.len();
+    }
+  }
+}
+
+// Add (hash, id) for the start position of a game and every position after one of its moves
+fn add_positions(positions: &mut Vec<(u64, u32)>, id: u32, moves: &[(u8, u8)]) {
+  let mut board = Board::new();
+  positions.push((board.hash, id));
+  for &(from, to) in moves {
+    board.apply_move(from as usize, to as usize);
+    positions.push((board.hash, id));
+  }
+}
+
+// Truncate the file at `path` to `len` bytes, dropping what an unfinished append left, and append `data`
+fn append_at(path: &Path, len: u64, data: &[u8]) -> io::Result<()> {
+  let mut file = OpenOptions::new().write(true).open(path)?;
+  file.set_len(len)?;
+  file.seek(SeekFrom::Start(len))?;
+  file.write_all(data)?;
+  file.sync_data()
+}
+
+fn merge_sorted<T: Ord>(a: impl Iterator<Item = T>, b: impl Iterator<Item = T>) -> impl Iterator<Item = T> {
+  let (mut a, mut b) = (a.peekable(), b.peekable());
+  std::iter::from_fn(move || match (a.peek(), b.peek()) {
+    (Some(x), Some(y)) if x <= y => a.next(),
+    (Some(_), None) => a.next(),
+    _ => b.next(),
+  })
+}
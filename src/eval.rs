@@ -0,0 +1,258 @@
+// Static evaluation: tapered material plus piece-square tables.
+//
+// Every piece contributes a middlegame and an endgame score, its material plus a bonus for its square. The two totals
+// are blended by the game phase, which falls from `TOTAL_PHASE` to 0 as chariots, horses and cannons come off. The
+// totals are kept in `Board` and updated on every piece placed, moved or captured, so evaluating a position is a
+// single blend instead of a scan of the board.
+//
+// All tables are looked up by the mailbox encoding of the piece (`Piece::to_u8`) and by square, with black's entries
+// mirrored and negated, so an update is one table read with no decoding of the piece.
+
+use crate::bitboard::{piece_index, NUM_SQUARES};
+use crate::{Board, Color, Piece, PieceType};
+
+// Indexed by `piece_index`. The general is never captured, so it carries no material.
+pub(crate) const PIECE_VALUES: [i32; 7] = [0, 200, 200, 400, 900, 450, 100];
+const ENDGAME_VALUES: [i32; 7] = [0, 180, 180, 450, 950, 400, 130];
+
+// Contribution of each piece type to the game phase
+const PHASE_WEIGHTS: [i32; 7] = [0, 0, 0, 1, 2, 1, 0];
+pub(crate) const TOTAL_PHASE: i32 = 16;
+
+// Square bonuses for red, drawn as the board is seen from red's side: the first row is rank 9 (black's back rank),
+// the last row is rank 0. Black uses the same tables mirrored.
+#[rustfmt::skip]
+const GENERAL_MG: [i32; NUM_SQUARES] = [
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0, -15, -15, -15,   0,   0,   0,
+    0,   0,   0,  -8,  -8,  -8,   0,   0,   0,
+    0,   0,   0,   1,   5,   1,   0,   0,   0,
+];
+
+#[rustfmt::skip]
+const GENERAL_EG: [i32; NUM_SQUARES] = [
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,  -2,   0,  -2,   0,   0,   0,
+    0,   0,   0,   2,   4,   2,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+];
+
+#[rustfmt::skip]
+const ADVISOR: [i32; NUM_SQUARES] = [
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,  -2,   0,  -2,   0,   0,   0,
+    0,   0,   0,   0,   3,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+];
+
+#[rustfmt::skip]
+const ELEPHANT: [i32; NUM_SQUARES] = [
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,  -2,   0,   0,   0,  -2,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+   -2,   0,   0,   0,   3,   0,   0,   0,  -2,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+];
+
+#[rustfmt::skip]
+const HORSE: [i32; NUM_SQUARES] = [
+    4,   8,  16,  12,   4,  12,  16,   8,   4,
+    4,  10,  28,  16,   8,  16,  28,  10,   4,
+   12,  14,  16,  20,  18,  20,  16,  14,  12,
+    8,  24,  18,  24,  20,  24,  18,  24,   8,
+    6,  16,  14,  18,  16,  18,  14,  16,   6,
+    4,  12,  16,  14,  12,  14,  16,  12,   4,
+    2,   6,   8,   6,  10,   6,   8,   6,   2,
+    4,   2,   8,   8,   4,   8,   8,   2,   4,
+    0,   2,   4,   4,  -2,   4,   4,   2,   0,
+    0,  -4,   0,   0,   0,   0,   0,  -4,   0,
+];
+
+#[rustfmt::skip]
+const CHARIOT: [i32; NUM_SQUARES] = [
+   14,  14,  12,  18,  16,  18,  12,  14,  14,
+   16,  20,  18,  24,  26,  24,  18,  20,  16,
+   12,  12,  12,  18,  18,  18,  12,  12,  12,
+   12,  18,  16,  22,  22,  22,  16,  18,  12,
+   12,  14,  12,  18,  18,  18,  12,  14,  12,
+   12,  16,  14,  20,  20,  20,  14,  16,  12,
+    6,  10,   8,  14,  14,  14,   8,  10,   6,
+    4,   8,   6,  14,  12,  14,   6,   8,   4,
+    8,   4,   8,  16,   8,  16,   8,   4,   8,
+   -2,  10,   6,  14,  12,  14,   6,  10,  -2,
+];
+
+#[rustfmt::skip]
+const CANNON: [i32; NUM_SQUARES] = [
+    6,   4,   0, -10, -12, -10,   0,   4,   6,
+    2,   2,   0,  -4, -14,  -4,   0,   2,   2,
+    2,   2,   0, -10,  -8, -10,   0,   2,   2,
+    0,   0,  -2,   4,  10,   4,  -2,   0,   0,
+    0,   0,   0,   2,   8,   2,   0,   0,   0,
+   -2,   0,   4,   2,   6,   2,   4,   0,  -2,
+    0,   0,   0,   2,   4,   2,   0,   0,   0,
+    4,   0,   8,   6,  10,   6,   8,   0,   4,
+    0,   2,   4,   6,   6,   6,   4,   2,   0,
+    0,   0,   2,   6,   6,   6,   2,   0,   0,
+];
+
+#[rustfmt::skip]
+const SOLDIER_MG: [i32; NUM_SQUARES] = [
+    0,   3,   6,   9,  12,   9,   6,   3,   0,
+  120, 130, 150, 160, 170, 160, 150, 130, 120,
+  120, 127, 145, 155, 160, 155, 145, 127, 120,
+  120, 127, 130, 140, 142, 140, 130, 127, 120,
+  110, 118, 122, 135, 140, 135, 122, 118, 110,
+    3,   0,   4,   0,   7,   0,   4,   0,   3,
+   -2,   0,  -2,   0,   6,   0,  -2,   0,  -2,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+];
+
+#[rustfmt::skip]
+const SOLDIER_EG: [i32; NUM_SQUARES] = [
+   10,  15,  20,  25,  30,  25,  20,  15,  10,
+  140, 150, 165, 175, 180, 175, 165, 150, 140,
+  140, 150, 160, 170, 175, 170, 160, 150, 140,
+  140, 145, 150, 160, 160, 160, 150, 145, 140,
+  130, 135, 140, 150, 150, 150, 140, 135, 130,
+   10,   0,  10,   0,  15,   0,  10,   0,  10,
+    0,   0,   0,   0,  10,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+    0,   0,   0,   0,   0,   0,   0,   0,   0,
+];
+
+// Indexed by `piece_index`
+const SQUARE_BONUS_MG: [&[i32; NUM_SQUARES]; 7] =
+  [&GENERAL_MG, &ADVISOR, &ELEPHANT, &HORSE, &CHARIOT, &CANNON, &SOLDIER_MG];
+const SQUARE_BONUS_EG: [&[i32; NUM_SQUARES]; 7] =
+  [&GENERAL_EG, &ADVISOR, &ELEPHANT, &HORSE, &CHARIOT, &CANNON, &SOLDIER_EG];
+
+// Mailbox piece codes run up to black soldier, 0x17
+const PIECE_CODES: usize = 0x18;
+
+// Signed (middlegame, endgame) score of each piece code on each square, positive for red
+const SQUARE_SCORES: [[(i32, i32); NUM_SQUARES]; PIECE_CODES] = {
+  const PIECE_TYPES: [PieceType; 7] = [
+    PieceType::General,
+    PieceType::Advisor,
+    PieceType::Elephant,
+    PieceType::Horse,
+    PieceType::Chariot,
+    PieceType::Cannon,
+    PieceType::Soldier,
+  ];
+  let mut scores = [[(0, 0); NUM_SQUARES]; PIECE_CODES];
+  let mut t = 0;
+  while t < 7 {
+    let i = piece_index(PIECE_TYPES[t]);
+    let mut sq = 0;
+    while sq < NUM_SQUARES {
+      let (file, rank) = (sq % 9, sq / 9);
+      let red = (9 - rank) * 9 + file;
+      let black = rank * 9 + file;
+      let code = Piece::new(PIECE_TYPES[t], Color::Red).to_u8() as usize;
+      scores[code][sq] = (
+        PIECE_VALUES[i] + SQUARE_BONUS_MG[i][red],
+        ENDGAME_VALUES[i] + SQUARE_BONUS_EG[i][red],
+      );
+      let code = Piece::new(PIECE_TYPES[t], Color::Black).to_u8() as usize;
+      scores[code][sq] = (
+        -PIECE_VALUES[i] - SQUARE_BONUS_MG[i][black],
+        -ENDGAME_VALUES[i] - SQUARE_BONUS_EG[i][black],
+      );
+      sq += 1;
+    }
+    t += 1;
+  }
+  scores
+};
+
+// Phase weight of each piece code
+const PHASES: [i32; PIECE_CODES] = {
+  let mut phases = [0; PIECE_CODES];
+  let mut i = 0;
+  while i < 7 {
+    phases[i + 1] = PHASE_WEIGHTS[i];
+    phases[i + 1 + 0x10] = PHASE_WEIGHTS[i];
+    i += 1;
+  }
+  phases
+};
+
+#[inline]
+pub(crate) fn piece_value(piece_type: PieceType) -> i32 {
+  PIECE_VALUES[piece_index(piece_type)]
+}
+
+// Running evaluation terms of a position, red minus black
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+pub(crate) struct Eval {
+  mg: i32,
+  eg: i32,
+  phase: i32,
+}
+
+impl Eval {
+  // Account for the piece encoded as `code` arriving on square `sq`
+  #[inline]
+  pub(crate) fn add(&mut self, code: u8, sq: usize) {
+    let (mg, eg) = SQUARE_SCORES[code as usize][sq];
+    self.mg += mg;
+    self.eg += eg;
+    self.phase += PHASES[code as usize];
+  }
+
+  // Account for the piece encoded as `code` leaving square `sq`
+  #[inline]
+  pub(crate) fn remove(&mut self, code: u8, sq: usize) {
+    let (mg, eg) = SQUARE_SCORES[code as usize][sq];
+    self.mg -= mg;
+    self.eg -= eg;
+    self.phase -= PHASES[code as usize];
+  }
+
+  // Blend of the middlegame and endgame scores, in centipawns for `side`
+  #[inline]
+  pub(crate) fn score(&self, side: Color) -> i32 {
+    let phase = self.phase.clamp(0, TOTAL_PHASE);
+    let score = (self.mg * phase + self.eg * (TOTAL_PHASE - phase)) / TOTAL_PHASE;
+    match side {
+      Color::Red => score,
+      Color::Black => -score,
+    }
+  }
+}
+
+impl Board {
+  // Evaluation in centipawns for the side to move
+  #[inline]
+  pub(crate) fn evaluate_position(&self) -> i32 {
+    self.eval.score(self.turn)
+  }
+}
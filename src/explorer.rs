@@ -0,0 +1,319 @@
+// Opening explorer.
+//
+// For every position of an archive, up to some ply, the explorer counts how often each move was played and how the
+// games that played it ended. Counting is a map-reduce: worker threads pull shards of the input (runs of games of a
+// `GameDatabase`, or whole PGN files) from a shared counter, replay them and count into a hash map of their own, which
+// they hand back as a sorted run whenever it grows large. The runs are then sorted together and equal keys summed.
+//
+// The result is written as a file of fixed-size entries sorted by position hash and then move, after a 40 byte header:
+// the magic `XQEXPL02`, the number of entries, the number of games counted, how many games of a database are covered
+// and the ply the games were counted up to, all u64 little endian. Each entry is
+//
+//   hash       u64  Zobrist key of the position
+//   move       u16  `from | to << 7`, squares numbered `rank * 9 + file`
+//   games      u32  games that played the move here
+//   red_wins   u32
+//   draws      u32
+//   black_wins u32
+//
+// Games without a result count towards `games` only. An update merges new counts into the entries of the existing file
+// as it streams through them, so only the new games are replayed. Lookups are a binary search over the mapped file.
+
+use std::collections::HashMap;
+use std::fs::{self, File};
+use std::io::{self, BufReader, BufWriter, Seek, SeekFrom, Write};
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::Mutex;
+use std::thread;
+
+use crate::database::Database;
+use crate::mmap::Mmap;
+use crate::movegen::{pack_move, unpack_move};
+use crate::{pgn, Board};
+
+const MAGIC: &[u8; 8] = b"XQEXPL02";
+const HEADER_LEN: usize = 40;
+const ENTRY_LEN: usize = 26;
+// Games of a database replayed per task
+const CHUNK: usize = 4096;
+// Keys a worker counts before handing its map back as a sorted run
+const RUN_LEN: usize = 1 << 20;
+
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+pub(crate) struct Counts {
+  pub(crate) games: u32,
+  pub(crate) red_wins: u32,
+  pub(crate) draws: u32,
+  pub(crate) black_wins: u32,
+}
+
+impl Counts {
+  // One game with result code `result`, as stored by `database`
+  fn game(result: u8) -> Counts {
+    Counts {
+      games: 1,
+      red_wins: (result == 1) as u32,
+      black_wins: (result == 2) as u32,
+      draws: (result == 3) as u32,
+    }
+  }
+
+  // (games, red_wins, draws, black_wins)
+  pub(crate) fn as_tuple(self) -> (u32, u32, u32, u32) {
+    (self.games, self.red_wins, self.draws, self.black_wins)
+  }
+
+  pub(crate) fn add(&mut self, other: Counts) {
+    self.games = self.games.saturating_add(other.games);
+    self.red_wins = self.red_wins.saturating_add(other.red_wins);
+    self.draws = self.draws.saturating_add(other.draws);
+    self.black_wins = self.black_wins.saturating_add(other.black_wins);
+  }
+}
+
+type Key = (u64, u16);
+
+// Where the games to count come from
+pub(crate) enum Source<'a> {
+  // Games `from..` of a database
+  Database(&'a Database, usize),
+  Pgn(&'a [PathBuf]),
+}
+
+// Per-thread counters, flushed to sorted runs
+struct Counter {
+  map: HashMap<Key, Counts>,
+  runs: Vec<Vec<(Key, Counts)>>,
+  max_ply: usize,
+  games: u64,
+}
+
+impl Counter {
+  fn count(&mut self, start: &Board, moves: &[(u8, u8)], result: u8) {
+    let mut board = start.clone();
+    for &(from, to) in moves.iter().take(self.max_ply) {
+      let key = (board.hash, pack_move(from as usize, to as usize));
+      self.map.entry(key).or_default().add(Counts::game(result));
+      board.apply_move(from as usize, to as usize);
+    }
+    self.games += 1;
+    if self.map.len() >= RUN_LEN {
+      self.flush();
+    }
+  }
+
+  fn flush(&mut self) {
+    let mut run: Vec<_> = self.map.drain().collect();
+    run.sort_unstable_by_key(|&(key, _)| key);
+    self.runs.push(run);
+  }
+}
+
+// Count the moves of the first `max_ply` plies of every game of `source` on `threads` threads. Returns the summed counts
+// sorted by key, and the number of games counted.
+pub(crate) fn count(source: &Source, max_ply: usize, threads: usize) -> io::Result<(Vec<(Key, Counts)>, u64)> {
+  let threads = match threads {
+    0 => thread::available_parallelism().map_or(1, |n| n.get()),
+    n => n,
+  };
+  let tasks = match *source {
+    Source::Database(db, from) => db.len().saturating_sub(from).div_ceil(CHUNK),
+    Source::Pgn(paths) => paths.len(),
+  };
+  let next = AtomicUsize::new(0);
+  let runs = Mutex::new(Vec::new());
+  let mut games = 0;
+  let start = Board::new();
+
+  let results: Vec<io::Result<u64>> = thread::scope(|s| {
+    let workers: Vec<_> = (0..threads.min(tasks).max(1))
+      .map(|_| {
+        s.spawn(|| -> io::Result<u64> {
+          let mut counter = Counter {
+            map: HashMap::new(),
+            runs: Vec::new(),
+            max_ply,
+            games: 0,
+          };
+          loop {
+            let task = next.fetch_add(1, Ordering::Relaxed);
+            if task >= tasks {
+              break;
+            }
+            match *source {
+              Source::Database(db, from) => {
+                for id in from + task * CHUNK..(from + (task + 1) * CHUNK).min(db.len()) {
+                  let Some((moves, result)) = db.game(id) else {
+                    return Err(io::Error::other(format!("unreadable game {id}")));
+                  };
+                  counter.count(&start, &moves, result);
+                }
+              },
+              Source::Pgn(paths) => {
+                for game in pgn::Reader::new(BufReader::new(File::open(&paths[task])?), false) {
+                  let game = game?;
+                  let result = crate::database::result_code(game.result).unwrap();
+                  counter.count(&game.start, &game.moves, result);
+                }
+              },
+            }
+          }
+          counter.flush();
+          runs.lock().unwrap().append(&mut counter.runs);
+          Ok(counter.games)
+        })
+      })
+      .collect();
+    workers.into_iter().map(|worker| worker.join().unwrap()).collect()
+  });
+  for result in results {
+    games += result?;
+  }
+
+  // Reduce: sort the runs together and sum equal keys
+  let mut entries: Vec<(Key, Counts)> = runs.into_inner().unwrap().into_iter().flatten().collect();
+  entries.sort_unstable_by_key(|&(key, _)| key);
+  let mut merged: Vec<(Key, Counts)> = Vec::with_capacity(entries.len());
+  for (key, counts) in entries {
+    match merged.last_mut() {
+      Some((last, total)) if *last == key => total.add(counts),
+      _ => merged.push((key, counts)),
+    }
+  }
+  Ok((merged, games))
+}
+
+pub(crate) struct Explorer {
+  data: Mmap,
+  len: usize,
+  games: u64,
+  database_games: u64,
+  max_ply: u64,
+}
+
+impl Explorer {
+  pub(crate) fn open(path: &Path) -> io::Result<Explorer> {
+    let data = Mmap::open(path)?;
+    let invalid = |what| io::Error::new(io::ErrorKind::InvalidData, what);
+    if data.len() < HEADER_LEN || !data.starts_with(MAGIC) {
+      return Err(invalid("not an opening explorer file"));
+    }
+    let header = |i: usize| u64::from_le_bytes(data[8 * i..8 * i + 8].try_into().unwrap());
+    let (len, games, database_games, max_ply) = (header(1) as usize, header(2), header(3), header(4));
+    if Some(data.len()) != len.checked_mul(ENTRY_LEN).and_then(|body| body.checked_add(HEADER_LEN)) {
+      return Err(invalid("truncated opening explorer file"));
+    }
+    Ok(Explorer {
+      data,
+      len,
+      games,
+      database_games,
+      max_ply,
+    })
+  }
+
+  // Games counted into the file
+  pub(crate) fn games(&self) -> u64 {
+    self.games
+  }
+
+  // Games of a database counted, an update from the database starts after them
+  pub(crate) fn database_games(&self) -> usize {
+    self.database_games as usize
+  }
+
+  // Ply the games were counted up to, which an update has to keep
+  pub(crate) fn max_ply(&self) -> usize {
+    self.max_ply as usize
+  }
+
+  fn entry(&self, i: usize) -> (Key, Counts) {
+    let e = &self.data[HEADER_LEN + i * ENTRY_LEN..][..ENTRY_LEN];
+    let u32_at = |at: usize| u32::from_le_bytes(e[at..at + 4].try_into().unwrap());
+    let hash = u64::from_le_bytes(e[..8].try_into().unwrap());
+    let key = (hash, u16::from_le_bytes([e[8], e[9]]));
+    let counts = Counts {
+      games: u32_at(10),
+      red_wins: u32_at(14),
+      draws: u32_at(18),
+      black_wins: u32_at(22),
+    };
+    (key, counts)
+  }
+
+  fn entries(&self) -> impl Iterator<Item = (Key, Counts)> + '_ {
+    (0..self.len).map(|i| self.entry(i))
+  }
+
+  // Moves played in `board` as (from, to) mailbox indices with their counts, most played first. Moves that aren't
+  // legal, from a hash collision, are left out.
+  pub(crate) fn moves(&self, board: &Board) -> Vec<((usize, usize), Counts)> {
+    let (mut lo, mut hi) = (0, self.len);
+    while lo < hi {
+      let mid = lo + (hi - lo) / 2;
+      if self.entry(mid).0 .0 < board.hash {
+        lo = mid + 1;
+      } else {
+        hi = mid;
+      }
+    }
+    let mut moves: Vec<_> = (lo..self.len)
+      .map(|i| self.entry(i))
+      .take_while(|&((hash, _), _)| hash == board.hash)
+      .filter_map(|((_, mv), counts)| Some((unpack_move(mv)?, counts)))
+      .filter(|&((from, to), _)| board.is_pseudo_legal(from, to) && board.is_legal(from, to))
+      .collect();
+    moves.sort_by_key(|&(_, counts)| std::cmp::Reverse(counts.games));
+    moves
+  }
+}
+
+// Write the explorer file `path` from `counts`, sorted by key, summed with the entries of `previous` if given
+pub(crate) fn write(
+  path: &Path,
+  counts: Vec<(Key, Counts)>,
+  games: u64,
+  database_games: u64,
+  max_ply: usize,
+  previous: Option<&Explorer>,
+) -> io::Result<()> {
+  let mut old = previous.into_iter().flat_map(Explorer::entries).peekable();
+  let mut new = counts.into_iter().peekable();
+  let merged = std::iter::from_fn(|| match (old.peek(), new.peek()) {
+    (Some((a, _)), Some((b, _))) if a == b => {
+      let (key, mut counts) = old.next().unwrap();
+      counts.add(new.next().unwrap().1);
+      Some((key, counts))
+    },
+    (Some((a, _)), Some((b, _))) if a < b => old.next(),
+    (Some(_), None) => old.next(),
+    _ => new.next(),
+  });
+
+  // The entry count goes in the header once known, the file is renamed into place when complete
+  let tmp = path.with_extension("tmp");
+  let file = File::create(&tmp)?;
+  let mut out = BufWriter::new(&file);
+  out.write_all(&[0; HEADER_LEN])?;
+  let mut len = 0u64;
+  for ((hash, mv), counts) in merged {
+    out.write_all(&hash.to_le_bytes())?;
+    out.write_all(&mv.to_le_bytes())?;
+    for n in [counts.games, counts.red_wins, counts.draws, counts.black_wins] {
+      out.write_all(&n.to_le_bytes())?;
+    }
+    len += 1;
+  }
+  out.flush()?;
+  drop(out);
+  let mut header = Vec::with_capacity(HEADER_LEN);
+  header.extend_from_slice(MAGIC);
+  for n in [len, games, database_games, max_ply as u64] {
+    header.extend_from_slice(&n.to_le_bytes());
+  }
+  (&file).seek(SeekFrom::Start(0))?;
+  (&file).write_all(&header)?;
+  file.sync_all()?;
+  fs::rename(&tmp, path)
+}
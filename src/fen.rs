@@ -0,0 +1,138 @@
+// FEN parsing and serialization.
+//
+// Ranks are listed from black's back rank (rank 9) down to red's (rank 0), files from a to i. Red pieces are upper
+// case: K general, A advisor, B elephant, N horse, R chariot, C cannon, P soldier; E and H are accepted for elephant
+// and horse. Digits count empty squares. The side to move is `w` (or `r`) for red and `b` for black. The move
+// counters that may follow are accepted but not tracked.
+
+use crate::{pos_to_idx, zobrist, Backend, Board, Color, Piece, PieceType, FILE_SZ, RANK_SZ};
+
+pub const START_FEN: &str = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1";
+
+pub(crate) fn piece_from_char(c: char) -> Option<Piece> {
+  let piece_type = match c.to_ascii_uppercase() {
+    'K' => PieceType::General,
+    'A' => PieceType::Advisor,
+    'B' | 'E' => PieceType::Elephant,
+    'N' | 'H' => PieceType::Horse,
+    'R' => PieceType::Chariot,
+    'C' => PieceType::Cannon,
+    'P' => PieceType::Soldier,
+    _ => return None,
+  };
+  let side = if c.is_ascii_uppercase() {
+    Color::Red
+  } else {
+    Color::Black
+  };
+  Some(Piece::new(piece_type, side))
+}
+
+pub(crate) fn piece_to_char(piece: Piece) -> char {
+  let c = match piece.piece_type {
+    PieceType::General => 'K',
+    PieceType::Advisor => 'A',
+    PieceType::Elephant => 'B',
+    PieceType::Horse => 'N',
+    PieceType::Chariot => 'R',
+    PieceType::Cannon => 'C',
+    PieceType::Soldier => 'P',
+  };
+  match piece.color {
+    Color::Red => c,
+    Color::Black => c.to_ascii_lowercase(),
+  }
+}
+
+impl Board {
+  pub(crate) fn parse_fen(fen: &str, backend: Backend) -> Result<Board, String> {
+    let mut fields = fen.split_ascii_whitespace();
+    let placement = fields.next().ok_or("empty FEN")?;
+
+    let mut game = Board::empty();
+    game.backend = backend;
+
+    let ranks: Vec<&str> = placement.split('/').collect();
+    if ranks.len() != RANK_SZ as usize {
+      return Err(format!("expected {RANK_SZ} ranks, got {}", ranks.len()));
+    }
+    for (row, rank_str) in ranks.iter().enumerate() {
+      let rank = RANK_SZ - 1 - row as u8;
+      let mut file = 0u8;
+      for c in rank_str.chars() {
+        if let Some(skip) = c.to_digit(10) {
+          file = file
+            .checked_add(skip as u8)
+            .filter(|&file| file <= FILE_SZ)
+            .ok_or_else(|| format!("rank {} has more than {FILE_SZ} files", rank + 1))?;
+          continue;
+        }
+        let piece = piece_from_char(c).ok_or_else(|| format!("invalid piece {c:?}"))?;
+        if file >= FILE_SZ {
+          return Err(format!("rank {} has more than {FILE_SZ} files", rank + 1));
+        }
+        game
+          .set_piece(file, rank, piece.piece_type, piece.color)
+          .ok_or_else(|| format!("too many {:?} pieces", piece.color))?;
+        file += 1;
+      }
+      if file != FILE_SZ {
+        return Err(format!("rank {} has {file} files, expected {FILE_SZ}", rank + 1));
+      }
+    }
+
+    match fields.next() {
+      None | Some("w") | Some("r") => {},
+      Some("b") => {
+        game.turn = Color::Black;
+        game.hash ^= zobrist::SIDE_KEY;
+      },
+      Some(side) => return Err(format!("invalid side to move {side:?}")),
+    }
+
+    Ok(game)
+  }
+
+  pub(crate) fn to_fen(&self) -> String {
+    let mut fen = String::with_capacity(96);
+    for rank in (0..RANK_SZ).rev() {
+      let mut empty = 0;
+      for file in 0..FILE_SZ {
+        match Piece::from_u8(self.board[pos_to_idx(file, rank).unwrap()]) {
+          Some(piece) => {
+            if empty > 0 {
+              fen.push(char::from(b'0' + empty));
+              empty = 0;
+            }
+            fen.push(piece_to_char(piece));
+          },
+          None => empty += 1,
+        }
+      }
+      if empty > 0 {
+        fen.push(char::from(b'0' + empty));
+      }
+      if rank > 0 {
+        fen.push('/');
+      }
+    }
+    fen.push_str(match self.turn {
+      Color::Red => " w - - 0 1",
+      Color::Black => " b - - 0 1",
+    });
+    fen
+  }
+}
+
+// Parse one FEN per non-empty line
+pub(crate) fn parse_lines<'a>(lines: impl Iterator<Item = &'a str>, backend: Backend) -> Result<Vec<Board>, String> {
+  let mut boards = Vec::new();
+  for (lineno, line) in lines.enumerate() {
+    let line = line.trim();
+    if line.is_empty() {
+      continue;
+    }
+    boards.push(Board::parse_fen(line, backend).map_err(|e| format!("line {}: {e}", lineno + 1))?);
+  }
+  Ok(boards)
+}
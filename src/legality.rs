@@ -0,0 +1,160 @@
+// Check detection and legal move filtering.
+//
+// A move is legal when, after playing it, the mover's general is not attacked. Attacks are found by looking
+// outwards from the general's square: along the four lines for chariots, cannons and the enemy general (the two
+// generals may not face each other on an open file), at the eight horse squares whose leg is free, and at the three
+// squares an enemy soldier could step in from.
+
+use crate::movegen::{HOME, HORSE_JUMPS, ORTHOGONAL};
+use crate::{pos_to_idx, Board, Color, Piece, PieceType, EMPTY, OUT_OF_BOUNDS};
+
+// (offset from the general to an attacking horse, offset from the general to that horse's leg)
+pub(crate) const HORSE_CHECKS: [(isize, isize); 8] = {
+  let mut checks = [(0, 0); 8];
+  let mut i = 0;
+  while i < 8 {
+    let (jump, leg) = HORSE_JUMPS[i];
+    checks[i] = (-jump, leg - jump);
+    i += 1;
+  }
+  checks
+};
+
+// Whether the general of `side` standing on `general` is attacked in `board`
+pub(crate) fn attacked(board: &[u8; 144], general: usize, side: Color) -> bool {
+  let enemy = side.other();
+  let g = general as isize;
+  let is = |idx: isize, piece_type: PieceType| board[idx as usize] == Piece::new(piece_type, enemy).to_u8();
+
+  for d in ORTHOGONAL {
+    let mut sq = g + d;
+    while board[sq as usize] == EMPTY {
+      sq += d;
+    }
+    if board[sq as usize] == OUT_OF_BOUNDS {
+      continue;
+    }
+    if is(sq, PieceType::Chariot) || (d.abs() == 12 && is(sq, PieceType::General)) {
+      return true;
+    }
+    sq += d;
+    while board[sq as usize] == EMPTY {
+      sq += d;
+    }
+    if is(sq, PieceType::Cannon) {
+      return true;
+    }
+  }
+
+  for (d, leg) in HORSE_CHECKS {
+    if board[(g + leg) as usize] == EMPTY && is(g + d, PieceType::Horse) {
+      return true;
+    }
+  }
+
+  if is(g - enemy.forward(), PieceType::Soldier) {
+    return true;
+  }
+  for d in [1, -1] {
+    if is(g + d, PieceType::Soldier) && !HOME[enemy.index()][(g + d) as usize] {
+      return true;
+    }
+  }
+
+  false
+}
+
+// Filters pseudo-legal moves of the side to move. Unless the general is already in check, a move can only expose it
+// if the general moves, if the move leaves or enters the general's rank or file (chariot, cannon screen and flying
+// general lines) or if it leaves a horse leg square diagonally next to the general. Only those moves are played out
+// on a scratch copy of the mailbox.
+pub(crate) struct LegalFilter {
+  board: [u8; 144],
+  general: Option<usize>,
+  side: Color,
+  in_check: bool,
+}
+
+impl LegalFilter {
+  pub(crate) fn new(game: &Board) -> Self {
+    let general = game.general_idx(game.turn);
+    LegalFilter {
+      board: game.board,
+      general,
+      side: game.turn,
+      in_check: general.is_some_and(|g| attacked(&game.board, g, game.turn)),
+    }
+  }
+
+  pub(crate) fn is_legal(&mut self, from: usize, to: usize) -> bool {
+    let Some(general) = self.general else {
+      return true;
+    };
+    let same_line = |sq: usize| sq % 12 == general % 12 || sq / 12 == general / 12;
+    let diagonal = (from as isize - general as isize).abs();
+    if !self.in_check && from != general && !same_line(from) && !same_line(to) && diagonal != 11 && diagonal != 13 {
+      return true;
+    }
+
+    let general = if general == from { to } else { general };
+    let captured = self.board[to];
+    self.board[to] = self.board[from];
+    self.board[from] = EMPTY;
+    let exposed = attacked(&self.board, general, self.side);
+    self.board[from] = self.board[to];
+    self.board[to] = captured;
+    !exposed
+  }
+}
+
+impl Board {
+  // Mailbox index of the general of `side`, if it has one
+  pub(crate) fn general_idx(&self, side: Color) -> Option<usize> {
+    self.bitboards.general_square(side).map(crate::bitboard::sq_to_idx)
+  }
+
+  pub(crate) fn in_check(&self, side: Color) -> bool {
+    self
+      .general_idx(side)
+      .is_some_and(|general| attacked(&self.board, general, side))
+  }
+
+  // Whether the pseudo-legal move `from` -> `to` attacks the enemy general
+  pub(crate) fn gives_check(&self, from: usize, to: usize) -> bool {
+    let enemy = self.turn.other();
+    let Some(general) = self.general_idx(enemy) else {
+      return false;
+    };
+    let mut board = self.board;
+    board[to] = board[from];
+    board[from] = EMPTY;
+    attacked(&board, general, enemy)
+  }
+
+  // Whether the pseudo-legal move `from` -> `to` keeps the mover's general safe
+  pub(crate) fn is_legal(&self, from: usize, to: usize) -> bool {
+    LegalFilter::new(self).is_legal(from, to)
+  }
+
+  // Mailbox indices of a (from_file, from_rank, to_file, to_rank) move, if it is legal in this position
+  pub(crate) fn legal_move(&self, mv: (u8, u8, u8, u8)) -> Option<(usize, usize)> {
+    let (from, to) = (pos_to_idx(mv.0, mv.1)?, pos_to_idx(mv.2, mv.3)?);
+    (self.is_pseudo_legal(from, to) && self.is_legal(from, to)).then_some((from, to))
+  }
+
+  // Generate the fully legal moves for the side to move
+  pub(crate) fn generate_legal(&self, moves: &mut Vec<(u8, u8)>) {
+    self.generate(moves);
+    let mut filter = LegalFilter::new(self);
+    moves.retain(|&(from, to)| filter.is_legal(from as usize, to as usize));
+  }
+
+  pub(crate) fn any_legal_move(&self) -> bool {
+    let mut moves = Vec::with_capacity(64);
+    self.generate(&mut moves);
+    let mut filter = LegalFilter::new(self);
+    moves
+      .iter()
+      .any(|&(from, to)| filter.is_legal(from as usize, to as usize))
+  }
+}
@@ -1,5 +1,47 @@
+use std::cell::Cell;
+use std::ffi::{c_int, c_void, CStr};
+use std::fs::File;
+use std::io::BufReader;
+use std::path::PathBuf;
+use std::ptr;
+use std::time::Duration;
+
+use pyo3::buffer::{Element, PyBuffer};
 use pyo3::create_exception;
+use pyo3::ffi;
 use pyo3::prelude::*;
+use pyo3::types::PyBytes;
+
+mod actions;
+mod bitboard;
+mod book;
+mod database;
+mod eval;
+mod explorer;
+mod fen;
+mod legality;
+mod mcts;
+mod mmap;
+mod movegen;
+mod movepick;
+mod perft;
+mod pgn;
+mod planes;
+mod playout;
+mod repetition;
+mod search;
+mod see;
+mod tablebase;
+mod tt;
+mod vecenv;
+mod zobrist;
+
+use bitboard::Bitboards;
+use eval::Eval;
+use explorer::Counts;
+use movegen::PieceList;
+use planes::{PLANES, PLANES_LEN};
+use pyo3::exceptions::{PyBufferError, PyIndexError, PyTypeError, PyValueError};
 
 create_exception!(libxiangqi, IllegalMove, pyo3::exceptions::PyException);
 
@@ -34,8 +76,10 @@ pub struct Piece {
   color: Color,
 }
 
-#[pyclass]
-#[derive(Debug, PartialEq, Eq)]
+// Squares numbered `rank * 9 + file`, ranks counted from 1 on red's side
+#[pyclass(eq, eq_int)]
+#[derive(Clone, Copy, Debug, PartialEq, Eq, Hash)]
+#[repr(u8)]
 pub enum Square {
   A1 = 0,
   B1 = 1,
@@ -129,22 +173,717 @@ pub enum Square {
   I10 = 89,
 }
 
-#[pyclass]
-#[derive(Debug, PartialEq, Eq)]
+// A move between two squares. Packs into an int as `from_square | to_square << 7`, the form `Board.make_moves` takes
+// and `Board.legal_moves_packed` returns.
+#[pyclass(frozen, eq, hash)]
+#[derive(Clone, Copy, Debug, PartialEq, Eq, Hash)]
 pub struct Move {
+  #[pyo3(get)]
   from_square: Square,
+  #[pyo3(get)]
   to_square: Square,
 }
 
+impl Square {
+  fn from_index(sq: usize) -> Square {
+    assert!(sq < bitboard::NUM_SQUARES, "square {sq} is off the board");
+    // SAFETY: `Square` is a u8 whose variants are exactly 0-89
+    unsafe { std::mem::transmute(sq as u8) }
+  }
+}
+
+impl Move {
+  fn from_idx(from: usize, to: usize) -> Move {
+    Move {
+      from_square: Square::from_index(bitboard::idx_to_sq(from)),
+      to_square: Square::from_index(bitboard::idx_to_sq(to)),
+    }
+  }
+
+  fn idx(&self) -> (usize, usize) {
+    (
+      bitboard::sq_to_idx(self.from_square as usize),
+      bitboard::sq_to_idx(self.to_square as usize),
+    )
+  }
+}
+
+#[pymethods]
+impl Move {
+  #[new]
+  fn py_new(from_square: Square, to_square: Square) -> Move {
+    Move { from_square, to_square }
+  }
+
+  #[staticmethod]
+  pub fn from_packed(mv: u16) -> PyResult<Move> {
+    let (from, to) = movegen::unpack_move(mv).ok_or_else(|| PyValueError::new_err(format!("{mv} is not a move")))?;
+    Ok(Move::from_idx(from, to))
+  }
+
+  #[staticmethod]
+  pub fn from_tuple(mv: (u8, u8, u8, u8)) -> PyResult<Move> {
+    match (pos_to_idx(mv.0, mv.1), pos_to_idx(mv.2, mv.3)) {
+      (Some(from), Some(to)) => Ok(Move::from_idx(from, to)),
+      _ => Err(PyValueError::new_err(format!("{mv:?} is not a move"))),
+    }
+  }
+
+  #[getter]
+  pub fn packed(&self) -> u16 {
+    self.from_square as u16 | (self.to_square as u16) << 7
+  }
+
+  // (from_file, from_rank, to_file, to_rank)
+  pub fn tuple(&self) -> (u8, u8, u8, u8) {
+    let (from, to) = self.idx();
+    move_tuple(from as u8, to as u8)
+  }
+
+  fn __int__(&self) -> u16 {
+    self.packed()
+  }
+
+  fn __repr__(&self) -> String {
+    format!("Move(Square.{:?}, Square.{:?})", self.from_square, self.to_square)
+  }
+}
+
+// Outcome of `Board.search`. Scores are centipawns for the side to move, mates score `MATE_SCORE` minus the number of
+// plies to mate.
+#[pyclass(frozen, get_all)]
+#[derive(Clone, Debug)]
+pub struct SearchResult {
+  best_move: Option<(u8, u8, u8, u8)>,
+  score: i32,
+  pv: Vec<(u8, u8, u8, u8)>,
+  depth: u32,
+  nodes: u64,
+}
+
+// Outcome of `Board.mcts`. Values are in [-1, 1] for the side to move.
+#[pyclass(frozen, get_all)]
+#[derive(Clone, Debug)]
+pub struct MctsResult {
+  best_move: Option<(u8, u8, u8, u8)>,
+  // (move, visits, value) of the root moves, most visited first
+  moves: Vec<((u8, u8, u8, u8), u32, f32)>,
+  value: f32,
+}
+
+// Outcome of `simulate_games`
+#[pyclass(frozen)]
+pub struct SimulationResult {
+  #[pyo3(get)]
+  games: usize,
+  #[pyo3(get)]
+  red_wins: u64,
+  #[pyo3(get)]
+  black_wins: u64,
+  #[pyo3(get)]
+  draws: u64,
+  // Plies played over every game
+  #[pyo3(get)]
+  plies: u64,
+  playouts: Option<Vec<playout::Playout>>,
+}
+
+#[pymethods]
+impl SimulationResult {
+  // Moves of each game as little endian u16, packed as `from | to << 7` with squares numbered `rank * 9 + file`.
+  // None unless recorded.
+  #[getter]
+  fn moves<'py>(&self, py: Python<'py>) -> Option<Vec<Bound<'py, PyBytes>>> {
+    let playouts = self.playouts.as_ref()?;
+    let bytes = |moves: &[u16]| moves.iter().flat_map(|mv| mv.to_le_bytes()).collect::<Vec<u8>>();
+    Some(
+      playouts
+        .iter()
+        .map(|game| PyBytes::new(py, &bytes(&game.moves)))
+        .collect(),
+    )
+  }
+
+  // Result of each game, None unless recorded
+  #[getter]
+  fn results(&self) -> Option<Vec<&'static str>> {
+    let results = self.playouts.as_ref()?.iter().map(|game| match game.winner {
+      Some(Color::Red) => "1-0",
+      Some(Color::Black) => "0-1",
+      None => "1/2-1/2",
+    });
+    Some(results.collect())
+  }
+}
+
+// Iterator returned by `Board.iter_legal_moves`
+#[pyclass]
+pub struct LegalMoveIter {
+  moves: movepick::LegalMoves,
+}
+
+#[pymethods]
+impl LegalMoveIter {
+  fn __iter__(slf: PyRef<'_, Self>) -> PyRef<'_, Self> {
+    slf
+  }
+
+  fn __next__(mut slf: PyRefMut<'_, Self>) -> Option<(u8, u8, u8, u8)> {
+    slf.moves.next().map(|(from, to)| move_tuple(from, to))
+  }
+}
+
+// Endgame tablebases memory-mapped from a directory of tables written by `generate_tablebase`
+#[pyclass(frozen)]
+pub struct Tablebase {
+  tables: tablebase::Tablebase,
+}
+
+#[pymethods]
+impl Tablebase {
+  #[new]
+  fn py_new(path: PathBuf) -> PyResult<Self> {
+    Ok(Tablebase {
+      tables: tablebase::Tablebase::open(&path)?,
+    })
+  }
+
+  // Materials of the tables found, such as "KRKAA"
+  pub fn materials(&self) -> Vec<String> {
+    self.tables.materials()
+  }
+
+  // 1 if the side to move wins, 0 for a draw and -1 if it loses. None when no table covers the position.
+  pub fn probe_wdl(&self, board: PyRef<'_, Board>) -> Option<i8> {
+    self.tables.probe(&board).map(|(wdl, _)| wdl)
+  }
+
+  // Plies to mate, positive when the side to move wins and negative when it loses, 0 for a draw. None when no table
+  // covers the position or its DTM file is missing.
+  pub fn probe_dtm(&self, board: PyRef<'_, Board>) -> Option<i32> {
+    let (wdl, plies) = self.tables.probe(&board)?;
+    Some(wdl as i32 * plies? as i32)
+  }
+}
+
+// Opening book memory-mapped from a file written by `build_book`
+#[pyclass(frozen)]
+pub struct Book {
+  book: book::Book,
+}
+
+#[pymethods]
+impl Book {
+  #[new]
+  fn py_new(path: PathBuf) -> PyResult<Self> {
+    Ok(Book {
+      book: book::Book::open(&path)?,
+    })
+  }
+
+  fn __len__(&self) -> usize {
+    self.book.len()
+  }
+
+  // Legal book moves of the position as (move, weight, learn), most played first. Empty when it is out of book.
+  pub fn moves(&self, board: PyRef<'_, Board>) -> Vec<((u8, u8, u8, u8), u16, u32)> {
+    self
+      .book
+      .moves(&board)
+      .into_iter()
+      .map(|((from, to), entry)| (move_tuple(from as u8, to as u8), entry.weight, entry.learn))
+      .collect()
+  }
+
+  // Most played book move of the position, None when it is out of book
+  pub fn best_move(&self, board: PyRef<'_, Board>) -> Option<(u8, u8, u8, u8)> {
+    let &((from, to), _) = self.book.moves(&board).first()?;
+    Some(move_tuple(from as u8, to as u8))
+  }
+}
+
+// Game read by `GameReader`
+#[pyclass(frozen, get_all)]
+pub struct Game {
+  headers: Vec<(String, String)>,
+  moves: Vec<(u8, u8, u8, u8)>,
+  result: Option<&'static str>,
+  error: Option<String>,
+  positions: Option<Vec<Board>>,
+}
+
+impl Game {
+  // Whether the game is played from the start position, which it is unless its FEN header says otherwise
+  fn from_start_position(&self) -> bool {
+    let start = Board::new();
+    match self.headers.iter().find(|(key, _)| key == "FEN") {
+      Some((_, fen)) => {
+        Board::parse_fen(fen, Backend::Mailbox).is_ok_and(|b| b.board == start.board && b.turn == start.turn)
+      },
+      None => true,
+    }
+  }
+}
+
+// Streams the games of a PGN file, replaying each one without the GIL
+#[pyclass]
+pub struct GameReader {
+  games: pgn::Reader<BufReader<File>>,
+  positions: bool,
+}
+
+#[pymethods]
+impl GameReader {
+  #[new]
+  #[pyo3(signature = (path, positions = false))]
+  fn py_new(path: PathBuf, positions: bool) -> PyResult<Self> {
+    Ok(GameReader {
+      games: pgn::Reader::new(BufReader::new(File::open(path)?), positions),
+      positions,
+    })
+  }
+
+  fn __iter__(slf: PyRef<'_, Self>) -> PyRef<'_, Self> {
+    slf
+  }
+
+  fn __next__(mut slf: PyRefMut<'_, Self>, py: Python<'_>) -> PyResult<Option<Game>> {
+    let reader = &mut *slf;
+    let Some(game) = py.detach(|| reader.games.next()).transpose()? else {
+      return Ok(None);
+    };
+    Ok(Some(Game {
+      headers: game.headers,
+      moves: game.moves.iter().map(|&(from, to)| move_tuple(from, to)).collect(),
+      result: game.result,
+      error: game.error,
+      positions: reader.positions.then_some(game.positions),
+    }))
+  }
+}
+
+// Games stored as memory-mapped columns in a directory, with an index from position to the games that reached it
+#[pyclass]
+pub struct GameDatabase {
+  db: database::Database,
+}
+
+#[pymethods]
+impl GameDatabase {
+  #[new]
+  fn py_new(path: PathBuf) -> PyResult<Self> {
+    Ok(GameDatabase {
+      db: database::Database::open(&path)?,
+    })
+  }
+
+  fn __len__(&self) -> usize {
+    self.db.len()
+  }
+
+  // Append games given as `Game`s read by `GameReader`, or as (moves, result) pairs of games played from the start
+  // position. Like `add_pgn`, games that stopped early on an error or whose FEN header sets up another position are
+  // skipped. Every move is checked before anything is written. Returns the number of games added.
+  pub fn add_games(&mut self, py: Python<'_>, games: &Bound<'_, PyAny>) -> PyResult<usize> {
+    let mut records = Vec::new();
+    for (i, game) in games.try_iter()?.enumerate() {
+      let game = game?;
+      let (moves, result) = match game.extract::<PyRef<'_, Game>>() {
+        Ok(game) if game.error.is_some() || !game.from_start_position() => continue,
+        Ok(game) => (game.moves.clone(), game.result.map(str::to_string)),
+        Err(_) => game.extract::<(Vec<(u8, u8, u8, u8)>, Option<String>)>()?,
+      };
+      let result = database::result_code(result.as_deref()).map_err(PyValueError::new_err)?;
+      let mut board = Board::new();
+      let mut played = Vec::with_capacity(moves.len());
+      for (ply, &mv) in moves.iter().enumerate() {
+        let (from, to) = board
+          .legal_move(mv)
+          .ok_or_else(|| IllegalMove::new_err(format!("game {i}, ply {ply}: {mv:?} is not a legal move")))?;
+        board.apply_move(from, to);
+        played.push((from as u8, to as u8));
+      }
+      records.push(database::Record { moves: played, result });
+    }
+    let db = &mut self.db;
+    py.detach(|| db.append(&records))?;
+    Ok(records.len())
+  }
+
+  // Append the games of a PGN file that start from the start position and replay without error. Returns how many.
+  pub fn add_pgn(&mut self, py: Python<'_>, path: PathBuf) -> PyResult<usize> {
+    let db = &mut self.db;
+    Ok(py.detach(|| db.append_pgn(&path))?)
+  }
+
+  // Moves and result of the game with id `id`
+  pub fn game(&self, id: usize) -> PyResult<(Vec<(u8, u8, u8, u8)>, Option<&'static str>)> {
+    let (moves, result) = self
+      .db
+      .game(id)
+      .ok_or_else(|| PyIndexError::new_err(format!("no game {id}")))?;
+    let moves = moves.into_iter().map(|(from, to)| move_tuple(from, to)).collect();
+    Ok((moves, database::result_name(result)))
+  }
+
+  // Ids of the games that reached the position of `board`, looked up in the index
+  pub fn find(&self, board: PyRef<'_, Board>) -> Vec<u32> {
+    self.db.games_with(board.hash)
+  }
+}
+
+// Opening statistics memory-mapped from a file written by `build_explorer`
+#[pyclass(frozen)]
+pub struct OpeningExplorer {
+  explorer: explorer::Explorer,
+}
+
+#[pymethods]
+impl OpeningExplorer {
+  #[new]
+  fn py_new(path: PathBuf) -> PyResult<Self> {
+    Ok(OpeningExplorer {
+      explorer: explorer::Explorer::open(&path)?,
+    })
+  }
+
+  // Number of games counted
+  pub fn games(&self) -> u64 {
+    self.explorer.games()
+  }
+
+  // Moves played in the position with their (games, red_wins, draws, black_wins), most played first
+  pub fn moves(&self, board: PyRef<'_, Board>) -> Vec<((u8, u8, u8, u8), (u32, u32, u32, u32))> {
+    self
+      .explorer
+      .moves(&board)
+      .into_iter()
+      .map(|((from, to), counts)| (move_tuple(from as u8, to as u8), counts.as_tuple()))
+      .collect()
+  }
+
+  // (games, red_wins, draws, black_wins) over every move played in the position
+  pub fn stats(&self, board: PyRef<'_, Board>) -> (u32, u32, u32, u32) {
+    let mut total = Counts::default();
+    for (_, counts) in self.explorer.moves(&board) {
+      total.add(counts);
+    }
+    total.as_tuple()
+  }
+}
+
+// Read-only array handed to Python through the buffer protocol, such as the feature planes of `Board.planes`.
+// numpy.asarray() of it shares its memory.
+#[pyclass(frozen)]
+pub struct Array {
+  data: ArrayData,
+  shape: Vec<isize>,
+  strides: Vec<isize>,
+}
+
+enum ArrayData {
+  U8(Vec<u8>),
+  Bool(Vec<bool>),
+  F32(Vec<f32>),
+}
+
+impl ArrayData {
+  // Pointer to the values, their size in bytes and their struct module format
+  fn raw(&self) -> (*const c_void, usize, &'static CStr) {
+    match self {
+      ArrayData::U8(data) => (data.as_ptr().cast(), 1, c"B"),
+      ArrayData::Bool(data) => (data.as_ptr().cast(), 1, c"?"),
+      ArrayData::F32(data) => (data.as_ptr().cast(), 4, c"f"),
+    }
+  }
+
+  fn len(&self) -> usize {
+    match self {
+      ArrayData::U8(data) => data.len(),
+      ArrayData::Bool(data) => data.len(),
+      ArrayData::F32(data) => data.len(),
+    }
+  }
+}
+
+impl Array {
+  // C-contiguous array of shape `shape` holding `data`
+  fn new(data: ArrayData, shape: &[usize]) -> Self {
+    let (_, itemsize, _) = data.raw();
+    let mut strides = vec![itemsize as isize; shape.len()];
+    for i in (1..shape.len()).rev() {
+      strides[i - 1] = strides[i] * shape[i] as isize;
+    }
+    Array {
+      data,
+      shape: shape.iter().map(|&n| n as isize).collect(),
+      strides,
+    }
+  }
+}
+
+#[pymethods]
+impl Array {
+  unsafe fn __getbuffer__(slf: Bound<'_, Self>, view: *mut ffi::Py_buffer, flags: c_int) -> PyResult<()> {
+    if flags & ffi::PyBUF_WRITABLE == ffi::PyBUF_WRITABLE {
+      return Err(PyBufferError::new_err("the array is read-only"));
+    }
+    let array = slf.get();
+    let (buf, itemsize, format) = array.data.raw();
+    let requested = |flag| flags & flag == flag;
+    // The view points into the object, which it keeps alive through `obj`. Shape and strides are only filled in when
+    // asked for, as a consumer that doesn't ask expects a flat buffer.
+    unsafe {
+      (*view).buf = buf as *mut c_void;
+      (*view).len = (array.data.len() * itemsize) as isize;
+      (*view).readonly = 1;
+      (*view).itemsize = itemsize as isize;
+      (*view).format = match requested(ffi::PyBUF_FORMAT) {
+        true => format.as_ptr() as *mut _,
+        false => ptr::null_mut(),
+      };
+      (*view).ndim = match requested(ffi::PyBUF_ND) {
+        true => array.shape.len() as c_int,
+        false => 1,
+      };
+      (*view).shape = match requested(ffi::PyBUF_ND) {
+        true => array.shape.as_ptr() as *mut _,
+        false => ptr::null_mut(),
+      };
+      (*view).strides = match requested(ffi::PyBUF_STRIDES) {
+        true => array.strides.as_ptr() as *mut _,
+        false => ptr::null_mut(),
+      };
+      (*view).suboffsets = ptr::null_mut();
+      (*view).internal = ptr::null_mut();
+      (*view).obj = slf.into_any().into_ptr();
+    }
+    Ok(())
+  }
+
+  unsafe fn __releasebuffer__(&self, _view: *mut ffi::Py_buffer) {}
+}
+
+#[derive(Clone, Copy, Debug)]
+enum Dtype {
+  Uint8,
+  Float32,
+}
+
+fn parse_dtype(dtype: &str) -> PyResult<Dtype> {
+  match dtype {
+    "uint8" => Ok(Dtype::Uint8),
+    "float32" => Ok(Dtype::Float32),
+    _ => Err(PyValueError::new_err(format!("Unknown dtype {dtype:?}"))),
+  }
+}
+
+// Feature planes of `boards` one after the other, see `planes`
+fn encode_planes<'a>(boards: impl ExactSizeIterator<Item = &'a Board>, dtype: Dtype) -> ArrayData {
+  fn encode<'a, T: Copy + Default + From<u8>>(boards: impl ExactSizeIterator<Item = &'a Board>) -> Vec<T> {
+    let mut data = vec![T::default(); boards.len() * PLANES_LEN];
+    let values = Cell::from_mut(&mut data[..]).as_slice_of_cells();
+    for (board, values) in boards.zip(values.chunks_exact(PLANES_LEN)) {
+      board.write_planes(values);
+    }
+    data
+  }
+  match dtype {
+    Dtype::Uint8 => ArrayData::U8(encode(boards)),
+    Dtype::Float32 => ArrayData::F32(encode(boards)),
+  }
+}
+
+// N games stepped together, one call playing a move in every game, see `vecenv`
+#[pyclass]
+pub struct VecBoard {
+  env: vecenv::VecEnv,
+  dtype: Dtype,
+}
+
+#[pymethods]
+impl VecBoard {
+  #[new]
+  #[pyo3(signature = (n, fen = None, max_plies = 400, dtype = "uint8"))]
+  fn py_new(n: usize, fen: Option<&str>, max_plies: u32, dtype: &str) -> PyResult<Self> {
+    let start = match fen {
+      Some(fen) => Board::parse_fen(fen, Backend::Mailbox).map_err(PyValueError::new_err)?,
+      None => Board::new(),
+    };
+    if !start.any_legal_move() {
+      return Err(PyValueError::new_err("the start position has no legal move"));
+    }
+    Ok(VecBoard {
+      env: vecenv::VecEnv::new(start, n, max_plies.max(1)),
+      dtype: parse_dtype(dtype)?,
+    })
+  }
+
+  fn __len__(&self) -> usize {
+    self.env.boards().len()
+  }
+
+  // Position of game `i`
+  pub fn board(&self, i: usize) -> PyResult<Board> {
+    let board = self
+      .env
+      .boards()
+      .get(i)
+      .ok_or_else(|| PyIndexError::new_err(format!("no game {i}")))?;
+    Ok(board.clone())
+  }
+
+  // Feature planes of every game, shape (n, 15, 10, 9)
+  pub fn observations(&self, py: Python<'_>) -> Array {
+    let (boards, dtype) = (self.env.boards(), self.dtype);
+    let data = py.detach(|| encode_planes(boards.iter(), dtype));
+    Array::new(data, &[boards.len(), PLANES, RANK_SZ as usize, FILE_SZ as usize])
+  }
+
+  // Reset every game to the start position. Returns the observations.
+  pub fn reset(&mut self, py: Python<'_>) -> Array {
+    self.env.reset();
+    self.observations(py)
+  }
+
+  // Legal move masks of every game as uint8, shape (n, 2086) or (n, 8100) with `full`
+  #[pyo3(signature = (full = false))]
+  pub fn legal_move_masks(&self, py: Python<'_>, full: bool) -> Array {
+    let (boards, len) = (self.env.boards(), actions::num_actions(full));
+    let data = py.detach(|| {
+      let mut data = vec![0u8; boards.len() * len];
+      let values = Cell::from_mut(&mut data[..]).as_slice_of_cells();
+      let mut moves = Vec::with_capacity(128);
+      for (board, values) in boards.iter().zip(values.chunks_exact(len)) {
+        board.write_legal_mask(full, &mut moves, values);
+      }
+      data
+    });
+    Array::new(ArrayData::U8(data), &[boards.len(), len])
+  }
+
+  // Play one action of the compact action space in every game. Returns (observations, rewards, dones): the rewards
+  // are 1.0 for a move that wins its game and 0.0 otherwise, and the games that ended are already reset in the
+  // observations. Raises IllegalMove, playing nothing, if an action is not legal in its game, and ValueError if there
+  // isn't one action per game.
+  pub fn step(&mut self, py: Python<'_>, actions: &Bound<'_, PyAny>) -> PyResult<(Array, Array, Array)> {
+    let actions = extract_actions(py, actions)?;
+    let n = self.env.boards().len();
+    if actions.len() != n {
+      let len = actions.len();
+      return Err(PyValueError::new_err(format!("{len} actions for {n} games")));
+    }
+    let (mut rewards, mut dones) = (vec![0.0; n], vec![false; n]);
+    let env = &mut self.env;
+    py.detach(|| env.step(&actions, &mut rewards, &mut dones))
+      .map_err(IllegalMove::new_err)?;
+    let observations = self.observations(py);
+    let rewards = Array::new(ArrayData::F32(rewards), &[n]);
+    Ok((observations, rewards, Array::new(ArrayData::Bool(dones), &[n])))
+  }
+}
+
+// Leaf evaluation by the Python callable given to `Board.mcts`
+struct PyEvaluator<'a> {
+  evaluate: &'a Py<PyAny>,
+}
+
+impl mcts::Evaluate for PyEvaluator<'_> {
+  type Error = PyErr;
+
+  fn evaluate(&mut self, leaves: &[mcts::Leaf]) -> PyResult<(Vec<f32>, Vec<f32>)> {
+    let planes = encode_planes(leaves.iter().map(|leaf| &leaf.board), Dtype::Float32);
+    let planes = Array::new(planes, &[leaves.len(), PLANES, RANK_SZ as usize, FILE_SZ as usize]);
+    Python::attach(|py| {
+      let output = self.evaluate.bind(py).call1((planes,))?;
+      let (policy, values) = output.extract::<(Bound<'_, PyAny>, Bound<'_, PyAny>)>()?;
+      let (policy, values) = (extract_floats(py, &policy)?, extract_floats(py, &values)?);
+      if policy.len() != leaves.len() * actions::NUM_ACTIONS || values.len() != leaves.len() {
+        return Err(PyValueError::new_err(format!(
+          "evaluate returned {} policy values and {} values for {} positions",
+          policy.len(),
+          values.len(),
+          leaves.len()
+        )));
+      }
+      Ok((policy, values))
+    })
+  }
+}
+
+// Values of a float32 or float64 buffer, such as a numpy array, or of a sequence of floats
+fn extract_floats(py: Python<'_>, values: &Bound<'_, PyAny>) -> PyResult<Vec<f32>> {
+  if let Ok(buffer) = PyBuffer::<f32>::get(values) {
+    return buffer.to_vec(py);
+  }
+  if let Ok(buffer) = PyBuffer::<f64>::get(values) {
+    return Ok(buffer.to_vec(py)?.into_iter().map(|value| value as f32).collect());
+  }
+  values.extract()
+}
+
+// Actions given as a buffer of integers, such as a numpy int64 or int32 array, or as a sequence of ints. Negative
+// actions become usize::MAX, which is not an action.
+fn extract_actions(py: Python<'_>, actions: &Bound<'_, PyAny>) -> PyResult<Vec<usize>> {
+  if let Ok(buffer) = PyBuffer::<i64>::get(actions) {
+    return Ok(
+      buffer
+        .to_vec(py)?
+        .into_iter()
+        .map(|a| a.try_into().unwrap_or(usize::MAX))
+        .collect(),
+    );
+  }
+  if let Ok(buffer) = PyBuffer::<i32>::get(actions) {
+    return Ok(
+      buffer
+        .to_vec(py)?
+        .into_iter()
+        .map(|a| a.try_into().unwrap_or(usize::MAX))
+        .collect(),
+    );
+  }
+  actions.extract()
+}
+
+// Packed moves from a u16 buffer, bytes of little endian u16 or a sequence of ints and `Move`s
+fn extract_packed(py: Python<'_>, moves: &Bound<'_, PyAny>) -> PyResult<Vec<u16>> {
+  if let Ok(buffer) = PyBuffer::<u16>::get(moves) {
+    return buffer.to_vec(py);
+  }
+  if let Ok(buffer) = PyBuffer::<u8>::get(moves) {
+    let bytes = buffer.to_vec(py)?;
+    if bytes.len() % 2 != 0 {
+      return Err(PyValueError::new_err("packed moves take 2 bytes each"));
+    }
+    return Ok(
+      bytes
+        .chunks_exact(2)
+        .map(|mv| u16::from_le_bytes([mv[0], mv[1]]))
+        .collect(),
+    );
+  }
+  moves
+    .try_iter()?
+    .map(|mv| {
+      let mv = mv?;
+      match mv.extract::<PyRef<'_, Move>>() {
+        Ok(mv) => Ok(mv.packed()),
+        Err(_) => mv.extract::<u16>(),
+      }
+    })
+    .collect()
+}
+
 impl Piece {
-  pub fn new(piece_type: PieceType, side: Color) -> Self {
+  pub const fn new(piece_type: PieceType, side: Color) -> Self {
     Piece {
       piece_type,
       color: side,
     }
   }
 
-  fn to_u8(self) -> u8 {
+  const fn to_u8(self) -> u8 {
     let piece_val = match self.piece_type {
       PieceType::General => 1,
       PieceType::Advisor => 2,
@@ -191,9 +930,40 @@ impl Piece {
 }
 
 #[pyclass]
+#[derive(Clone)]
 pub struct Board {
   board: [u8; 144],
   turn: Color,
+  // Squares occupied by each side, indexed by `Color::index`
+  pieces: [PieceList; 2],
+  // Move generator used by `get_legal_moves`, the bitboards are kept in sync with `board` either way
+  backend: Backend,
+  bitboards: Bitboards,
+  // Zobrist key of the position, updated incrementally
+  hash: u64,
+  // Material and piece-square terms, updated incrementally
+  eval: Eval,
+  // Moves played through `make_move`/`push`, most recent last
+  history: Vec<Undo>,
+}
+
+// Everything needed to take back a move without copying the board
+#[derive(Clone, Copy, Debug)]
+pub(crate) struct Undo {
+  from: u8,
+  to: u8,
+  captured: u8,
+  turn: Color,
+  hash: u64,
+  eval: Eval,
+  // `repetition::CHECK` and `repetition::CHASE`, or `repetition::UNKNOWN` until worked out
+  flags: u8,
+}
+
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub enum Backend {
+  Mailbox,
+  Bitboard,
 }
 
 pub fn pos_to_idx(file: u8, rank: u8) -> Option<usize> {
@@ -203,6 +973,29 @@ pub fn pos_to_idx(file: u8, rank: u8) -> Option<usize> {
   Some(((rank + 1) * 12 + (file + 1)) as usize)
 }
 
+fn parse_backend(backend: &str) -> PyResult<Backend> {
+  match backend {
+    "mailbox" => Ok(Backend::Mailbox),
+    "bitboard" => Ok(Backend::Bitboard),
+    _ => Err(PyValueError::new_err(format!("Unknown backend {backend:?}"))),
+  }
+}
+
+fn parse_rules(rules: &str) -> PyResult<repetition::Rules> {
+  match rules {
+    "asian" => Ok(repetition::Rules::Asian),
+    "check" => Ok(repetition::Rules::CheckOnly),
+    _ => Err(PyValueError::new_err(format!("Unknown rules {rules:?}"))),
+  }
+}
+
+// Convert a move between mailbox indices to (from_file, from_rank, to_file, to_rank)
+fn move_tuple(from: u8, to: u8) -> (u8, u8, u8, u8) {
+  let (from_file, from_rank) = movegen::idx_to_pos(from as usize);
+  let (to_file, to_rank) = movegen::idx_to_pos(to as usize);
+  (from_file, from_rank, to_file, to_rank)
+}
+
 // Helper to check if position is in palace
 fn in_palace(file: u8, rank: u8, side: Color) -> bool {
   if file < 3 || file > 5 {
@@ -222,10 +1015,9 @@ fn crossed_river(rank: u8, side: Color) -> bool {
   }
 }
 
-#[pymethods]
 impl Board {
-  #[new]
-  pub fn new() -> Self {
+  // Board with no pieces and red to move
+  pub fn empty() -> Self {
     let mut board = [OUT_OF_BOUNDS; 144];
 
     // Clear board
@@ -236,10 +1028,20 @@ impl Board {
       }
     }
 
-    let mut game = Board {
+    Board {
       board,
       turn: Color::Red,
-    };
+      pieces: [PieceList::new(), PieceList::new()],
+      backend: Backend::Mailbox,
+      bitboards: Bitboards::default(),
+      hash: 0,
+      eval: Eval::default(),
+      history: Vec::with_capacity(256),
+    }
+  }
+
+  pub fn new() -> Self {
+    let mut game = Board::empty();
 
     // Red pieces (rank 0-4)
     game.set_piece(0, 0, PieceType::Chariot, Color::Red);
@@ -284,9 +1086,133 @@ impl Board {
     game
   }
 
+  pub fn with_backend(backend: Backend) -> Self {
+    let mut game = Board::new();
+    game.backend = backend;
+    game
+  }
+
+  // Generate moves for the side to move as (from, to) mailbox indices with the selected backend
+  pub(crate) fn generate(&self, moves: &mut Vec<(u8, u8)>) {
+    match self.backend {
+      Backend::Mailbox => self.generate_moves(moves),
+      Backend::Bitboard => self.bitboards.generate_moves(self.turn, moves),
+    }
+  }
+
+  // Play a move without validating it. `from` must hold a piece of the side to move.
+  pub(crate) fn apply_move(&mut self, from_idx: usize, to_idx: usize) -> Undo {
+    let undo = Undo {
+      from: from_idx as u8,
+      to: to_idx as u8,
+      captured: self.board[to_idx],
+      turn: self.turn,
+      hash: self.hash,
+      eval: self.eval,
+      flags: repetition::UNKNOWN,
+    };
+    let piece = Piece::from_u8(self.board[from_idx]).expect("no piece to move");
+    let (from_sq, to_sq) = (bitboard::idx_to_sq(from_idx), bitboard::idx_to_sq(to_idx));
+
+    if let Some(dest) = Piece::from_u8(undo.captured) {
+      self.pieces[dest.color.index()].remove(to_idx as u8);
+      self.bitboards.remove(to_sq, dest.piece_type, dest.color);
+      self.hash ^= zobrist::piece_key(dest.piece_type, dest.color, to_sq);
+      self.eval.remove(undo.captured, to_sq);
+    }
+    self.pieces[piece.color.index()].relocate(from_idx as u8, to_idx as u8);
+    self.bitboards.remove(from_sq, piece.piece_type, piece.color);
+    self.bitboards.put(to_sq, piece.piece_type, piece.color);
+    self.hash ^= zobrist::piece_key(piece.piece_type, piece.color, from_sq);
+    self.hash ^= zobrist::piece_key(piece.piece_type, piece.color, to_sq);
+    self.eval.remove(self.board[from_idx], from_sq);
+    self.eval.add(self.board[from_idx], to_sq);
+    self.board[to_idx] = self.board[from_idx];
+    self.board[from_idx] = EMPTY;
+
+    // Switch turns
+    self.turn = self.turn.other();
+    self.hash ^= zobrist::SIDE_KEY;
+
+    undo
+  }
+
+  // Play a legal move and keep it in `history`. Its check and chase flags are worked out now with `flags`, otherwise
+  // only when a repetition is adjudicated.
+  fn play(&mut self, from_idx: usize, to_idx: usize, flags: bool) {
+    let mut undo = self.apply_move(from_idx, to_idx);
+    if flags {
+      undo.flags = self.move_flags(&undo);
+    }
+    self.history.push(undo);
+  }
+
+  // Mailbox indices of a packed move, if it is legal in this position
+  fn legal_packed(&self, mv: u16) -> Option<(usize, usize)> {
+    movegen::unpack_move(mv).filter(|&(from, to)| self.is_pseudo_legal(from, to) && self.is_legal(from, to))
+  }
+
+  // Take back a move played with `apply_move`
+  pub(crate) fn unapply_move(&mut self, undo: Undo) {
+    let (from_idx, to_idx) = (undo.from as usize, undo.to as usize);
+    let piece = Piece::from_u8(self.board[to_idx]).expect("no piece to take back");
+    let (from_sq, to_sq) = (bitboard::idx_to_sq(from_idx), bitboard::idx_to_sq(to_idx));
+
+    self.pieces[piece.color.index()].relocate(to_idx as u8, from_idx as u8);
+    self.bitboards.remove(to_sq, piece.piece_type, piece.color);
+    self.bitboards.put(from_sq, piece.piece_type, piece.color);
+    if let Some(dest) = Piece::from_u8(undo.captured) {
+      self.pieces[dest.color.index()].add(to_idx as u8);
+      self.bitboards.put(to_sq, dest.piece_type, dest.color);
+    }
+    self.board[from_idx] = self.board[to_idx];
+    self.board[to_idx] = undo.captured;
+    self.turn = undo.turn;
+    self.hash = undo.hash;
+    self.eval = undo.eval;
+  }
+}
+
+#[pymethods]
+impl Board {
+  #[new]
+  #[pyo3(signature = (backend = "mailbox"))]
+  fn py_new(backend: &str) -> PyResult<Self> {
+    Ok(Board::with_backend(parse_backend(backend)?))
+  }
+
+  #[staticmethod]
+  #[pyo3(signature = (fen, backend = "mailbox"))]
+  pub fn from_fen(fen: &str, backend: &str) -> PyResult<Self> {
+    Board::parse_fen(fen, parse_backend(backend)?).map_err(PyValueError::new_err)
+  }
+
+  pub fn fen(&self) -> String {
+    self.to_fen()
+  }
+
   pub fn set_piece(&mut self, file: u8, rank: u8, piece_type: PieceType, side: Color) -> Option<()> {
     let idx = pos_to_idx(file, rank)?;
+    // Keep the piece lists in sync, a side can hold at most `MAX_PIECES` pieces
+    match Piece::from_u8(self.board[idx]) {
+      Some(old) if old.color == side => {},
+      old => {
+        self.pieces[side.index()].add(idx as u8)?;
+        if let Some(old) = old {
+          self.pieces[old.color.index()].remove(idx as u8);
+        }
+      },
+    }
+    let sq = bitboard::idx_to_sq(idx);
+    if let Some(old) = Piece::from_u8(self.board[idx]) {
+      self.bitboards.remove(sq, old.piece_type, old.color);
+      self.hash ^= zobrist::piece_key(old.piece_type, old.color, sq);
+      self.eval.remove(self.board[idx], sq);
+    }
+    self.bitboards.put(sq, piece_type, side);
+    self.hash ^= zobrist::piece_key(piece_type, side, sq);
     self.board[idx] = Piece::new(piece_type, side).to_u8();
+    self.eval.add(self.board[idx], sq);
     Some(())
   }
 
@@ -508,46 +1434,38 @@ impl Board {
   }
 
   pub fn get_legal_moves(&self) -> Vec<(u8, u8, u8, u8)> {
-    let mut moves = Vec::new();
+    let mut moves = Vec::with_capacity(64);
+    self.generate_legal(&mut moves);
+    moves.into_iter().map(|(from, to)| move_tuple(from, to)).collect()
+  }
 
-    for from_rank in 0..RANK_SZ {
-      for from_file in 0..FILE_SZ {
-        if let Some(piece) = self.get_piece(from_file, from_rank) {
-          if piece.color != self.turn {
-            continue;
-          }
-
-          for to_rank in 0..RANK_SZ {
-            for to_file in 0..FILE_SZ {
-              // Check destination
-              if let Some(dest) = self.get_piece(to_file, to_rank) {
-                if dest.color == piece.color {
-                  continue;
-                }
-              }
-
-              let is_capture = self.get_piece(to_file, to_rank).is_some();
-
-              let is_valid = match piece.piece_type {
-                PieceType::General => self.is_valid_general_move(from_file, from_rank, to_file, to_rank, piece.color),
-                PieceType::Advisor => self.is_valid_advisor_move(from_file, from_rank, to_file, to_rank, piece.color),
-                PieceType::Elephant => self.is_valid_elephant_move(from_file, from_rank, to_file, to_rank, piece.color),
-                PieceType::Horse => self.is_valid_horse_move(from_file, from_rank, to_file, to_rank),
-                PieceType::Chariot => self.is_valid_chariot_move(from_file, from_rank, to_file, to_rank),
-                PieceType::Cannon => self.is_valid_cannon_move(from_file, from_rank, to_file, to_rank, is_capture),
-                PieceType::Soldier => self.is_valid_soldier_move(from_file, from_rank, to_file, to_rank, piece.color),
-              };
-
-              if is_valid {
-                moves.push((from_file, from_rank, to_file, to_rank));
-              }
-            }
-          }
-        }
-      }
-    }
+  // Legal moves packed as `from | to << 7`, as bytes of little endian u16 like those `make_moves` takes
+  pub fn legal_moves_packed<'py>(&self, py: Python<'py>) -> Bound<'py, PyBytes> {
+    let mut moves = Vec::with_capacity(64);
+    self.generate_legal(&mut moves);
+    let bytes: Vec<u8> = moves
+      .into_iter()
+      .flat_map(|(from, to)| movegen::pack_move(from as usize, to as usize).to_le_bytes())
+      .collect();
+    PyBytes::new(py, &bytes)
+  }
 
+  pub fn legal_move_objects(&self) -> Vec<Move> {
+    let mut moves = Vec::with_capacity(64);
+    self.generate_legal(&mut moves);
     moves
+      .into_iter()
+      .map(|(from, to)| Move::from_idx(from as usize, to as usize))
+      .collect()
+  }
+
+  // Legal moves one at a time, captures first (most valuable victim, then least valuable attacker) unless
+  // `captures_first` is false. A move is only checked and converted when it is read.
+  #[pyo3(signature = (captures_first = true))]
+  pub fn iter_legal_moves(&self, captures_first: bool) -> LegalMoveIter {
+    LegalMoveIter {
+      moves: self.legal_moves_lazy(captures_first),
+    }
   }
 
   // Main function to validate and execute a move
@@ -597,19 +1515,144 @@ impl Board {
       return Err(IllegalMove::new_err(format!("Invalid move for {:?}", piece.piece_type)));
     }
 
+    if !self.is_legal(from_idx, to_idx) {
+      return Err(IllegalMove::new_err("Move leaves the general in check"));
+    }
+
     // Execute the move
-    self.board[to_idx] = self.board[from_idx];
-    self.board[from_idx] = EMPTY;
+    self.play(from_idx, to_idx, true);
 
-    // Switch turns
-    self.turn = match self.turn {
-      Color::Red => Color::Black,
-      Color::Black => Color::Red,
-    };
+    Ok(())
+  }
 
+  // Same as `make_move`, taking the move as a (from_file, from_rank, to_file, to_rank) tuple
+  pub fn push(&mut self, mv: (u8, u8, u8, u8)) -> PyResult<()> {
+    self.make_move(mv.0, mv.1, mv.2, mv.3)
+  }
+
+  // Take back the last move and return it
+  pub fn pop(&mut self) -> PyResult<(u8, u8, u8, u8)> {
+    let undo = self
+      .history
+      .pop()
+      .ok_or_else(|| PyIndexError::new_err("pop from empty move stack"))?;
+    self.unapply_move(undo);
+    Ok(move_tuple(undo.from, undo.to))
+  }
+
+  // Play a move packed as `from | to << 7`, squares numbered `rank * 9 + file`
+  pub fn push_packed(&mut self, mv: u16) -> PyResult<()> {
+    let (from, to) = self
+      .legal_packed(mv)
+      .ok_or_else(|| IllegalMove::new_err(format!("{mv} is not a legal move")))?;
+    self.play(from, to, false);
     Ok(())
   }
 
+  // Play a sequence of moves in one call: a buffer of u16 packed moves (array('H'), numpy uint16), bytes of little
+  // endian u16 such as `SimulationResult.moves`, or a sequence of packed ints and `Move`s. Raises IllegalMove, playing
+  // nothing, if a move is not legal in turn.
+  pub fn make_moves(&mut self, py: Python<'_>, moves: &Bound<'_, PyAny>) -> PyResult<()> {
+    let moves = extract_packed(py, moves)?;
+    for (i, &mv) in moves.iter().enumerate() {
+      let Some((from, to)) = self.legal_packed(mv) else {
+        for _ in 0..i {
+          let undo = self.history.pop().unwrap();
+          self.unapply_move(undo);
+        }
+        return Err(IllegalMove::new_err(format!("move {i}: {mv} is not a legal move")));
+      };
+      self.play(from, to, false);
+    }
+    Ok(())
+  }
+
+  // Number of leaf nodes `depth` plies below this position. Runs without the GIL on `threads` threads, 0 uses every
+  // available core.
+  #[pyo3(signature = (depth, threads = 1))]
+  pub fn perft(&self, py: Python<'_>, depth: u32, threads: usize) -> u64 {
+    py.detach(|| self.perft_nodes(depth, threads))
+  }
+
+  // Perft node counts split by the first move
+  #[pyo3(signature = (depth, threads = 1))]
+  pub fn perft_divide(&self, py: Python<'_>, depth: u32, threads: usize) -> Vec<((u8, u8, u8, u8), u64)> {
+    let counts = py.detach(|| match threads {
+      1 => self.clone().perft_divide_counts(depth),
+      _ => self.perft_divide_parallel(depth, threads),
+    });
+    counts
+      .into_iter()
+      .map(|((from, to), nodes)| (move_tuple(from, to), nodes))
+      .collect()
+  }
+
+  // Alpha-beta search to a depth in plies, a time budget and/or a node budget, at least one of them is required. The
+  // search runs without the GIL on `threads` threads (0 uses every available core) sharing a transposition table of
+  // `hash_mb` megabytes.
+  #[pyo3(signature = (depth = None, movetime_ms = None, nodes = None, hash_mb = 16, threads = 1))]
+  pub fn search(
+    &self,
+    py: Python<'_>,
+    depth: Option<u32>,
+    movetime_ms: Option<u64>,
+    nodes: Option<u64>,
+    hash_mb: usize,
+    threads: usize,
+  ) -> PyResult<SearchResult> {
+    if depth.is_none() && movetime_ms.is_none() && nodes.is_none() {
+      return Err(PyValueError::new_err(
+        "search needs a depth, movetime_ms or nodes limit",
+      ));
+    }
+    let limits = search::Limits {
+      depth,
+      movetime: movetime_ms.map(Duration::from_millis),
+      nodes,
+    };
+    let report = py.detach(|| self.search_position(limits, threads, &tt::TranspositionTable::new(hash_mb)));
+    Ok(SearchResult {
+      best_move: report.best_move.map(|(from, to)| move_tuple(from, to)),
+      score: report.score,
+      pv: report.pv.into_iter().map(|(from, to)| move_tuple(from, to)).collect(),
+      depth: report.depth,
+      nodes: report.nodes,
+    })
+  }
+
+  // Monte Carlo tree search with PUCT, see `mcts`. `evaluate` is called with the float32 feature planes of a batch of
+  // up to `batch_size` leaves, shape (k, 15, 10, 9), and returns (policy, values): k * NUM_ACTIONS policy values and k
+  // values in [-1, 1] for the side to move, as float32 or float64 buffers or flat sequences. `threads` search threads
+  // (0 for every core) select leaves for it; they share one lock for the tree walk, see `mcts`.
+  #[pyo3(signature = (evaluate, simulations = 800, batch_size = 16, threads = 1, c_puct = 1.5))]
+  pub fn mcts(
+    &self,
+    py: Python<'_>,
+    evaluate: Py<PyAny>,
+    simulations: usize,
+    batch_size: usize,
+    threads: usize,
+    c_puct: f32,
+  ) -> PyResult<MctsResult> {
+    let params = mcts::Params {
+      simulations,
+      batch: batch_size,
+      threads,
+      c_puct,
+    };
+    let outcome = py.detach(|| mcts::search(self, &params, PyEvaluator { evaluate: &evaluate }))?;
+    let moves: Vec<_> = outcome
+      .moves
+      .into_iter()
+      .map(|((from, to), visits, value)| (move_tuple(from, to), visits, value))
+      .collect();
+    Ok(MctsResult {
+      best_move: moves.first().map(|&(mv, _, _)| mv),
+      moves,
+      value: outcome.value,
+    })
+  }
+
   pub fn ascii(&self) -> String {
     let mut output = String::new();
     for rank in (0..RANK_SZ).rev() {
@@ -650,18 +1693,359 @@ impl Board {
     output
   }
 
+  // Whether the side to move is in check. Facing the enemy general on an open file counts as check.
+  pub fn is_check(&self) -> bool {
+    self.in_check(self.turn)
+  }
+
+  pub fn is_checkmate(&self) -> bool {
+    self.in_check(self.turn) && !self.any_legal_move()
+  }
+
+  // No legal move without being in check. Under xiangqi rules this loses, like checkmate.
+  pub fn is_stalemate(&self) -> bool {
+    !self.in_check(self.turn) && !self.any_legal_move()
+  }
+
+  // Stops at the first legal move found
+  pub fn has_legal_move(&self) -> bool {
+    self.any_legal_move()
+  }
+
+  // Whether the position has occurred `count` times in the moves played, counting this one. Only the moves since the
+  // last capture are looked at.
+  #[pyo3(signature = (count = 3))]
+  pub fn is_repetition(&self, count: usize) -> bool {
+    self.repeated(count)
+  }
+
+  // "1-0", "0-1" or "1/2-1/2" once the position has occurred `count` times: the side that kept checking, or under
+  // the "asian" rules kept checking or chasing, since its first occurrence loses, and otherwise the game is drawn.
+  // None if the position hasn't occurred that often.
+  #[pyo3(signature = (count = 3, rules = "asian"))]
+  pub fn adjudicate_repetition(&self, count: usize, rules: &str) -> PyResult<Option<&'static str>> {
+    let outcome = self.repetition_outcome(count, parse_rules(rules)?);
+    Ok(outcome.map(|winner| match winner {
+      Some(Color::Red) => "1-0",
+      Some(Color::Black) => "0-1",
+      None => "1/2-1/2",
+    }))
+  }
+
+  // Tapered material and piece-square evaluation in centipawns for the side to move. Kept up to date by every move,
+  // so this costs no board scan.
+  pub fn evaluate(&self) -> i32 {
+    self.evaluate_position()
+  }
+
+  // Static exchange evaluation of a (from_file, from_rank, to_file, to_rank) move: the material in centipawns the side
+  // to move ends up with after the captures on the destination square, each side recapturing with its least valuable
+  // piece and stopping when that would lose material. Negative when the move loses material.
+  pub fn see(&self, mv: (u8, u8, u8, u8)) -> PyResult<i32> {
+    let (from, to) = match (pos_to_idx(mv.0, mv.1), pos_to_idx(mv.2, mv.3)) {
+      (Some(from), Some(to)) if self.is_pseudo_legal(from, to) => (from, to),
+      _ => return Err(IllegalMove::new_err(format!("{mv:?} is not a move in this position"))),
+    };
+    Ok(self.static_exchange(from, to))
+  }
+
+  pub fn zobrist_hash(&self) -> u64 {
+    self.hash
+  }
+
+  // Exact position comparison, the hash only serves as a fast reject
+  pub fn same_position(&self, other: PyRef<'_, Board>) -> bool {
+    self.hash == other.hash && self.turn == other.turn && self.board == other.board
+  }
+
   pub fn turn(&self) -> bool {
     match self.turn {
       Color::Red => true,
       Color::Black => false,
     }
   }
+
+  // 1 for each action of the position's legal moves and 0 for the rest, see `actions`. `full` selects the 90 x 90
+  // action space.
+  #[pyo3(signature = (full = false))]
+  pub fn legal_move_mask<'py>(&self, py: Python<'py>, full: bool) -> Bound<'py, PyBytes> {
+    let mut mask = vec![0u8; actions::num_actions(full)];
+    self.write_legal_mask(full, &mut Vec::new(), Cell::from_mut(&mut mask[..]).as_slice_of_cells());
+    PyBytes::new(py, &mask)
+  }
+
+  // Feature planes of the position as "uint8" or "float32" values, see `planes`
+  #[pyo3(signature = (dtype = "uint8"))]
+  pub fn planes(&self, dtype: &str) -> PyResult<Array> {
+    let data = encode_planes(std::iter::once(self), parse_dtype(dtype)?);
+    Ok(Array::new(data, &[PLANES, RANK_SZ as usize, FILE_SZ as usize]))
+  }
+}
+
+// Parse many FENs in one call. `source` is either the path of a file with one FEN per line or an iterable of FEN
+// strings.
+#[pyfunction]
+#[pyo3(signature = (source, backend = "mailbox"))]
+fn load_fens(py: Python<'_>, source: &Bound<'_, PyAny>, backend: &str) -> PyResult<Vec<Board>> {
+  let backend = parse_backend(backend)?;
+  if let Ok(path) = source.extract::<PathBuf>() {
+    let text = std::fs::read_to_string(path)?;
+    return py
+      .detach(|| fen::parse_lines(text.lines(), backend))
+      .map_err(PyValueError::new_err);
+  }
+
+  let mut fens = Vec::new();
+  for item in source.try_iter()? {
+    fens.push(item?.extract::<String>()?);
+  }
+  py.detach(|| fen::parse_lines(fens.iter().map(String::as_str), backend))
+    .map_err(PyValueError::new_err)
+}
+
+// Generate the tablebase of `material` (such as "KRKAA") into the directory `path`, with every smaller table its
+// captures lead to that the directory doesn't have yet. Returns the materials of the tables written.
+#[pyfunction]
+#[pyo3(signature = (material, path, threads = 0))]
+fn generate_tablebase(py: Python<'_>, material: &str, path: PathBuf, threads: usize) -> PyResult<Vec<String>> {
+  let material = tablebase::Material::parse(material).map_err(PyValueError::new_err)?;
+  Ok(py.detach(|| tablebase::generate(&material, &path, threads))?)
+}
+
+// Write an opening book to `path` from games given as sequences of (from_file, from_rank, to_file, to_rank) moves
+// played from the start position. The first `max_ply` moves of each game are entered and a move needs to be played in
+// `min_count` games to be kept. Returns the number of entries written.
+#[pyfunction]
+#[pyo3(signature = (path, games, max_ply = 30, min_count = 1))]
+fn build_book(
+  py: Python<'_>,
+  path: PathBuf,
+  games: &Bound<'_, PyAny>,
+  max_ply: usize,
+  min_count: u32,
+) -> PyResult<usize> {
+  let mut lines = Vec::new();
+  for game in games.try_iter()? {
+    let mut moves = Vec::new();
+    for mv in game?.try_iter()?.take(max_ply) {
+      moves.push(mv?.extract::<(u8, u8, u8, u8)>()?);
+    }
+    lines.push(moves);
+  }
+  py.detach(|| {
+    let positions = book::replay(&Board::new(), &lines, max_ply).map_err(IllegalMove::new_err)?;
+    Ok(book::write(positions, min_count, &path)?)
+  })
+}
+
+// Count the moves of the first `max_ply` plies of the games of `source`, a `GameDatabase` or a list of PGN files, on
+// `threads` threads (0 for every core) and write the opening explorer file `path`. With `update` the counts are added
+// to those already in `path`, which must have been counted up to the same ply, and only the games of a database past
+// the ones counted before are replayed. Returns the number of games counted.
+#[pyfunction]
+#[pyo3(signature = (path, source, max_ply = 40, threads = 0, update = false))]
+fn build_explorer(
+  py: Python<'_>,
+  path: PathBuf,
+  source: &Bound<'_, PyAny>,
+  max_ply: usize,
+  threads: usize,
+  update: bool,
+) -> PyResult<u64> {
+  let database = source.extract::<PyRef<'_, GameDatabase>>().ok();
+  let paths = match database {
+    Some(_) => Vec::new(),
+    None => source.extract::<Vec<PathBuf>>()?,
+  };
+  let db = database.as_ref().map(|database| &database.db);
+  py.detach(|| {
+    let previous = match update && path.exists() {
+      true => Some(explorer::Explorer::open(&path)?),
+      false => None,
+    };
+    if let Some(previous) = previous.as_ref().filter(|previous| previous.max_ply() != max_ply) {
+      let counted = previous.max_ply();
+      return Err(PyValueError::new_err(format!(
+        "the explorer counted games up to ply {counted}, can't update it up to ply {max_ply}"
+      )));
+    }
+    let database_games = previous.as_ref().map_or(0, |previous| previous.database_games());
+    let source = match db {
+      Some(db) => explorer::Source::Database(db, database_games),
+      None => explorer::Source::Pgn(&paths),
+    };
+    let (counts, games) = explorer::count(&source, max_ply, threads)?;
+    let total = games + previous.as_ref().map_or(0, |previous| previous.games());
+    let database_games = db.map_or(database_games, |db| db.len().max(database_games));
+    explorer::write(&path, counts, total, database_games as u64, max_ply, previous.as_ref())?;
+    Ok(games)
+  })
+}
+
+// Play `n` games to the end from the start position, or `fen`, with the move policy "random" or "capture_first" (a
+// random capture if there is one) on `threads` threads (0 for every core). Games are drawn after `max_plies` plies.
+// `seed` fixes the games played, whatever the number of threads. With `record` the moves and result of every game are
+// kept.
+#[pyfunction]
+#[pyo3(signature = (n, policy = "random", max_plies = 400, threads = 0, fen = None, seed = 0, record = false))]
+fn simulate_games(
+  py: Python<'_>,
+  n: usize,
+  policy: &str,
+  max_plies: usize,
+  threads: usize,
+  fen: Option<&str>,
+  seed: u64,
+  record: bool,
+) -> PyResult<SimulationResult> {
+  let policy = match policy {
+    "random" => playout::Policy::Random,
+    "capture_first" => playout::Policy::CaptureFirst,
+    _ => return Err(PyValueError::new_err(format!("Unknown policy {policy:?}"))),
+  };
+  let start = match fen {
+    Some(fen) => Board::parse_fen(fen, Backend::Mailbox).map_err(PyValueError::new_err)?,
+    None => Board::new(),
+  };
+  let (stats, playouts) = py.detach(|| playout::simulate(&start, n, policy, max_plies, threads, seed, record));
+  Ok(SimulationResult {
+    games: n,
+    red_wins: stats.red_wins,
+    black_wins: stats.black_wins,
+    draws: stats.draws,
+    plies: stats.plies,
+    playouts: record.then_some(playouts),
+  })
+}
+
+// Write the feature planes of `boards` into `out`, a writable C-contiguous uint8 or float32 buffer holding
+// len(boards) * 15 * 10 * 9 values, such as a numpy array of shape (len(boards), 15, 10, 9)
+#[pyfunction]
+fn encode_boards(py: Python<'_>, boards: Vec<PyRef<'_, Board>>, out: &Bound<'_, PyAny>) -> PyResult<()> {
+  if let Ok(buffer) = PyBuffer::<u8>::get(out) {
+    return fill_planes(py, &boards, &buffer);
+  }
+  match PyBuffer::<f32>::get(out) {
+    Ok(buffer) => fill_planes(py, &boards, &buffer),
+    Err(_) => Err(PyTypeError::new_err("out must be a buffer of uint8 or float32 values")),
+  }
+}
+
+fn fill_planes<T: Element + Copy + From<u8>>(
+  py: Python<'_>,
+  boards: &[PyRef<'_, Board>],
+  out: &PyBuffer<T>,
+) -> PyResult<()> {
+  let values = buffer_values(py, out, boards.len(), PLANES_LEN)?;
+  for (board, values) in boards.iter().zip(values.chunks_exact(PLANES_LEN)) {
+    board.write_planes(values);
+  }
+  Ok(())
+}
+
+// Write the legal move masks of `boards` into `out`, a writable C-contiguous uint8, bool or float32 buffer holding
+// len(boards) * 2086 values, or len(boards) * 8100 with `full`, such as a numpy array of shape (len(boards), 2086)
+#[pyfunction]
+#[pyo3(signature = (boards, out, full = false))]
+fn legal_move_masks(py: Python<'_>, boards: Vec<PyRef<'_, Board>>, out: &Bound<'_, PyAny>, full: bool) -> PyResult<()> {
+  if let Ok(buffer) = PyBuffer::<u8>::get(out) {
+    return fill_masks(py, &boards, &buffer, full);
+  }
+  if let Ok(buffer) = PyBuffer::<bool>::get(out) {
+    return fill_masks(py, &boards, &buffer, full);
+  }
+  match PyBuffer::<f32>::get(out) {
+    Ok(buffer) => fill_masks(py, &boards, &buffer, full),
+    Err(_) => Err(PyTypeError::new_err(
+      "out must be a buffer of uint8, bool or float32 values",
+    )),
+  }
+}
+
+fn fill_masks<T: Element + Copy + From<bool>>(
+  py: Python<'_>,
+  boards: &[PyRef<'_, Board>],
+  out: &PyBuffer<T>,
+  full: bool,
+) -> PyResult<()> {
+  let len = actions::num_actions(full);
+  let values = buffer_values(py, out, boards.len(), len)?;
+  let mut moves = Vec::with_capacity(128);
+  for (board, values) in boards.iter().zip(values.chunks_exact(len)) {
+    board.write_legal_mask(full, &mut moves, values);
+  }
+  Ok(())
+}
+
+// Values of `out`, checked to be writable, C-contiguous and to hold `per_board` values for each of `boards` boards
+fn buffer_values<'a, T: Element>(
+  py: Python<'a>,
+  out: &'a PyBuffer<T>,
+  boards: usize,
+  per_board: usize,
+) -> PyResult<&'a [Cell<T>]> {
+  if out.item_count() != boards * per_board {
+    return Err(PyValueError::new_err(format!(
+      "out holds {} values, {boards} boards need {}",
+      out.item_count(),
+      boards * per_board
+    )));
+  }
+  out
+    .as_mut_slice(py)
+    .ok_or_else(|| PyValueError::new_err("out must be writable and C-contiguous"))
+}
+
+// Move of an action, as (from_file, from_rank, to_file, to_rank). `full` selects the 90 x 90 action space.
+#[pyfunction]
+#[pyo3(signature = (action, full = false))]
+fn action_to_move(action: usize, full: bool) -> PyResult<(u8, u8, u8, u8)> {
+  let (from, to) =
+    actions::action_move(action, full).ok_or_else(|| PyValueError::new_err(format!("{action} is not an action")))?;
+  Ok(move_tuple(from as u8, to as u8))
+}
+
+// Action of a (from_file, from_rank, to_file, to_rank) move. `full` selects the 90 x 90 action space.
+#[pyfunction]
+#[pyo3(signature = (mv, full = false))]
+fn move_to_action(mv: (u8, u8, u8, u8), full: bool) -> PyResult<usize> {
+  let action = match (pos_to_idx(mv.0, mv.1), pos_to_idx(mv.2, mv.3)) {
+    (Some(from), Some(to)) => actions::action(from, to, full),
+    _ => None,
+  };
+  action.ok_or_else(|| PyValueError::new_err(format!("{mv:?} is not an action")))
 }
 
 #[pymodule]
 #[pyo3(name = "_libxiangqi")]
 fn _libxiangqi(m: &Bound<'_, PyModule>) -> PyResult<()> {
   m.add_class::<Board>()?;
+  m.add_class::<Square>()?;
+  m.add_class::<Move>()?;
+  m.add_class::<SearchResult>()?;
+  m.add_class::<MctsResult>()?;
+  m.add_class::<SimulationResult>()?;
+  m.add_class::<LegalMoveIter>()?;
+  m.add_class::<Tablebase>()?;
+  m.add_class::<Book>()?;
+  m.add_class::<Game>()?;
+  m.add_class::<GameReader>()?;
+  m.add_class::<GameDatabase>()?;
+  m.add_class::<OpeningExplorer>()?;
+  m.add_class::<Array>()?;
+  m.add_class::<VecBoard>()?;
+  m.add_function(wrap_pyfunction!(load_fens, m)?)?;
+  m.add_function(wrap_pyfunction!(generate_tablebase, m)?)?;
+  m.add_function(wrap_pyfunction!(build_book, m)?)?;
+  m.add_function(wrap_pyfunction!(build_explorer, m)?)?;
+  m.add_function(wrap_pyfunction!(simulate_games, m)?)?;
+  m.add_function(wrap_pyfunction!(encode_boards, m)?)?;
+  m.add_function(wrap_pyfunction!(legal_move_masks, m)?)?;
+  m.add_function(wrap_pyfunction!(action_to_move, m)?)?;
+  m.add_function(wrap_pyfunction!(move_to_action, m)?)?;
   m.add("IllegalMove", m.py().get_type::<IllegalMove>())?;
+  m.add("START_FEN", fen::START_FEN)?;
+  m.add("MATE_SCORE", search::MATE)?;
+  m.add("NUM_ACTIONS", actions::NUM_ACTIONS)?;
   Ok(())
 }
@@ -0,0 +1,400 @@
+// Monte Carlo tree search with batched leaf evaluation.
+//
+// The tree is AlphaZero style: each node holds the prior of the move leading to it, its visit count and the sum of the
+// values backed up through it, and children are picked by PUCT, `Q + c_puct * P * sqrt(N) / (1 + n)`. Nodes live in an
+// arena of large blocks and the children of a node are one contiguous run, so a node is a u32 and expanding one is a
+// single allocation at most.
+//
+// Search threads select leaves and queue them, each adding a virtual loss along its path so that the threads, and the
+// leaves a thread queues in a row, spread over different lines. The evaluator, on the calling thread, takes up to
+// `batch` queued leaves at a time, evaluates their feature planes in one call and expands and backs up every leaf of
+// the batch. A thread that selects a leaf already queued stops selecting until the next batch is backed up.
+//
+// The tree is under one lock. Only the walk down the tree and the expansions and backups hold it: a thread replays the
+// moves to its leaf and generates the leaf's moves after letting go, and the evaluator encodes and evaluates a batch
+// without it. More threads therefore speed up the work on positions, but not the walks, which still take turns, so
+// they help less as the evaluation gets cheaper.
+
+use std::sync::{Condvar, Mutex};
+use std::thread;
+
+use crate::actions::{self, NUM_ACTIONS};
+use crate::Board;
+
+const BLOCK: usize = 1 << 16;
+const ROOT: u32 = 0;
+
+#[derive(Clone, Copy, Debug, PartialEq)]
+enum State {
+  Unexpanded,
+  // Queued for evaluation
+  Pending,
+  Expanded,
+  // No legal move, a loss for the side to move
+  Terminal,
+}
+
+#[derive(Clone, Copy, Debug)]
+struct Node {
+  mv: (u8, u8),
+  prior: f32,
+  visits: u32,
+  // Sum of the values backed up through this node, for the side that played `mv`
+  value: f32,
+  virtual_loss: u32,
+  children: u32,
+  len: u16,
+  state: State,
+}
+
+impl Node {
+  fn new(mv: (u8, u8), prior: f32) -> Node {
+    Node {
+      mv,
+      prior,
+      visits: 0,
+      value: 0.0,
+      virtual_loss: 0,
+      children: 0,
+      len: 0,
+      state: State::Unexpanded,
+    }
+  }
+}
+
+// Nodes in blocks of `BLOCK`, which are never reallocated
+struct Arena {
+  blocks: Vec<Vec<Node>>,
+}
+
+impl Arena {
+  fn get(&self, id: u32) -> &Node {
+    &self.blocks[id as usize / BLOCK][id as usize % BLOCK]
+  }
+
+  fn get_mut(&mut self, id: u32) -> &mut Node {
+    &mut self.blocks[id as usize / BLOCK][id as usize % BLOCK]
+  }
+
+  // Store `nodes` one after the other and return the id of the first
+  fn alloc(&mut self, nodes: impl ExactSizeIterator<Item = Node>) -> u32 {
+    if self.blocks.last().is_none_or(|block| block.len() + nodes.len() > BLOCK) {
+      self.blocks.push(Vec::with_capacity(BLOCK));
+    }
+    let block = self.blocks.len() - 1;
+    let first = block * BLOCK + self.blocks[block].len();
+    self.blocks[block].extend(nodes);
+    first as u32
+  }
+}
+
+// A leaf waiting for evaluation
+pub(crate) struct Leaf {
+  worker: usize,
+  path: Vec<u32>,
+  pub(crate) board: Board,
+  moves: Vec<(u8, u8)>,
+}
+
+enum Selection {
+  // Ended in a leaf claimed for evaluation, with the nodes and moves from the root to it
+  Leaf(Vec<u32>, Vec<(u8, u8)>),
+  // Ended in a terminal node, already backed up
+  Done,
+  // Ended in a node already queued for evaluation
+  Collision,
+}
+
+impl Leaf {
+  // Position of the leaf at the end of `line` and its legal moves, worked out without the lock
+  fn new(root: &Board, worker: usize, path: Vec<u32>, line: &[(u8, u8)]) -> Leaf {
+    let mut board = root.clone();
+    for &(from, to) in line {
+      board.apply_move(from as usize, to as usize);
+    }
+    let mut moves = Vec::with_capacity(64);
+    board.generate_legal(&mut moves);
+    Leaf {
+      worker,
+      path,
+      board,
+      moves,
+    }
+  }
+}
+
+struct Tree {
+  arena: Arena,
+  c_puct: f32,
+}
+
+impl Tree {
+  fn new(c_puct: f32) -> Tree {
+    let mut arena = Arena { blocks: Vec::new() };
+    arena.alloc(std::iter::once(Node::new((0, 0), 1.0)));
+    Tree { arena, c_puct }
+  }
+
+  fn children(&self, id: u32) -> impl Iterator<Item = u32> {
+    let node = self.arena.get(id);
+    node.children..node.children + node.len as u32
+  }
+
+  fn best_child(&self, id: u32) -> u32 {
+    let parent = self.arena.get(id);
+    let sqrt_n = ((parent.visits + parent.virtual_loss) as f32).sqrt();
+    let score = |child: &Node| {
+      let n = (child.visits + child.virtual_loss) as f32;
+      // A virtual loss counts as a visit that lost
+      let q = if n > 0.0 {
+        (child.value - child.virtual_loss as f32) / n
+      } else {
+        0.0
+      };
+      q + self.c_puct * child.prior * sqrt_n / (1.0 + n)
+    };
+    self
+      .children(id)
+      .max_by(|&a, &b| score(self.arena.get(a)).total_cmp(&score(self.arena.get(b))))
+      .unwrap()
+  }
+
+  // Walk down by PUCT to a node that is not expanded and claim it for evaluation, adding a virtual loss along the path
+  fn select(&mut self) -> Selection {
+    let (mut path, mut line) = (vec![ROOT], Vec::new());
+    let mut id = ROOT;
+    while self.arena.get(id).state == State::Expanded {
+      id = self.best_child(id);
+      line.push(self.arena.get(id).mv);
+      path.push(id);
+    }
+    match self.arena.get(id).state {
+      State::Pending => return Selection::Collision,
+      State::Terminal => {
+        self.backup(&path, -1.0, false);
+        return Selection::Done;
+      },
+      _ => {},
+    }
+    self.arena.get_mut(id).state = State::Pending;
+    for &id in &path {
+      self.arena.get_mut(id).virtual_loss += 1;
+    }
+    Selection::Leaf(path, line)
+  }
+
+  // The claimed leaf at the end of `path` has no legal move: a loss for the side to move there
+  fn terminal(&mut self, path: &[u32]) {
+    self.arena.get_mut(*path.last().unwrap()).state = State::Terminal;
+    self.backup(path, -1.0, true);
+  }
+
+  // Back `value`, for the side to move at the end of `path`, up the path
+  fn backup(&mut self, path: &[u32], value: f32, virtual_loss: bool) {
+    let mut value = -value;
+    for &id in path.iter().rev() {
+      let node = self.arena.get_mut(id);
+      node.visits += 1;
+      node.value += value;
+      node.virtual_loss -= virtual_loss as u32;
+      value = -value;
+    }
+  }
+
+  // Expand `leaf` with priors from `policy`, one value per action, and back up `value`. A move with no compact action,
+  // possible after a FEN with an advisor or an elephant off its usual squares, gets no prior.
+  fn expand(&mut self, leaf: &Leaf, policy: &[f32], value: f32) {
+    let priors: Vec<f32> = leaf
+      .moves
+      .iter()
+      .map(|&(from, to)| {
+        actions::action(from as usize, to as usize, false).map_or(0.0, |action| policy[action].max(0.0))
+      })
+      .collect();
+    let total: f32 = priors.iter().sum();
+    // Fall back to uniform priors when the policy gives the legal moves nothing to go by
+    let uniform = !(total.is_finite() && total > 0.0);
+    let children = leaf.moves.iter().zip(&priors).map(|(&mv, &prior)| match uniform {
+      true => Node::new(mv, 1.0 / priors.len() as f32),
+      false => Node::new(mv, prior / total),
+    });
+    let first = self.arena.alloc(children);
+    let node = self.arena.get_mut(*leaf.path.last().unwrap());
+    node.children = first;
+    node.len = leaf.moves.len() as u16;
+    node.state = State::Expanded;
+    self.backup(&leaf.path, value.clamp(-1.0, 1.0), true);
+  }
+}
+
+// Outcome of a search
+pub(crate) struct Outcome {
+  // Moves of the root with their visit counts and mean values for the side to move, most visited first
+  pub(crate) moves: Vec<((u8, u8), u32, f32)>,
+  // Mean value of the root for the side to move
+  pub(crate) value: f32,
+}
+
+// Search state shared by the threads
+struct Shared {
+  tree: Tree,
+  queue: Vec<Leaf>,
+  // Simulations not yet started
+  simulations: usize,
+  // Threads selecting leaves, and threads done
+  selecting: usize,
+  finished: usize,
+  // Leaves of each thread queued or being evaluated
+  outstanding: Vec<usize>,
+  // Threads waiting for the evaluator to release them
+  waiting: Vec<bool>,
+  failed: bool,
+}
+
+pub(crate) struct Params {
+  pub(crate) simulations: usize,
+  pub(crate) batch: usize,
+  pub(crate) threads: usize,
+  pub(crate) c_puct: f32,
+}
+
+// Run `params.simulations` simulations from `root`. `evaluate` gets the leaves of a batch and returns, for each in
+// order, `NUM_ACTIONS` policy values and a value in [-1, 1] for the side to move. Stops at the first error it returns.
+pub(crate) fn search<E>(root: &Board, params: &Params, mut evaluate: E) -> Result<Outcome, E::Error>
+where
+  E: Evaluate,
+{
+  let threads = match params.threads {
+    0 => thread::available_parallelism().map_or(1, |n| n.get()),
+    n => n,
+  };
+  let batch = params.batch.max(1);
+  let per_thread = batch.div_ceil(threads);
+  let shared = Mutex::new(Shared {
+    tree: Tree::new(params.c_puct),
+    queue: Vec::new(),
+    simulations: params.simulations.max(1),
+    selecting: threads,
+    finished: 0,
+    outstanding: vec![0; threads],
+    waiting: vec![false; threads],
+    failed: false,
+  });
+  let wake = Condvar::new();
+
+  let worker = |w: usize| {
+    let mut state = shared.lock().unwrap();
+    while !state.failed {
+      let (mut queued, mut collided) = (0, false);
+      while queued < per_thread && state.simulations > 0 {
+        state.simulations -= 1;
+        match state.tree.select() {
+          Selection::Leaf(path, line) => {
+            drop(state);
+            let leaf = Leaf::new(root, w, path, &line);
+            state = shared.lock().unwrap();
+            if leaf.moves.is_empty() {
+              state.tree.terminal(&leaf.path);
+            } else {
+              state.queue.push(leaf);
+              queued += 1;
+            }
+          },
+          Selection::Done => {},
+          Selection::Collision => {
+            state.simulations += 1;
+            collided = true;
+            break;
+          },
+        }
+      }
+      state.outstanding[w] += queued;
+      state.selecting -= 1;
+      if queued == 0 && !collided && state.outstanding[w] == 0 {
+        state.finished += 1;
+        wake.notify_all();
+        return;
+      }
+      // Wait for the leaves queued to be backed up, or after a collision for the next batch
+      state.waiting[w] = true;
+      wake.notify_all();
+      state = wake.wait_while(state, |s| !s.failed && s.waiting[w]).unwrap();
+    }
+  };
+
+  let result = thread::scope(|s| {
+    for w in 0..threads {
+      let worker = &worker;
+      s.spawn(move || worker(w));
+    }
+    loop {
+      let mut state = wake
+        .wait_while(shared.lock().unwrap(), |s| {
+          s.finished < threads && (s.queue.is_empty() || (s.queue.len() < batch && s.selecting > 0))
+        })
+        .unwrap();
+      if state.queue.is_empty() {
+        return Ok(());
+      }
+      let len = state.queue.len().min(batch);
+      let leaves: Vec<Leaf> = state.queue.drain(..len).collect();
+      drop(state);
+
+      let result = evaluate.evaluate(&leaves);
+      let mut state = shared.lock().unwrap();
+      match result {
+        Ok((policy, values)) => {
+          for (i, leaf) in leaves.iter().enumerate() {
+            state
+              .tree
+              .expand(leaf, &policy[i * NUM_ACTIONS..][..NUM_ACTIONS], values[i]);
+            state.outstanding[leaf.worker] -= 1;
+          }
+          // Release the threads with nothing left to wait for, counting them as selecting from now on so that the
+          // next batch waits for their leaves
+          for w in 0..threads {
+            if state.waiting[w] && state.outstanding[w] == 0 {
+              state.waiting[w] = false;
+              state.selecting += 1;
+            }
+          }
+          wake.notify_all();
+        },
+        Err(err) => {
+          state.failed = true;
+          wake.notify_all();
+          return Err(err);
+        },
+      }
+    }
+  });
+  result?;
+
+  let tree = shared.into_inner().unwrap().tree;
+  let root_node = tree.arena.get(ROOT);
+  let mut moves: Vec<_> = tree
+    .children(ROOT)
+    .map(|id| {
+      let node = tree.arena.get(id);
+      let q = if node.visits > 0 {
+        node.value / node.visits as f32
+      } else {
+        0.0
+      };
+      (node.mv, node.visits, q)
+    })
+    .collect();
+  moves.sort_by(|a, b| b.1.cmp(&a.1).then(b.2.total_cmp(&a.2)));
+  Ok(Outcome {
+    moves,
+    value: -root_node.value / root_node.visits.max(1) as f32,
+  })
+}
+
+// Leaf evaluator, called with the leaves of a batch
+pub(crate) trait Evaluate {
+  type Error;
+
+  // `NUM_ACTIONS` policy values per leaf one after the other, and one value per leaf
+  fn evaluate(&mut self, leaves: &[Leaf]) -> Result<(Vec<f32>, Vec<f32>), Self::Error>;
+}
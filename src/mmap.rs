@@ -0,0 +1,91 @@
+// Read-only memory-mapped files.
+//
+// On unix the file is mapped with `mmap(MAP_SHARED)`: pages are read in by the kernel on first access and shared
+// through the page cache by every process that maps the same file, so a large table costs no heap memory. Elsewhere
+// the file is read into memory instead.
+
+use std::io;
+use std::ops::Deref;
+use std::path::Path;
+
+pub(crate) struct Mmap {
+  #[cfg(unix)]
+  ptr: *const u8,
+  #[cfg(unix)]
+  len: usize,
+  #[cfg(not(unix))]
+  data: Vec<u8>,
+}
+
+// The mapping is read-only and owned by this value
+unsafe impl Send for Mmap {}
+unsafe impl Sync for Mmap {}
+
+impl Mmap {
+  #[cfg(unix)]
+  pub(crate) fn open(path: &Path) -> io::Result<Mmap> {
+    use std::os::unix::io::AsRawFd;
+
+    let file = std::fs::File::open(path)?;
+    let len = usize::try_from(file.metadata()?.len()).map_err(|_| io::Error::other("file too large to map"))?;
+    if len == 0 {
+      // mmap rejects empty mappings
+      return Ok(Mmap {
+        ptr: std::ptr::NonNull::dangling().as_ptr(),
+        len: 0,
+      });
+    }
+    // SAFETY: a fresh read-only shared mapping of a file we opened; the descriptor may be closed once it is mapped
+    let ptr = unsafe {
+      libc::mmap(
+        std::ptr::null_mut(),
+        len,
+        libc::PROT_READ,
+        libc::MAP_SHARED,
+        file.as_raw_fd(),
+        0,
+      )
+    };
+    if ptr == libc::MAP_FAILED {
+      return Err(io::Error::last_os_error());
+    }
+    Ok(Mmap {
+      ptr: ptr as *const u8,
+      len,
+    })
+  }
+
+  #[cfg(not(unix))]
+  pub(crate) fn open(path: &Path) -> io::Result<Mmap> {
+    Ok(Mmap {
+      data: std::fs::read(path)?,
+    })
+  }
+}
+
+impl Deref for Mmap {
+  type Target = [u8];
+
+  #[cfg(unix)]
+  fn deref(&self) -> &[u8] {
+    // SAFETY: `ptr` points to `len` mapped bytes that live as long as `self`
+    unsafe { std::slice::from_raw_parts(self.ptr, self.len) }
+  }
+
+  #[cfg(not(unix))]
+  fn deref(&self) -> &[u8] {
+    &self.data
+  }
+}
+
+#[cfg(unix)]
+impl Drop for Mmap {
+  fn drop(&mut self) {
+    if self.len > 0 {
+      // SAFETY: unmaps exactly the region mapped in `open`
+      unsafe {
+        libc::munmap(self.ptr as *mut libc::c_void, self.len);
+      }
+    }
+  }
+}
@@ -0,0 +1,324 @@
+// Piece-list move generator over the 12x12 mailbox.
+//
+// Every on-board square of the mailbox is surrounded by OUT_OF_BOUNDS sentinels: one row above and below, one
+// column on the left and two on the right. A single step from any on-board square therefore always lands inside
+// the 144-byte array, and a step that walks off the board lands on a sentinel. Horse and elephant jumps cover two
+// steps, but they only do so after their leg/eye square (one step away) was found empty, so they never index past
+// the array either.
+
+use crate::bitboard::{idx_to_sq, sq_to_idx, NUM_SQUARES};
+use crate::{Board, Color, Piece, PieceType, EMPTY, OUT_OF_BOUNDS};
+
+// Step offsets in the mailbox. North is towards black (increasing rank).
+pub(crate) const NORTH: isize = 12;
+pub(crate) const SOUTH: isize = -12;
+pub(crate) const EAST: isize = 1;
+pub(crate) const WEST: isize = -1;
+
+pub(crate) const ORTHOGONAL: [isize; 4] = [NORTH, SOUTH, EAST, WEST];
+pub(crate) const DIAGONAL: [isize; 4] = [NORTH + EAST, NORTH + WEST, SOUTH + EAST, SOUTH + WEST];
+
+// (target offset, leg offset). The leg must be empty for the horse to jump.
+pub(crate) const HORSE_JUMPS: [(isize, isize); 8] = [
+  (2 * NORTH + EAST, NORTH),
+  (2 * NORTH + WEST, NORTH),
+  (2 * SOUTH + EAST, SOUTH),
+  (2 * SOUTH + WEST, SOUTH),
+  (2 * EAST + NORTH, EAST),
+  (2 * EAST + SOUTH, EAST),
+  (2 * WEST + NORTH, WEST),
+  (2 * WEST + SOUTH, WEST),
+];
+
+// (target offset, eye offset). The eye must be empty for the elephant to move.
+pub(crate) const ELEPHANT_JUMPS: [(isize, isize); 4] = [
+  (2 * (NORTH + EAST), NORTH + EAST),
+  (2 * (NORTH + WEST), NORTH + WEST),
+  (2 * (SOUTH + EAST), SOUTH + EAST),
+  (2 * (SOUTH + WEST), SOUTH + WEST),
+];
+
+// Maximum number of pieces a side can have on the board.
+pub(crate) const MAX_PIECES: usize = 16;
+
+#[derive(Clone, Copy, Debug)]
+pub(crate) struct PieceList {
+  squares: [u8; MAX_PIECES],
+  len: usize,
+}
+
+impl PieceList {
+  pub(crate) const fn new() -> Self {
+    PieceList {
+      squares: [0; MAX_PIECES],
+      len: 0,
+    }
+  }
+
+  pub(crate) fn squares(&self) -> &[u8] {
+    &self.squares[..self.len]
+  }
+
+  pub(crate) fn add(&mut self, idx: u8) -> Option<()> {
+    if self.len == MAX_PIECES {
+      return None;
+    }
+    self.squares[self.len] = idx;
+    self.len += 1;
+    Some(())
+  }
+
+  pub(crate) fn remove(&mut self, idx: u8) {
+    if let Some(i) = self.squares().iter().position(|&sq| sq == idx) {
+      self.len -= 1;
+      self.squares[i] = self.squares[self.len];
+    }
+  }
+
+  pub(crate) fn relocate(&mut self, from: u8, to: u8) {
+    if let Some(sq) = self.squares[..self.len].iter_mut().find(|sq| **sq == from) {
+      *sq = to;
+    }
+  }
+}
+
+pub(crate) const fn idx_to_pos(idx: usize) -> (u8, u8) {
+  ((idx % 12) as u8 - 1, (idx / 12) as u8 - 1)
+}
+
+// Move between mailbox indices packed into 16 bits as `from | to << 7`, squares numbered `rank * 9 + file`
+pub(crate) const fn pack_move(from: usize, to: usize) -> u16 {
+  (idx_to_sq(from) | idx_to_sq(to) << 7) as u16
+}
+
+// Mailbox indices of a packed move, None if either square is off the board
+pub(crate) const fn unpack_move(mv: u16) -> Option<(usize, usize)> {
+  let (from, to) = ((mv & 0x7f) as usize, (mv >> 7 & 0x7f) as usize);
+  if from >= NUM_SQUARES || to >= NUM_SQUARES || mv >> 14 != 0 {
+    return None;
+  }
+  Some((sq_to_idx(from), sq_to_idx(to)))
+}
+
+const fn build_palace(side: Color) -> [bool; 144] {
+  let mut table = [false; 144];
+  let mut idx = 0;
+  while idx < 144 {
+    let (col, row) = (idx % 12, idx / 12);
+    if col >= 4 && col <= 6 {
+      table[idx] = match side {
+        Color::Red => row >= 1 && row <= 3,
+        Color::Black => row >= 8 && row <= 10,
+      };
+    }
+    idx += 1;
+  }
+  table
+}
+
+// Squares on the own side of the river, used to keep elephants home and to decide when soldiers may move sideways.
+const fn build_home(side: Color) -> [bool; 144] {
+  let mut table = [false; 144];
+  let mut idx = 0;
+  while idx < 144 {
+    let (col, row) = (idx % 12, idx / 12);
+    if col >= 1 && col <= 9 {
+      table[idx] = match side {
+        Color::Red => row >= 1 && row <= 5,
+        Color::Black => row >= 6 && row <= 10,
+      };
+    }
+    idx += 1;
+  }
+  table
+}
+
+pub(crate) const PALACE: [[bool; 144]; 2] = [build_palace(Color::Red), build_palace(Color::Black)];
+pub(crate) const HOME: [[bool; 144]; 2] = [build_home(Color::Red), build_home(Color::Black)];
+
+impl Color {
+  pub(crate) const fn index(self) -> usize {
+    match self {
+      Color::Red => 0,
+      Color::Black => 1,
+    }
+  }
+
+  pub(crate) const fn other(self) -> Color {
+    match self {
+      Color::Red => Color::Black,
+      Color::Black => Color::Red,
+    }
+  }
+
+  // Mailbox step a soldier of this side takes to move forward.
+  pub(crate) const fn forward(self) -> isize {
+    match self {
+      Color::Red => NORTH,
+      Color::Black => SOUTH,
+    }
+  }
+}
+
+impl Board {
+  // Whether `val` is a square a piece of `side` may land on: empty or holding an enemy piece.
+  #[inline]
+  fn is_target(val: u8, side: Color) -> bool {
+    val == EMPTY || (val != OUT_OF_BOUNDS && Piece::from_u8(val).is_some_and(|p| p.color != side))
+  }
+
+  // Generate every move for the side to move as (from, to) mailbox indices.
+  pub(crate) fn generate_moves(&self, moves: &mut Vec<(u8, u8)>) {
+    let side = self.turn;
+    for &from in self.pieces[side.index()].squares() {
+      let from_idx = from as usize;
+      let Some(piece) = Piece::from_u8(self.board[from_idx]) else {
+        continue;
+      };
+      generate_piece_moves(&self.board, from_idx, piece, moves);
+    }
+  }
+
+  // Whether `from` -> `to` is a move `generate_moves` would produce, checked without generating anything. Used to
+  // validate moves remembered from other positions, such as hash moves and killers.
+  pub(crate) fn is_pseudo_legal(&self, from: usize, to: usize) -> bool {
+    let Some(piece) = Piece::from_u8(self.board[from]) else {
+      return false;
+    };
+    let side = piece.color;
+    if side != self.turn || !Self::is_target(self.board[to], side) {
+      return false;
+    }
+    let d = to as isize - from as isize;
+    let from_i = from as isize;
+
+    match piece.piece_type {
+      PieceType::General => ORTHOGONAL.contains(&d) && PALACE[side.index()][to],
+      PieceType::Advisor => DIAGONAL.contains(&d) && PALACE[side.index()][to],
+      PieceType::Elephant => {
+        HOME[side.index()][to]
+          && ELEPHANT_JUMPS
+            .iter()
+            .any(|&(jump, eye)| jump == d && self.board[(from_i + eye) as usize] == EMPTY)
+      },
+      PieceType::Horse => HORSE_JUMPS
+        .iter()
+        .any(|&(jump, leg)| jump == d && self.board[(from_i + leg) as usize] == EMPTY),
+      PieceType::Chariot | PieceType::Cannon => {
+        let step = if from / 12 == to / 12 {
+          d.signum()
+        } else if from % 12 == to % 12 {
+          d.signum() * NORTH
+        } else {
+          return false;
+        };
+        let mut between = 0;
+        let mut sq = from_i + step;
+        while sq != to as isize {
+          between += (self.board[sq as usize] != EMPTY) as usize;
+          sq += step;
+        }
+        match (piece.piece_type, self.board[to] == EMPTY) {
+          (PieceType::Chariot, _) | (_, true) => between == 0,
+          _ => between == 1,
+        }
+      },
+      PieceType::Soldier => d == side.forward() || (!HOME[side.index()][from] && (d == EAST || d == WEST)),
+    }
+  }
+}
+
+// Moves of the piece on `from`, which must be `piece`. Only the mailbox is read, so positions that are not a `Board`,
+// such as those of the tablebase generator, can use it too.
+pub(crate) fn generate_piece_moves(board: &[u8; 144], from: usize, piece: Piece, moves: &mut Vec<(u8, u8)>) {
+  let side = piece.color;
+  let mut push = |to: isize| moves.push((from as u8, to as u8));
+  let from_i = from as isize;
+
+  match piece.piece_type {
+    PieceType::General => {
+      for d in ORTHOGONAL {
+        let to = from_i + d;
+        if PALACE[side.index()][to as usize] && Board::is_target(board[to as usize], side) {
+          push(to);
+        }
+      }
+    },
+    PieceType::Advisor => {
+      for d in DIAGONAL {
+        let to = from_i + d;
+        if PALACE[side.index()][to as usize] && Board::is_target(board[to as usize], side) {
+          push(to);
+        }
+      }
+    },
+    PieceType::Elephant => {
+      for (d, eye) in ELEPHANT_JUMPS {
+        if board[(from_i + eye) as usize] != EMPTY {
+          continue;
+        }
+        let to = from_i + d;
+        if HOME[side.index()][to as usize] && Board::is_target(board[to as usize], side) {
+          push(to);
+        }
+      }
+    },
+    PieceType::Horse => {
+      for (d, leg) in HORSE_JUMPS {
+        if board[(from_i + leg) as usize] != EMPTY {
+          continue;
+        }
+        let to = from_i + d;
+        if Board::is_target(board[to as usize], side) {
+          push(to);
+        }
+      }
+    },
+    PieceType::Chariot => {
+      for d in ORTHOGONAL {
+        let mut to = from_i + d;
+        while board[to as usize] == EMPTY {
+          push(to);
+          to += d;
+        }
+        if Board::is_target(board[to as usize], side) {
+          push(to);
+        }
+      }
+    },
+    PieceType::Cannon => {
+      for d in ORTHOGONAL {
+        let mut to = from_i + d;
+        while board[to as usize] == EMPTY {
+          push(to);
+          to += d;
+        }
+        if board[to as usize] == OUT_OF_BOUNDS {
+          continue;
+        }
+        // Jump the screen and capture the first piece behind it
+        to += d;
+        while board[to as usize] == EMPTY {
+          to += d;
+        }
+        if Board::is_target(board[to as usize], side) {
+          push(to);
+        }
+      }
+    },
+    PieceType::Soldier => {
+      let to = from_i + side.forward();
+      if Board::is_target(board[to as usize], side) {
+        push(to);
+      }
+      if !HOME[side.index()][from] {
+        for d in [EAST, WEST] {
+          let to = from_i + d;
+          if Board::is_target(board[to as usize], side) {
+            push(to);
+          }
+        }
+      }
+    },
+  }
+}
@@ -0,0 +1,275 @@
+// Move ordering.
+//
+// `MovePicker` hands the search one legal move at a time, in stages, so that a node cut off early never pays for
+// the rest:
+//
+// 1. the hash move, checked for legality without generating anything,
+// 2. captures, most valuable victim first and then least valuable attacker (MVV-LVA), selected one at a time,
+// 3. the two killer moves of the ply, quiet moves that caused a cutoff in a sibling node,
+// 4. the remaining quiet moves, sorted by the history table,
+// 5. the captures that lose material according to static exchange evaluation, put aside in stage 2.
+//
+// Pseudo-legal moves are generated once, when the captures are needed, and each move is only tested for legality when
+// it is about to be returned.
+//
+// In quiescence search the picker only returns the captures that don't lose material, optionally followed by the
+// quiet moves that give check.
+//
+// `LegalMoves` is the same idea without the search state, behind `Board.iter_legal_moves`.
+
+use crate::eval::piece_value;
+use crate::legality::LegalFilter;
+use crate::{Board, Piece, EMPTY};
+
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+enum Mode {
+  #[default]
+  AllMoves,
+  Captures,
+  CapturesAndChecks,
+}
+
+// Quiet move scores, by mailbox piece code and destination
+pub(crate) type History = [[i32; 144]; 0x18];
+
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+enum Stage {
+  #[default]
+  HashMove,
+  GenerateMoves,
+  Captures,
+  Killers,
+  SortQuiets,
+  Quiets,
+  BadCaptures,
+  QuietChecks,
+  Done,
+}
+
+#[derive(Default)]
+pub(crate) struct MovePicker {
+  mode: Mode,
+  stage: Stage,
+  hash_move: Option<(u8, u8)>,
+  killers: [Option<(u8, u8)>; 2],
+  // Killers that were valid here and already returned
+  played_killers: [Option<(u8, u8)>; 2],
+  generated: Vec<(u8, u8)>,
+  captures: Vec<((u8, u8), i32)>,
+  quiets: Vec<((u8, u8), i32)>,
+  bad_captures: Vec<(u8, u8)>,
+  index: usize,
+  filter: Option<LegalFilter>,
+}
+
+#[inline]
+fn value_of(code: u8) -> i32 {
+  Piece::from_u8(code).map_or(0, |p| piece_value(p.piece_type))
+}
+
+#[inline]
+pub(crate) fn mvv_lva(board: &[u8; 144], (from, to): (u8, u8)) -> i32 {
+  value_of(board[to as usize]) * 16 - value_of(board[from as usize]) / 16
+}
+
+impl MovePicker {
+  // Start over for a new node. The move buffers are kept so that a picker can be reused without allocating.
+  pub(crate) fn reset(&mut self, hash_move: Option<(u8, u8)>, killers: [Option<(u8, u8)>; 2]) {
+    self.mode = Mode::AllMoves;
+    self.stage = Stage::HashMove;
+    self.hash_move = hash_move;
+    self.killers = killers;
+    self.played_killers = [None; 2];
+    self.captures.clear();
+    self.quiets.clear();
+    self.bad_captures.clear();
+    self.index = 0;
+    self.filter = None;
+  }
+
+  // Start over for a quiescence node: captures that don't lose material, then quiet checks if `checks`
+  pub(crate) fn reset_quiescence(&mut self, checks: bool) {
+    self.reset(None, [None; 2]);
+    self.mode = if checks {
+      Mode::CapturesAndChecks
+    } else {
+      Mode::Captures
+    };
+  }
+
+  // Whether only captures that lose material are left
+  pub(crate) fn bad_captures_left(&self) -> bool {
+    self.stage == Stage::BadCaptures
+  }
+
+  fn legal(&mut self, board: &Board, (from, to): (u8, u8)) -> bool {
+    self
+      .filter
+      .get_or_insert_with(|| LegalFilter::new(board))
+      .is_legal(from as usize, to as usize)
+  }
+
+  // Next legal move of `board`, which must be the position the picker was reset for
+  pub(crate) fn next(&mut self, board: &Board, history: &History) -> Option<(u8, u8)> {
+    loop {
+      match self.stage {
+        Stage::HashMove => {
+          self.stage = Stage::GenerateMoves;
+          if let Some(mv) = self.hash_move {
+            if board.is_pseudo_legal(mv.0 as usize, mv.1 as usize) && self.legal(board, mv) {
+              return Some(mv);
+            }
+            self.hash_move = None;
+          }
+        },
+        Stage::GenerateMoves => {
+          self.generated.clear();
+          board.generate(&mut self.generated);
+          for &mv in &self.generated {
+            if Some(mv) == self.hash_move {
+              continue;
+            }
+            if board.board[mv.1 as usize] == EMPTY {
+              self.quiets.push((mv, 0));
+            } else {
+              self.captures.push((mv, mvv_lva(&board.board, mv)));
+            }
+          }
+          self.stage = Stage::Captures;
+        },
+        Stage::Captures => {
+          if self.index == self.captures.len() {
+            self.stage = match self.mode {
+              Mode::AllMoves => Stage::Killers,
+              Mode::Captures => Stage::Done,
+              Mode::CapturesAndChecks => Stage::QuietChecks,
+            };
+            self.index = 0;
+            continue;
+          }
+          // Selection sort, one step per move returned
+          let best = (self.index..self.captures.len())
+            .max_by_key(|&i| self.captures[i].1)
+            .unwrap();
+          self.captures.swap(self.index, best);
+          let mv = self.captures[self.index].0;
+          self.index += 1;
+          // Taking a piece at least as valuable as the capturer can't lose material, anything else is checked
+          let (victim, attacker) = (board.board[mv.1 as usize], board.board[mv.0 as usize]);
+          if value_of(victim) < value_of(attacker) && board.static_exchange(mv.0 as usize, mv.1 as usize) < 0 {
+            if self.mode == Mode::AllMoves {
+              self.bad_captures.push(mv);
+            }
+            continue;
+          }
+          if self.legal(board, mv) {
+            return Some(mv);
+          }
+        },
+        Stage::Killers => {
+          if self.index == self.killers.len() {
+            self.stage = Stage::SortQuiets;
+            continue;
+          }
+          let i = self.index;
+          self.index += 1;
+          let Some(mv) = self.killers[i] else {
+            continue;
+          };
+          if Some(mv) == self.hash_move
+            || self.played_killers.contains(&Some(mv))
+            || board.board[mv.1 as usize] != EMPTY
+            || !board.is_pseudo_legal(mv.0 as usize, mv.1 as usize)
+          {
+            continue;
+          }
+          self.played_killers[i] = Some(mv);
+          if self.legal(board, mv) {
+            return Some(mv);
+          }
+        },
+        Stage::SortQuiets => {
+          for (mv, score) in &mut self.quiets {
+            *score = history[board.board[mv.0 as usize] as usize][mv.1 as usize];
+          }
+          self.quiets.sort_unstable_by_key(|&(_, score)| -score);
+          self.stage = Stage::Quiets;
+          self.index = 0;
+        },
+        Stage::Quiets => {
+          let Some(&(mv, _)) = self.quiets.get(self.index) else {
+            self.stage = Stage::BadCaptures;
+            self.index = 0;
+            continue;
+          };
+          self.index += 1;
+          if !self.played_killers.contains(&Some(mv)) && self.legal(board, mv) {
+            return Some(mv);
+          }
+        },
+        Stage::BadCaptures => {
+          let Some(&mv) = self.bad_captures.get(self.index) else {
+            self.stage = Stage::Done;
+            continue;
+          };
+          self.index += 1;
+          if self.legal(board, mv) {
+            return Some(mv);
+          }
+        },
+        Stage::QuietChecks => {
+          let Some(&(mv, _)) = self.quiets.get(self.index) else {
+            self.stage = Stage::Done;
+            continue;
+          };
+          self.index += 1;
+          if board.gives_check(mv.0 as usize, mv.1 as usize) && self.legal(board, mv) {
+            return Some(mv);
+          }
+        },
+        Stage::Done => return None,
+      }
+    }
+  }
+}
+
+// Lazy iterator over the legal moves of a position. Moves are generated up front, which is cheap, but each one is only
+// checked for legality when it is read.
+pub(crate) struct LegalMoves {
+  filter: LegalFilter,
+  moves: Vec<(u8, u8)>,
+  index: usize,
+}
+
+impl Board {
+  // Legal moves of the side to move, captures by MVV-LVA first if `captures_first`, otherwise in generation order
+  pub(crate) fn legal_moves_lazy(&self, captures_first: bool) -> LegalMoves {
+    let mut moves = Vec::with_capacity(64);
+    self.generate(&mut moves);
+    if captures_first {
+      moves.sort_by_cached_key(|&mv| match self.board[mv.1 as usize] {
+        EMPTY => 1,
+        _ => -mvv_lva(&self.board, mv),
+      });
+    }
+    LegalMoves {
+      filter: LegalFilter::new(self),
+      moves,
+      index: 0,
+    }
+  }
+}
+
+impl Iterator for LegalMoves {
+  type Item = (u8, u8);
+
+  fn next(&mut self) -> Option<(u8, u8)> {
+    while let Some(&(from, to)) = self.moves.get(self.index) {
+      self.index += 1;
+      if self.filter.is_legal(from as usize, to as usize) {
+        return Some((from, to));
+      }
+    }
+    None
+  }
+}
@@ -0,0 +1,137 @@
+// Perft: count the leaf nodes of the move tree to check and benchmark move generation.
+
+use std::sync::atomic::{AtomicU64, AtomicUsize, Ordering};
+use std::thread;
+
+use crate::Board;
+
+impl Board {
+  // Count the leaves `depth` plies below the current position. Leaves are bulk counted: at depth 1 the number of
+  // generated moves is returned without playing them.
+  pub(crate) fn perft_count(&mut self, depth: u32) -> u64 {
+    if depth == 0 {
+      return 1;
+    }
+    let mut buffers = vec![Vec::with_capacity(64); depth as usize];
+    self.perft_inner(depth, &mut buffers)
+  }
+
+  // Leaf counts below each move of the current position
+  pub(crate) fn perft_divide_counts(&mut self, depth: u32) -> Vec<((u8, u8), u64)> {
+    let mut moves = Vec::with_capacity(64);
+    self.generate_legal(&mut moves);
+
+    let mut buffers = vec![Vec::with_capacity(64); depth.saturating_sub(1) as usize];
+    moves
+      .into_iter()
+      .map(|(from, to)| {
+        let undo = self.apply_move(from as usize, to as usize);
+        let nodes = if depth <= 1 {
+          1
+        } else {
+          self.perft_inner(depth - 1, &mut buffers)
+        };
+        self.unapply_move(undo);
+        ((from, to), nodes)
+      })
+      .collect()
+  }
+
+  fn perft_inner(&mut self, depth: u32, buffers: &mut [Vec<(u8, u8)>]) -> u64 {
+    let (moves, rest) = buffers.split_first_mut().unwrap();
+    moves.clear();
+    self.generate_legal(moves);
+    if depth == 1 {
+      return moves.len() as u64;
+    }
+
+    let mut nodes = 0;
+    for i in 0..moves.len() {
+      let (from, to) = moves[i];
+      let undo = self.apply_move(from as usize, to as usize);
+      nodes += self.perft_inner(depth - 1, rest);
+      self.unapply_move(undo);
+    }
+    nodes
+  }
+}
+
+impl Board {
+  // Total perft nodes, splitting the tree across `threads` worker threads (0 uses every available core)
+  pub(crate) fn perft_nodes(&self, depth: u32, threads: usize) -> u64 {
+    if threads == 1 || depth <= 1 {
+      return self.clone().perft_count(depth);
+    }
+    self
+      .perft_divide_parallel(depth, threads)
+      .iter()
+      .map(|(_, nodes)| nodes)
+      .sum()
+  }
+
+  // Parallel perft divide. The work is split into the subtrees below each root move, or below each pair of root move
+  // and reply when the tree is deep enough, so that a few dozen root moves still keep many threads busy. Workers pull
+  // subtrees from a shared counter and each searches its own copy of the board.
+  pub(crate) fn perft_divide_parallel(&self, depth: u32, threads: usize) -> Vec<((u8, u8), u64)> {
+    if depth <= 1 {
+      return self.clone().perft_divide_counts(depth);
+    }
+    let threads = match threads {
+      0 => thread::available_parallelism().map_or(1, |n| n.get()),
+      n => n,
+    };
+
+    let mut board = self.clone();
+    let mut roots = Vec::with_capacity(64);
+    board.generate_legal(&mut roots);
+
+    let split = if depth >= 3 { 2 } else { 1 };
+    let mut tasks: Vec<(usize, Option<(u8, u8)>)> = Vec::new();
+    if split == 2 {
+      let mut replies = Vec::with_capacity(64);
+      for (i, &(from, to)) in roots.iter().enumerate() {
+        let undo = board.apply_move(from as usize, to as usize);
+        replies.clear();
+        board.generate_legal(&mut replies);
+        board.unapply_move(undo);
+        tasks.extend(replies.iter().map(|&reply| (i, Some(reply))));
+      }
+    } else {
+      tasks.extend((0..roots.len()).map(|i| (i, None)));
+    }
+
+    let counts: Vec<AtomicU64> = roots.iter().map(|_| AtomicU64::new(0)).collect();
+    let next = AtomicUsize::new(0);
+    let remaining = depth - split;
+
+    thread::scope(|s| {
+      for _ in 0..threads.min(tasks.len()).max(1) {
+        s.spawn(|| {
+          let mut board = self.clone();
+          let mut buffers = vec![Vec::with_capacity(64); remaining as usize];
+          while let Some(&(root, reply)) = tasks.get(next.fetch_add(1, Ordering::Relaxed)) {
+            let (from, to) = roots[root];
+            let undo = board.apply_move(from as usize, to as usize);
+            let nodes = match reply {
+              Some((from, to)) => {
+                let reply_undo = board.apply_move(from as usize, to as usize);
+                let nodes = board.perft_inner(remaining, &mut buffers);
+                board.unapply_move(reply_undo);
+                nodes
+              },
+              None => board.perft_inner(remaining, &mut buffers),
+            };
+            board.unapply_move(undo);
+            counts[root].fetch_add(nodes, Ordering::Relaxed);
+          }
+        });
+      }
+    });
+
+    roots
+      .into_iter()
+      .zip(counts)
+      .map(|(mv, nodes)| (mv, nodes.into_inner()))
+      .collect()
+  }
+}
@@ -0,0 +1,349 @@
+// Game records.
+//
+// `Reader` streams games out of PGN text one at a time, so memory stays bounded by the longest game whatever the size
+// of the file. A game is a block of `[Key "Value"]` header lines followed by movetext, and ends at a result token
+// (`1-0`, `0-1`, `1/2-1/2` or `*`), at a blank line after the movetext, or where the headers of the next game start.
+// Files of bare movetext without headers are read the same way.
+//
+// Moves are replayed from the start position, or the `FEN` header, and checked against the legal moves of the position
+// they are played in. Each move may be written in either notation:
+//
+// - ICCS gives the from and to squares, files `a`-`i` from red's left and ranks `0`-`9` from red's side: `h2e2`, also
+//   written `H2-E2`.
+// - WXF gives the piece, the file it stands on, the direction and a file or a number of ranks: `C2.5`, `H8+7`, `R1-2`.
+//   Files are counted 1-9 from the right of the side to move. Of two alike pieces on one file the front one is `+` and
+//   the rear one `-`, written in place of the file (`C+.5`) or before the piece (`+C.5`).
+//
+// Comments, variations, move numbers, NAGs and `!`/`?` annotations are skipped. Moves in Chinese characters are not
+// supported and stop the replay like an illegal move does.
+
+use std::io::{self, BufRead};
+
+use crate::{pos_to_idx, Backend, Board, Color, Piece, PieceType, FILE_SZ};
+
+pub(crate) struct Game {
+  pub(crate) headers: Vec<(String, String)>,
+  pub(crate) start: Board,
+  // Moves replayed, as (from, to) mailbox indices, up to the end of the game or the first move that failed
+  pub(crate) moves: Vec<(u8, u8)>,
+  // Position after each move, the start position first, when the reader keeps them
+  pub(crate) positions: Vec<Board>,
+  // "1-0", "0-1" or "1/2-1/2", from the result token or else the `Result` header
+  pub(crate) result: Option<&'static str>,
+  // Why the replay stopped early
+  pub(crate) error: Option<String>,
+}
+
+// Headers and movetext of one game, before replaying it
+#[derive(Default)]
+struct RawGame {
+  headers: Vec<(String, String)>,
+  movetext: String,
+}
+
+pub(crate) struct Reader<R> {
+  input: R,
+  buf: Vec<u8>,
+  // Header line of the next game, read while looking for the end of the current one
+  pending: Option<String>,
+  keep_positions: bool,
+}
+
+impl<R: BufRead> Reader<R> {
+  pub(crate) fn new(input: R, keep_positions: bool) -> Self {
+    Reader {
+      input,
+      buf: Vec::new(),
+      pending: None,
+      keep_positions,
+    }
+  }
+
+  // Next line without its line ending, None at the end of the input. Bytes that aren't UTF-8, from GBK encoded
+  // archives for example, are replaced.
+  fn read_line(&mut self) -> io::Result<Option<String>> {
+    if let Some(line) = self.pending.take() {
+      return Ok(Some(line));
+    }
+    self.buf.clear();
+    if self.input.read_until(b'\n', &mut self.buf)? == 0 {
+      return Ok(None);
+    }
+    let line = String::from_utf8_lossy(&self.buf);
+    Ok(Some(line.trim_end_matches(['\n', '\r']).to_string()))
+  }
+
+  fn read_raw(&mut self) -> io::Result<Option<RawGame>> {
+    let mut game = RawGame::default();
+    // Comment braces left open, a blank line inside a comment doesn't end the game
+    let mut open_comments = 0i32;
+    let mut blank_after_headers = false;
+    while let Some(line) = self.read_line()? {
+      let trimmed = line.trim();
+      if open_comments == 0 && trimmed.starts_with('[') {
+        if !game.movetext.is_empty() || blank_after_headers {
+          self.pending = Some(line);
+          break;
+        }
+        game.headers.extend(parse_header(trimmed));
+      } else if trimmed.is_empty() {
+        if !game.movetext.is_empty() && open_comments == 0 {
+          break;
+        }
+        blank_after_headers = !game.headers.is_empty();
+      } else if !trimmed.starts_with('%') || open_comments > 0 {
+        game.movetext.push_str(trimmed);
+        game.movetext.push('\n');
+        open_comments += trimmed.matches('{').count() as i32 - trimmed.matches('}').count() as i32;
+        let last = trimmed.rsplit(char::is_whitespace).next().unwrap_or_default();
+        if open_comments <= 0 && parse_result(last).is_some() {
+          break;
+        }
+      }
+    }
+    Ok((!game.headers.is_empty() || !game.movetext.is_empty()).then_some(game))
+  }
+
+  fn replay(&self, raw: RawGame) -> Game {
+    let header = |key: &str| raw.headers.iter().find(|(k, _)| k == key).map(|(_, v)| v.as_str());
+    let mut game = Game {
+      start: Board::new(),
+      moves: Vec::new(),
+      positions: Vec::new(),
+      result: header("Result").and_then(parse_result).flatten(),
+      error: None,
+      headers: Vec::new(),
+    };
+    if let Some(fen) = header("FEN") {
+      match Board::parse_fen(fen, Backend::Mailbox) {
+        Ok(board) => game.start = board,
+        Err(err) => game.error = Some(format!("bad FEN header: {err}")),
+      }
+    }
+
+    let mut board = game.start.clone();
+    let mut legal = Vec::with_capacity(64);
+    let mut tokens = Tokens(&raw.movetext);
+    while game.error.is_none() {
+      let Some(token) = tokens.next() else {
+        break;
+      };
+      if let Some(result) = parse_result(token) {
+        game.result = result.or(game.result);
+        break;
+      }
+      if self.keep_positions {
+        game.positions.push(board.clone());
+      }
+      match parse_move(&board, &mut legal, token) {
+        Ok((from, to)) => {
+          board.apply_move(from as usize, to as usize);
+          game.moves.push((from, to));
+        },
+        Err(err) => game.error = Some(format!("ply {}: {token:?} {err}", game.moves.len() + 1)),
+      }
+    }
+    // A failed move leaves the position it was tried in as the last one
+    if self.keep_positions && game.error.is_none() {
+      game.positions.push(board);
+    }
+    game.headers = raw.headers;
+    game
+  }
+}
+
+impl<R: BufRead> Iterator for Reader<R> {
+  type Item = io::Result<Game>;
+
+  fn next(&mut self) -> Option<io::Result<Game>> {
+    match self.read_raw() {
+      Ok(raw) => Some(Ok(self.replay(raw?))),
+      Err(err) => Some(Err(err)),
+    }
+  }
+}
+
+// `[Key "Value"]`
+fn parse_header(line: &str) -> Option<(String, String)> {
+  let inner = line.strip_prefix('[')?.trim_end().strip_suffix(']')?;
+  let (key, value) = inner.split_once(char::is_whitespace)?;
+  let value = value.trim().strip_prefix('"')?.strip_suffix('"')?;
+  Some((key.to_string(), value.replace("\\\"", "\"")))
+}
+
+// Some(None) for `*`, the result of an unfinished game
+fn parse_result(token: &str) -> Option<Option<&'static str>> {
+  match token {
+    "1-0" => Some(Some("1-0")),
+    "0-1" => Some(Some("0-1")),
+    "1/2-1/2" => Some(Some("1/2-1/2")),
+    "*" => Some(None),
+    _ => None,
+  }
+}
+
+// Move and result tokens of movetext
+struct Tokens<'a>(&'a str);
+
+impl<'a> Iterator for Tokens<'a> {
+  type Item = &'a str;
+
+  fn next(&mut self) -> Option<&'a str> {
+    loop {
+      let text = self.0.trim_start();
+      let mut chars = text.chars();
+      let skip = match chars.next()? {
+        '{' => text.find('}').map_or(text.len(), |end| end + 1),
+        ';' => text.find('\n').unwrap_or(text.len()),
+        '(' => variation_len(text),
+        '$' => 1 + text[1..].find(|c: char| !c.is_ascii_digit()).unwrap_or(text.len() - 1),
+        // Stray ends of comments and variations
+        '}' | ')' => 1,
+        _ => {
+          let len = text.find(ends_token).unwrap_or(text.len());
+          self.0 = &text[len..];
+          let token = text[..len].trim_end_matches(['!', '?', '#']);
+          // Move numbers, "1." or "12...", possibly glued to the move
+          let digits = token.find(|c: char| !c.is_ascii_digit()).unwrap_or(token.len());
+          let token = match token[digits..].trim_start_matches('.') {
+            rest if digits > 0 && token[digits..].starts_with('.') => rest,
+            _ => token,
+          };
+          if token.is_empty() {
+            continue;
+          }
+          return Some(token);
+        },
+      };
+      self.0 = &text[skip..];
+    }
+  }
+}
+
+fn ends_token(c: char) -> bool {
+  c.is_whitespace() || "{}();".contains(c)
+}
+
+// Length of the variation at the start of `text`, nested variations and comments included
+fn variation_len(text: &str) -> usize {
+  let mut depth = 0;
+  let mut in_comment = false;
+  for (i, c) in text.char_indices() {
+    match c {
+      '{' => in_comment = true,
+      '}' => in_comment = false,
+      '(' if !in_comment => depth += 1,
+      ')' if !in_comment => {
+        depth -= 1;
+        if depth == 0 {
+          return i + 1;
+        }
+      },
+      _ => {},
+    }
+  }
+  text.len()
+}
+
+// Parse a move of `board` in ICCS or WXF notation and check that it is legal. `legal` is scratch space for the legal
+// moves, only generated to match a WXF move against.
+fn parse_move(board: &Board, legal: &mut Vec<(u8, u8)>, token: &str) -> Result<(u8, u8), &'static str> {
+  if !token.is_ascii() {
+    return Err("is not in ICCS or WXF notation");
+  }
+  let bytes = token.to_ascii_lowercase().into_bytes();
+  let iccs: Vec<u8> = bytes.iter().copied().filter(|&b| b != b'-').collect();
+  if let [ff @ b'a'..=b'i', fr @ b'0'..=b'9', tf @ b'a'..=b'i', tr @ b'0'..=b'9'] = iccs[..] {
+    let from = pos_to_idx(ff - b'a', fr - b'0').unwrap();
+    let to = pos_to_idx(tf - b'a', tr - b'0').unwrap();
+    return match board.is_pseudo_legal(from, to) && board.is_legal(from, to) {
+      true => Ok((from as u8, to as u8)),
+      false => Err("is not a legal move"),
+    };
+  }
+  legal.clear();
+  board.generate_legal(legal);
+  parse_wxf(board, legal, &bytes)
+}
+
+fn parse_wxf(board: &Board, legal: &[(u8, u8)], bytes: &[u8]) -> Result<(u8, u8), &'static str> {
+  const NOTATION: &str = "is not in ICCS or WXF notation";
+  let (piece, file, tandem, op, arg) = match *bytes {
+    [tandem @ (b'+' | b'-'), piece, op, arg] => (piece, None, Some(tandem), op, arg),
+    [piece, tandem @ (b'+' | b'-'), op, arg] => (piece, None, Some(tandem), op, arg),
+    [piece, file @ b'1'..=b'9', op, arg] => (piece, Some(file - b'0'), None, op, arg),
+    _ => return Err(NOTATION),
+  };
+  let piece_type = match piece {
+    b'k' => PieceType::General,
+    b'a' => PieceType::Advisor,
+    b'b' | b'e' => PieceType::Elephant,
+    b'h' | b'n' => PieceType::Horse,
+    b'r' => PieceType::Chariot,
+    b'c' => PieceType::Cannon,
+    b'p' => PieceType::Soldier,
+    _ => return Err(NOTATION),
+  };
+  let direction = match op {
+    b'+' => 1,
+    b'-' => -1,
+    b'.' | b'=' => 0,
+    _ => return Err(NOTATION),
+  };
+  let arg = match arg {
+    b'1'..=b'9' => arg - b'0',
+    _ => return Err(NOTATION),
+  };
+
+  let side = board.turn;
+  // Files counted from the right of the side to move, ranks towards the opponent
+  let file_of = |idx: u8| match side {
+    Color::Red => FILE_SZ - (idx % 12 - 1),
+    Color::Black => idx % 12,
+  };
+  let rank_of = |idx: u8| match side {
+    Color::Red => (idx / 12) as i32,
+    Color::Black => -((idx / 12) as i32),
+  };
+  let straight = matches!(
+    piece_type,
+    PieceType::General | PieceType::Chariot | PieceType::Cannon | PieceType::Soldier
+  );
+  let code = Piece::new(piece_type, side).to_u8();
+  let mut candidates: Vec<(u8, u8)> = legal
+    .iter()
+    .copied()
+    .filter(|&(from, to)| {
+      let advance = rank_of(to) - rank_of(from);
+      board.board[from as usize] == code
+        && file.is_none_or(|file| file_of(from) == file)
+        && advance.signum() == direction
+        && match (straight, direction) {
+          (true, 0) | (false, _) => file_of(to) == arg,
+          (true, _) => advance.unsigned_abs() == arg as u32,
+        }
+    })
+    .collect();
+  if let Some(tandem) = tandem {
+    // The front or rear one of the alike pieces on the file of the piece moved, which needs another one to share it
+    let squares: Vec<u8> = (0..board.board.len() as u8)
+      .filter(|&sq| board.board[sq as usize] == code)
+      .collect();
+    candidates.retain(|&(from, _)| {
+      let alike = squares
+        .iter()
+        .filter(|&&sq| file_of(sq) == file_of(from))
+        .map(|&sq| rank_of(sq));
+      let rank = match tandem {
+        b'+' => alike.clone().max(),
+        _ => alike.clone().min(),
+      };
+      alike.count() > 1 && rank == Some(rank_of(from))
+    });
+  }
+  match candidates[..] {
+    [mv] => Ok(mv),
+    [] => Err("is not a legal move"),
+    _ => Err("is ambiguous"),
+  }
+}
@@ -0,0 +1,42 @@
+// Feature planes for neural networks.
+//
+// A position is encoded as `PLANES` planes of 10 ranks by 9 files, laid out C-contiguously as [plane][rank][file] with
+// rank 0 on red's side. Planes 0-6 mark the red general, advisors, elephants, horses, chariots, cannons and soldiers,
+// planes 7-13 the black ones in the same order, and plane 14 is all ones when red is to move and all zeros otherwise.
+
+use std::cell::Cell;
+
+use crate::bitboard::{idx_to_sq, NUM_SQUARES};
+use crate::{Board, Color};
+
+pub(crate) const PLANES: usize = 15;
+// Values per position
+pub(crate) const PLANES_LEN: usize = PLANES * NUM_SQUARES;
+const TURN_PLANE: usize = 14;
+
+impl Board {
+  // Flat indices of the values set to 1 in the planes of this position
+  pub(crate) fn plane_indices(&self) -> impl Iterator<Item = usize> + '_ {
+    let pieces = self.pieces.iter().flat_map(|list| list.squares()).map(|&idx| {
+      let code = self.board[idx as usize];
+      // Piece codes are 1-7, plus 0x10 for black
+      let plane = (code & 0x0f) as usize - 1 + 7 * (code >> 4) as usize;
+      plane * NUM_SQUARES + idx_to_sq(idx as usize)
+    });
+    let turn = match self.turn {
+      Color::Red => TURN_PLANE * NUM_SQUARES..PLANES_LEN,
+      Color::Black => 0..0,
+    };
+    pieces.chain(turn)
+  }
+
+  // Write the planes of this position to `out`, which holds `PLANES_LEN` values
+  pub(crate) fn write_planes<T: Copy + From<u8>>(&self, out: &[Cell<T>]) {
+    for value in out {
+      value.set(T::from(0));
+    }
+    for i in self.plane_indices() {
+      out[i].set(T::from(1));
+    }
+  }
+}
@@ -0,0 +1,137 @@
+// Playouts.
+//
+// Plays many games to the end with a fixed move policy, on as many threads as asked: each thread takes runs of game
+// numbers from a shared counter. Game `i` draws its moves from a generator seeded with `seed` and `i`, so the games
+// played don't depend on the number of threads. A game ends when the side to move has no legal move, a loss for it,
+// or after `max_plies` plies, a draw.
+
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::Mutex;
+use std::thread;
+
+use crate::movegen::pack_move;
+use crate::zobrist::splitmix64;
+use crate::{Board, Color, EMPTY};
+
+// Games a thread takes at a time
+const CHUNK: usize = 64;
+
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub(crate) enum Policy {
+  // Any legal move, uniformly
+  Random,
+  // A random capture if there is one, any legal move otherwise
+  CaptureFirst,
+}
+
+#[derive(Clone, Copy, Debug, Default)]
+pub(crate) struct Stats {
+  pub(crate) red_wins: u64,
+  pub(crate) black_wins: u64,
+  pub(crate) draws: u64,
+  pub(crate) plies: u64,
+}
+
+impl Stats {
+  fn add(&mut self, other: Stats) {
+    self.red_wins += other.red_wins;
+    self.black_wins += other.black_wins;
+    self.draws += other.draws;
+    self.plies += other.plies;
+  }
+}
+
+// A game played, with its moves packed by `pack_move` if they were recorded
+pub(crate) struct Playout {
+  pub(crate) moves: Vec<u16>,
+  pub(crate) winner: Option<Color>,
+}
+
+// Play game number `game` from `start`
+fn play(start: &Board, game: usize, policy: Policy, max_plies: usize, seed: u64, record: bool) -> (Playout, usize) {
+  let mut board = start.clone();
+  let (mut state, _) = splitmix64(seed ^ (game as u64).wrapping_mul(0x9E37_79B9_7F4A_7C15));
+  let mut moves = Vec::with_capacity(128);
+  let mut captures = Vec::with_capacity(16);
+  let mut played = Vec::new();
+  for ply in 0..max_plies {
+    moves.clear();
+    board.generate_legal(&mut moves);
+    if moves.is_empty() {
+      let playout = Playout {
+        moves: played,
+        winner: Some(board.turn.other()),
+      };
+      return (playout, ply);
+    }
+    captures.clear();
+    if policy == Policy::CaptureFirst {
+      captures.extend(moves.iter().filter(|&&(_, to)| board.board[to as usize] != EMPTY));
+    }
+    let choices = if captures.is_empty() { &moves } else { &captures };
+    let (next, random) = splitmix64(state);
+    state = next;
+    let (from, to) = choices[(random % choices.len() as u64) as usize];
+    board.apply_move(from as usize, to as usize);
+    if record {
+      played.push(pack_move(from as usize, to as usize));
+    }
+  }
+  let playout = Playout {
+    moves: played,
+    winner: None,
+  };
+  (playout, max_plies)
+}
+
+// Play `n` games from `start` on `threads` threads (0 for every core). Returns the statistics of the games and, with
+// `record`, every game in order.
+pub(crate) fn simulate(
+  start: &Board,
+  n: usize,
+  policy: Policy,
+  max_plies: usize,
+  threads: usize,
+  seed: u64,
+  record: bool,
+) -> (Stats, Vec<Playout>) {
+  let threads = match threads {
+    0 => thread::available_parallelism().map_or(1, |n| n.get()),
+    n => n,
+  };
+  let next = AtomicUsize::new(0);
+  let stats = Mutex::new(Stats::default());
+  let playouts = Mutex::new(Vec::new());
+  thread::scope(|s| {
+    for _ in 0..threads.min(n.div_ceil(CHUNK)).max(1) {
+      s.spawn(|| {
+        let mut local = Stats::default();
+        let mut games = Vec::new();
+        loop {
+          let first = next.fetch_add(CHUNK, Ordering::Relaxed);
+          if first >= n {
+            break;
+          }
+          for game in first..(first + CHUNK).min(n) {
+            let (playout, plies) = play(start, game, policy, max_plies, seed, record);
+            local.plies += plies as u64;
+            match playout.winner {
+              Some(Color::Red) => local.red_wins += 1,
+              Some(Color::Black) => local.black_wins += 1,
+              None => local.draws += 1,
+            }
+            if record {
+              games.push((game, playout));
+            }
+          }
+        }
+        stats.lock().unwrap().add(local);
+        playouts.lock().unwrap().append(&mut games);
+      });
+    }
+  });
+  let mut playouts = playouts.into_inner().unwrap();
+  playouts.sort_unstable_by_key(|&(game, _)| game);
+  let playouts = playouts.into_iter().map(|(_, playout)| playout).collect();
+  (stats.into_inner().unwrap(), playouts)
+}
@@ -0,0 +1,151 @@
+// Repetition detection and perpetual check/chase adjudication.
+//
+// Every move played through `make_move` keeps the Zobrist key of the position before it in the move history, along
+// with flags telling whether it gave check or made a chase. Moves replayed in bulk leave their flags unknown, and they
+// are only worked out, on a copy of the board, if a repetition is adjudicated. A capture can't be taken back, so no
+// position before the last capture can come again and the repetition scan stops there, comparing only positions with
+// the same side to move.
+//
+// A move chases when the piece moved, other than a general or a soldier, newly attacks an enemy piece it could
+// legally capture on the next move and that piece can't be recaptured, or is a chariot attacked by a horse or a
+// cannon. Generals and soldiers that haven't crossed the river can't be chased. Attacks discovered by moving another
+// piece out of the way, and protectors that are pinned, are not looked at.
+//
+// When a position repeats, each side's moves since its earlier occurrence are graded: all checks is a perpetual check,
+// all checks or chases (under the Asian rules) a perpetual chase. The side with the worse grade loses, and the game is
+// a draw when both sides grade the same.
+
+use std::cmp::Ordering;
+
+use crate::legality::attacked;
+use crate::movegen::{generate_piece_moves, HOME};
+use crate::see::least_valuable_attacker;
+use crate::{Board, Color, Piece, PieceType, Undo, EMPTY};
+
+pub(crate) const CHECK: u8 = 1;
+pub(crate) const CHASE: u8 = 2;
+pub(crate) const UNKNOWN: u8 = 0x80;
+
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub(crate) enum Rules {
+  // Perpetual check and perpetual chase both lose
+  Asian,
+  // Only perpetual check loses, chasing is free
+  CheckOnly,
+}
+
+impl Board {
+  // Flags of the move of `undo`, just played with `apply_move`
+  pub(crate) fn move_flags(&self, undo: &Undo) -> u8 {
+    let mut flags = 0;
+    if self.in_check(self.turn) {
+      flags |= CHECK;
+    }
+    if self.chases(undo) {
+      flags |= CHASE;
+    }
+    flags
+  }
+
+  fn chases(&self, undo: &Undo) -> bool {
+    let (from, to) = (undo.from as usize, undo.to as usize);
+    let piece = Piece::from_u8(self.board[to]).expect("no piece moved");
+    if matches!(piece.piece_type, PieceType::General | PieceType::Soldier) {
+      return false;
+    }
+    let mut before = self.board;
+    before[from] = before[to];
+    before[to] = undo.captured;
+    let (mut old, mut new) = (Vec::with_capacity(17), Vec::with_capacity(17));
+    generate_piece_moves(&before, from, piece, &mut old);
+    generate_piece_moves(&self.board, to, piece, &mut new);
+    let general = self.general_idx(piece.color);
+
+    new.iter().any(|&(_, target)| {
+      let target = target as usize;
+      let Some(victim) = Piece::from_u8(self.board[target]) else {
+        return false;
+      };
+      let exempt = match victim.piece_type {
+        PieceType::General => true,
+        PieceType::Soldier => HOME[victim.color.index()][target],
+        _ => false,
+      };
+      if exempt || old.iter().any(|&(_, sq)| sq as usize == target) {
+        return false;
+      }
+      let mut after = self.board;
+      after[target] = after[to];
+      after[to] = EMPTY;
+      if general.is_some_and(|general| attacked(&after, general, piece.color)) {
+        return false;
+      }
+      let outranked =
+        victim.piece_type == PieceType::Chariot && matches!(piece.piece_type, PieceType::Horse | PieceType::Cannon);
+      outranked || least_valuable_attacker(&after, target, victim.color).is_none()
+    })
+  }
+
+  // Plies back to each earlier occurrence of this position, nearest first
+  fn occurrences(&self) -> impl Iterator<Item = usize> + '_ {
+    self
+      .history
+      .iter()
+      .rev()
+      .take_while(|undo| undo.captured == EMPTY)
+      .enumerate()
+      .filter(|&(i, undo)| i % 2 == 1 && undo.hash == self.hash)
+      .map(|(i, _)| i + 1)
+  }
+
+  // Whether this position has occurred `count` times, counting this one
+  pub(crate) fn repeated(&self, count: usize) -> bool {
+    count <= 1 || self.occurrences().nth(count - 2).is_some()
+  }
+
+  // Mover and flags of each of the last `plies` moves. If some weren't worked out when they were played, the moves are
+  // taken back and replayed on a copy of the board.
+  fn cycle_flags(&self, plies: usize) -> Vec<(Color, u8)> {
+    let cycle = &self.history[self.history.len() - plies..];
+    if cycle.iter().all(|undo| undo.flags & UNKNOWN == 0) {
+      return cycle.iter().map(|undo| (undo.turn, undo.flags)).collect();
+    }
+    let mut board = self.clone();
+    for undo in cycle.iter().rev() {
+      board.unapply_move(*undo);
+    }
+    cycle
+      .iter()
+      .map(|undo| {
+        let undo = board.apply_move(undo.from as usize, undo.to as usize);
+        (undo.turn, board.move_flags(&undo))
+      })
+      .collect()
+  }
+
+  // Outcome of the game once this position has occurred `count` times: Some(winner), None for a draw. Returns None
+  // (no outcome) if it hasn't.
+  pub(crate) fn repetition_outcome(&self, count: usize, rules: Rules) -> Option<Option<Color>> {
+    let plies = match count {
+      0 | 1 => 0,
+      _ => self.occurrences().nth(count - 2)?,
+    };
+    let cycle = self.cycle_flags(plies);
+    let grade = |side: Color| {
+      let moves = cycle.iter().filter(|&&(turn, _)| turn == side);
+      if moves.clone().all(|&(_, flags)| flags & CHECK != 0) {
+        2
+      } else if rules == Rules::Asian && moves.clone().all(|&(_, flags)| flags != 0) {
+        1
+      } else {
+        0
+      }
+    };
+    let (red, black) = (grade(Color::Red), grade(Color::Black));
+    Some(match red.cmp(&black) {
+      Ordering::Greater => Some(Color::Black),
+      Ordering::Less => Some(Color::Red),
+      Ordering::Equal => None,
+    })
+  }
+}
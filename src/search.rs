@@ -0,0 +1,377 @@
+// Alpha-beta search.
+//
+// Iterative deepening negamax with principal variation search: the first move of a node is searched with the full
+// window and the others with a null window around alpha, re-searched only when they beat it. A transposition table
+// cuts off nodes already searched deep enough and supplies the hash move, which `MovePicker` tries first. Quiet moves
+// that cause a cutoff are remembered as killers of their ply and raise their history score.
+//
+// At depth 0 a quiescence search takes over and plays captures until the position is quiet, so that a leaf is never
+// scored in the middle of an exchange. It only tries the captures that static exchange evaluation says don't lose
+// material, plus the quiet checks at its first ply, and answers a check with every evasion. In the main search, the
+// captures that lose material are tried last, and near the leaves they are not tried at all.
+//
+// Scores are in centipawns from the side to move. A side without a legal move has lost, checkmated or stalemated, and
+// scores `-MATE + ply`. A position below the root that repeats one since the last capture, in the game or on the
+// current line, scores as a draw: the moves searched go on the board's move history for the repetition scan.
+//
+// With more than one thread the search is Lazy SMP: every thread searches the same root on its own board and they
+// only cooperate through the shared transposition table, where each thread finds the cutoffs and hash moves the
+// others stored. Half of the helpers start one ply deeper so that the threads spread over different depths. The main
+// thread owns the limits and reports its result; the helpers stop as soon as it is done.
+
+use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
+use std::thread;
+use std::time::{Duration, Instant};
+
+use crate::movepick::{History, MovePicker};
+use crate::tt::{Bound, TranspositionTable, TtEntry};
+use crate::{Board, EMPTY};
+
+pub const MATE: i32 = 30000;
+const INFINITY: i32 = 32000;
+pub(crate) const MAX_PLY: usize = 64;
+
+// Nodes between two looks at the clock
+const CHECK_INTERVAL: u64 = 1024;
+
+// Cap on history scores so that they can't overflow in long searches
+const HISTORY_MAX: i32 = 1 << 24;
+
+// Deepest remaining depth at which losing captures are skipped at non-PV nodes
+const SEE_PRUNING_DEPTH: u32 = 2;
+
+#[derive(Clone, Copy, Debug, Default)]
+pub(crate) struct Limits {
+  pub(crate) depth: Option<u32>,
+  pub(crate) movetime: Option<Duration>,
+  pub(crate) nodes: Option<u64>,
+}
+
+#[derive(Clone, Debug, Default)]
+pub(crate) struct SearchReport {
+  pub(crate) best_move: Option<(u8, u8)>,
+  pub(crate) score: i32,
+  pub(crate) pv: Vec<(u8, u8)>,
+  pub(crate) depth: u32,
+  pub(crate) nodes: u64,
+}
+
+// State shared by the threads of one search
+struct Shared<'a> {
+  tt: &'a TranspositionTable,
+  limits: Limits,
+  start: Instant,
+  // Set by the main thread when it is done
+  stop: AtomicBool,
+  // Nodes searched by all threads, each thread adds its count every `CHECK_INTERVAL` nodes
+  nodes: AtomicU64,
+}
+
+struct Searcher<'a> {
+  board: Board,
+  shared: &'a Shared<'a>,
+  main: bool,
+  nodes: u64,
+  // Part of `nodes` already added to `shared.nodes`
+  flushed: u64,
+  // Depth of the current iteration, the first one of the main thread always runs to completion
+  root_depth: u32,
+  stopped: bool,
+  // Move picker, killer moves and principal variation of each ply
+  pickers: Vec<MovePicker>,
+  killers: [[Option<(u8, u8)>; 2]; MAX_PLY + 1],
+  pv: Vec<Vec<(u8, u8)>>,
+  history: Box<History>,
+}
+
+impl Board {
+  // Search the position to the given limits on `threads` threads (0 uses every available core). Returns the result of
+  // the deepest iteration the main thread completed.
+  pub(crate) fn search_position(&self, limits: Limits, threads: usize, tt: &TranspositionTable) -> SearchReport {
+    let threads = match threads {
+      0 => thread::available_parallelism().map_or(1, |n| n.get()),
+      n => n,
+    };
+    let shared = Shared {
+      tt,
+      limits,
+      start: Instant::now(),
+      stop: AtomicBool::new(false),
+      nodes: AtomicU64::new(0),
+    };
+
+    let mut report = thread::scope(|s| {
+      for id in 1..threads {
+        let mut helper = Searcher::new(self, &shared, false);
+        s.spawn(move || helper.iterate(1 + (id as u32 & 1)));
+      }
+      let report = Searcher::new(self, &shared, true).iterate(1);
+      shared.stop.store(true, Ordering::Relaxed);
+      report
+    });
+    report.nodes = shared.nodes.into_inner();
+    report
+  }
+}
+
+impl<'a> Searcher<'a> {
+  fn new(board: &Board, shared: &'a Shared<'a>, main: bool) -> Self {
+    Searcher {
+      board: board.clone(),
+      shared,
+      main,
+      nodes: 0,
+      flushed: 0,
+      root_depth: 0,
+      stopped: false,
+      pickers: (0..=MAX_PLY).map(|_| MovePicker::default()).collect(),
+      killers: [[None; 2]; MAX_PLY + 1],
+      pv: vec![Vec::with_capacity(MAX_PLY); MAX_PLY + 1],
+      history: Box::new([[0; 144]; 0x18]),
+    }
+  }
+
+  // Iterative deepening from `first_depth`. Helper threads ignore the depth limit and run until stopped.
+  fn iterate(&mut self, first_depth: u32) -> SearchReport {
+    let max_depth = match self.shared.limits.depth {
+      Some(depth) if self.main => depth.clamp(1, MAX_PLY as u32),
+      _ => MAX_PLY as u32,
+    };
+    let mut report = SearchReport::default();
+    for depth in first_depth..=max_depth {
+      self.root_depth = depth;
+      let score = self.negamax(depth, -INFINITY, INFINITY, 0);
+      if self.stopped {
+        break;
+      }
+      report = SearchReport {
+        best_move: self.pv[0].first().copied(),
+        score,
+        pv: self.pv[0].clone(),
+        depth,
+        nodes: self.nodes,
+      };
+      // A mate found within the full width of this iteration can't get any shorter
+      if self.main && score.abs() >= MATE - depth as i32 {
+        break;
+      }
+    }
+    self.flush_nodes();
+    report
+  }
+
+  fn flush_nodes(&mut self) {
+    self
+      .shared
+      .nodes
+      .fetch_add(self.nodes - self.flushed, Ordering::Relaxed);
+    self.flushed = self.nodes;
+  }
+
+  fn out_of_budget(&mut self) -> bool {
+    let interval = self.nodes % CHECK_INTERVAL == 0;
+    if interval {
+      self.flush_nodes();
+    }
+    if !self.main {
+      if interval {
+        self.stopped = self.shared.stop.load(Ordering::Relaxed);
+      }
+      return self.stopped;
+    }
+
+    if self.root_depth <= 1 {
+      return false;
+    }
+    let limits = &self.shared.limits;
+    if let Some(limit) = limits.nodes {
+      let total = self.shared.nodes.load(Ordering::Relaxed) + self.nodes - self.flushed;
+      self.stopped = total >= limit;
+    }
+    if interval && !self.stopped {
+      self.stopped = limits.movetime.is_some_and(|t| self.shared.start.elapsed() >= t);
+    }
+    self.stopped
+  }
+
+  fn negamax(&mut self, depth: u32, mut alpha: i32, beta: i32, ply: usize) -> i32 {
+    if depth == 0 {
+      return self.quiescence(alpha, beta, ply, 0);
+    }
+    self.pv[ply].clear();
+    if self.stopped || self.out_of_budget() {
+      return 0;
+    }
+    self.nodes += 1;
+    if ply >= MAX_PLY {
+      return self.board.evaluate_position();
+    }
+    if ply > 0 && self.board.repeated(2) {
+      return 0;
+    }
+
+    let pv_node = beta - alpha > 1;
+    let key = self.board.hash;
+    let entry = self.shared.tt.probe(key, ply);
+    if let Some(entry) = entry.filter(|e| !pv_node && e.depth >= depth) {
+      let cutoff = match entry.bound {
+        Bound::Exact => true,
+        Bound::Lower => entry.score >= beta,
+        Bound::Upper => entry.score <= alpha,
+      };
+      if cutoff {
+        return entry.score;
+      }
+    }
+
+    let mut picker = std::mem::take(&mut self.pickers[ply]);
+    picker.reset(entry.and_then(|e| e.best_move), self.killers[ply]);
+
+    // Near the leaves of a non-PV node that is not in check, captures that lose material are not searched
+    let prune_bad_captures = !pv_node && depth <= SEE_PRUNING_DEPTH && !self.board.in_check(self.board.turn);
+
+    let original_alpha = alpha;
+    let mut best_score = -INFINITY;
+    let mut best_move = None;
+    while let Some((from, to)) = picker.next(&self.board, &self.history) {
+      if prune_bad_captures && best_move.is_some() && picker.bad_captures_left() {
+        break;
+      }
+      let quiet = self.board.board[to as usize] == EMPTY;
+      let undo = self.board.apply_move(from as usize, to as usize);
+      self.board.history.push(undo);
+      let mut score;
+      if best_move.is_none() {
+        score = -self.negamax(depth - 1, -beta, -alpha, ply + 1);
+      } else {
+        score = -self.negamax(depth - 1, -alpha - 1, -alpha, ply + 1);
+        if score > alpha && score < beta {
+          score = -self.negamax(depth - 1, -beta, -alpha, ply + 1);
+        }
+      }
+      self.board.history.pop();
+      self.board.unapply_move(undo);
+      if self.stopped {
+        break;
+      }
+
+      if score > best_score {
+        best_score = score;
+        best_move = Some((from, to));
+      }
+      if score > alpha {
+        alpha = score;
+        let (head, tail) = self.pv.split_at_mut(ply + 1);
+        head[ply].clear();
+        head[ply].push((from, to));
+        head[ply].extend_from_slice(&tail[0]);
+      }
+      if alpha >= beta {
+        if quiet {
+          self.remember_cutoff((from, to), depth, ply);
+        }
+        break;
+      }
+    }
+    self.pickers[ply] = picker;
+    if self.stopped {
+      return 0;
+    }
+    let Some(best_move) = best_move else {
+      return -MATE + ply as i32;
+    };
+
+    let bound = if best_score >= beta {
+      Bound::Lower
+    } else if best_score > original_alpha {
+      Bound::Exact
+    } else {
+      Bound::Upper
+    };
+    self.shared.tt.store(
+      key,
+      ply,
+      TtEntry {
+        best_move: Some(best_move),
+        score: best_score,
+        depth,
+        bound,
+      },
+    );
+    best_score
+  }
+
+  // Search captures, and checks at the first ply (`qply` 0), until the position is quiet. The side to move may stand
+  // pat on the static evaluation unless it is in check, in which case every evasion is searched.
+  fn quiescence(&mut self, mut alpha: i32, beta: i32, ply: usize, qply: u32) -> i32 {
+    self.pv[ply].clear();
+    if self.stopped || self.out_of_budget() {
+      return 0;
+    }
+    self.nodes += 1;
+    if ply >= MAX_PLY {
+      return self.board.evaluate_position();
+    }
+
+    let in_check = self.board.in_check(self.board.turn);
+    let mut best_score = -INFINITY;
+    if !in_check {
+      best_score = self.board.evaluate_position();
+      if best_score >= beta {
+        return best_score;
+      }
+      alpha = alpha.max(best_score);
+    }
+
+    let mut picker = std::mem::take(&mut self.pickers[ply]);
+    if in_check {
+      picker.reset(None, [None; 2]);
+    } else {
+      picker.reset_quiescence(qply == 0);
+    }
+    let mut any_move = false;
+    while let Some((from, to)) = picker.next(&self.board, &self.history) {
+      any_move = true;
+      let undo = self.board.apply_move(from as usize, to as usize);
+      let score = -self.quiescence(-beta, -alpha, ply + 1, qply + 1);
+      self.board.unapply_move(undo);
+      if self.stopped {
+        break;
+      }
+
+      if score > best_score {
+        best_score = score;
+      }
+      if score > alpha {
+        alpha = score;
+        let (head, tail) = self.pv.split_at_mut(ply + 1);
+        head[ply].clear();
+        head[ply].push((from, to));
+        head[ply].extend_from_slice(&tail[0]);
+        if alpha >= beta {
+          break;
+        }
+      }
+    }
+    self.pickers[ply] = picker;
+    if self.stopped {
+      return 0;
+    }
+    if in_check && !any_move {
+      return -MATE + ply as i32;
+    }
+    best_score
+  }
+
+  // A quiet move refuted the previous move: make it the first killer of the ply and raise its history score
+  fn remember_cutoff(&mut self, (from, to): (u8, u8), depth: u32, ply: usize) {
+    let killers = &mut self.killers[ply];
+    if killers[0] != Some((from, to)) {
+      killers[1] = killers[0];
+      killers[0] = Some((from, to));
+    }
+    let piece = self.board.board[from as usize] as usize;
+    let score = &mut self.history[piece][to as usize];
+    *score = (*score + (depth * depth) as i32).min(HISTORY_MAX);
+  }
+}
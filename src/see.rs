@@ -0,0 +1,135 @@
+// Static exchange evaluation.
+//
+// SEE plays out the captures on one square, each side always recapturing with its least valuable attacker and free to
+// stop when continuing would lose material, and returns the material balance for the side that started. The capture
+// sequence is played on a scratch copy of the mailbox and the attackers are looked up again after every capture,
+// rather than collected once. In xiangqi this matters: taking a piece off a line can remove the screen a cannon
+// needed, or leave a cannon that was blocked by two pieces with exactly the one screen it needs.
+//
+// Pins are ignored, except that the general never captures into a square the other side still attacks.
+//
+// Attackers are found the way `movegen` walks the mailbox: the eye of an elephant and the leg of a horse are looked at
+// first, and only when they are on the board (empty) is the square one step further read, so no lookup leaves the
+// array even from the edge of the board.
+
+use crate::eval::PIECE_VALUES;
+use crate::legality::HORSE_CHECKS;
+use crate::movegen::{DIAGONAL, ELEPHANT_JUMPS, HOME, ORTHOGONAL, PALACE};
+use crate::{Board, Color, Piece, PieceType, EMPTY, OUT_OF_BOUNDS};
+
+// Exchange value of the general, more than everything else on the board
+const GENERAL_VALUE: i32 = 10000;
+
+#[inline]
+fn see_value(code: u8) -> i32 {
+  match Piece::from_u8(code) {
+    Some(piece) if piece.piece_type == PieceType::General => GENERAL_VALUE,
+    Some(piece) => PIECE_VALUES[crate::bitboard::piece_index(piece.piece_type)],
+    None => 0,
+  }
+}
+
+// Square of the least valuable piece of `side` that attacks `target` on `board`
+pub(crate) fn least_valuable_attacker(board: &[u8; 144], target: usize, side: Color) -> Option<usize> {
+  let t = target as isize;
+  let code = |piece_type| Piece::new(piece_type, side).to_u8();
+  let holds = |sq: isize, piece_type| board[sq as usize] == code(piece_type);
+
+  // Soldiers step forward, or sideways once across the river
+  let behind = t - side.forward();
+  if holds(behind, PieceType::Soldier) {
+    return Some(behind as usize);
+  }
+  for d in [1, -1] {
+    if holds(t + d, PieceType::Soldier) && !HOME[side.index()][(t + d) as usize] {
+      return Some((t + d) as usize);
+    }
+  }
+
+  if PALACE[side.index()][target] {
+    for d in DIAGONAL {
+      if holds(t + d, PieceType::Advisor) {
+        return Some((t + d) as usize);
+      }
+    }
+  }
+  if HOME[side.index()][target] {
+    for (jump, eye) in ELEPHANT_JUMPS {
+      if board[(t + eye) as usize] == EMPTY && holds(t + jump, PieceType::Elephant) {
+        return Some((t + jump) as usize);
+      }
+    }
+  }
+  for (d, leg) in HORSE_CHECKS {
+    if board[(t + leg) as usize] == EMPTY && holds(t + d, PieceType::Horse) {
+      return Some((t + d) as usize);
+    }
+  }
+
+  // First piece along each line is a chariot candidate, the piece behind the screen a cannon candidate
+  let mut chariot = None;
+  for d in ORTHOGONAL {
+    let mut sq = t + d;
+    while board[sq as usize] == EMPTY {
+      sq += d;
+    }
+    if board[sq as usize] == OUT_OF_BOUNDS {
+      continue;
+    }
+    if holds(sq, PieceType::Chariot) {
+      chariot = Some(sq as usize);
+    }
+    sq += d;
+    while board[sq as usize] == EMPTY {
+      sq += d;
+    }
+    if holds(sq, PieceType::Cannon) {
+      return Some(sq as usize);
+    }
+  }
+  if chariot.is_some() {
+    return chariot;
+  }
+
+  if PALACE[side.index()][target] {
+    for d in ORTHOGONAL {
+      if holds(t + d, PieceType::General) {
+        return Some((t + d) as usize);
+      }
+    }
+  }
+  None
+}
+
+impl Board {
+  // Material the side to move gains, in centipawns, by playing the pseudo-legal move `from` -> `to` and then trading
+  // off on `to` as long as it pays. A quiet move scores 0, or minus the mover's value if it just hangs the piece.
+  pub(crate) fn static_exchange(&self, from: usize, to: usize) -> i32 {
+    let mut board = self.board;
+    let mut gain = [0; 34];
+    gain[0] = see_value(board[to]);
+    let mut depth = 0;
+    let mut attacker = from;
+    let mut side = self.turn;
+    loop {
+      depth += 1;
+      // Speculative score if the piece now moving to `to` is captured in turn
+      gain[depth] = see_value(board[attacker]) - gain[depth - 1];
+      if (-gain[depth - 1]).max(gain[depth]) < 0 {
+        break;
+      }
+      board[to] = board[attacker];
+      board[attacker] = EMPTY;
+      side = side.other();
+      match least_valuable_attacker(&board, to, side) {
+        Some(next) => attacker = next,
+        None => break,
+      }
+    }
+    while depth > 1 {
+      depth -= 1;
+      gain[depth - 1] = -(-gain[depth - 1]).max(gain[depth]);
+    }
+    gain[0]
+  }
+}
@@ -0,0 +1,747 @@
+// Endgame tablebases.
+//
+// A table holds the exact result of every position with one material, such as KRKAA (red general and chariot against
+// black general and two advisors), for either side to move: win, draw or loss, and for decided positions the number of
+// plies to mate. A side without a legal move has lost, stalemate included. Repetitions are not adjudicated, so a
+// position that can't be forced to mate is a draw.
+//
+// Generation is retrograde analysis: every position without a legal move is lost in 0 plies, and the results are then
+// extended one ply per pass. At ply n a position is won if a move reaches a position lost in n - 1 plies, and lost if
+// every move reaches a position the opponent wins in fewer than n plies. Captures lead into smaller tables, which are
+// generated (or read back) first. Each pass is split over threads. The values live in atomics and a value written
+// during a pass can never satisfy the test of another position in the same pass, so the result does not depend on
+// the order in which threads get to positions.
+//
+// Positions are indexed compactly. Each piece only ranges over the squares it can reach: 9 palace squares for a
+// general, 5 for an advisor, 7 for an elephant, 55 for a soldier and all 90 for the others. The board is mirrored left
+// to right so that the red general stands on file d or e, and the black general on files a to e when red's is on e,
+// which leaves 45 of the 81 general placements. A material and its colour-flipped twin (KAAKR for KRKAA) share a
+// table.
+//
+// Each table is a pair of files: `<material>.xqwdl` with 2 bits per position and `<material>.xqdtm` with one byte per
+// position, the number of moves to mate. Both start with a 16 byte header, an 8 byte magic followed by the number of
+// positions per side to move (little endian), and list the positions with red to move first. `Tablebase` memory-maps
+// the files, so that processes probing the same tables share one copy through the page cache.
+
+use std::collections::HashMap;
+use std::fs;
+use std::io;
+use std::path::Path;
+use std::sync::atomic::{AtomicU16, AtomicUsize, Ordering};
+use std::thread;
+
+use crate::fen::{piece_from_char, piece_to_char};
+use crate::legality::attacked;
+use crate::mmap::Mmap;
+use crate::movegen::generate_piece_moves;
+use crate::{pos_to_idx, Board, Color, Piece, PieceType, EMPTY, OUT_OF_BOUNDS};
+
+// Most men, generals included, a table can hold
+pub(crate) const MAX_MEN: usize = 5;
+
+const WDL_MAGIC: &[u8; 8] = b"XQTBWDL1";
+const DTM_MAGIC: &[u8; 8] = b"XQTBDTM1";
+const HEADER_LEN: usize = 16;
+
+// Values during generation: not decided yet (a draw once generation is over), not a legal position, or the number of
+// plies to mate plus 2. Odd plies are a win for the side to move, even plies a loss.
+const UNKNOWN: u16 = 0;
+const INVALID: u16 = 1;
+
+// Entries of the WDL file
+const WDL_DRAW: u8 = 0;
+const WDL_WIN: u8 = 1;
+const WDL_LOSS: u8 = 2;
+const WDL_INVALID: u8 = 3;
+
+// Positions handed to a thread at a time
+const CHUNK: usize = 1 << 12;
+
+const EMPTY_MAILBOX: [u8; 144] = {
+  let mut board = [OUT_OF_BOUNDS; 144];
+  let mut idx = 0;
+  while idx < 144 {
+    let (col, row) = (idx % 12, idx / 12);
+    if col >= 1 && col <= 9 && row >= 1 && row <= 10 {
+      board[idx] = EMPTY;
+    }
+    idx += 1;
+  }
+  board
+};
+
+#[inline]
+fn file(sq: u8) -> u8 {
+  sq % 12 - 1
+}
+
+// Left-right mirror image of a mailbox square
+#[inline]
+fn mirror(sq: u8) -> u8 {
+  sq / 12 * 12 + 10 - sq % 12
+}
+
+// The same square seen from the other side of the board
+#[inline]
+fn flip(sq: u8) -> u8 {
+  (11 - sq / 12) * 12 + sq % 12
+}
+
+// Pieces besides the two generals, as mailbox codes in ascending order: red's by piece type, then black's
+#[derive(Clone, Debug, PartialEq, Eq, Hash)]
+pub(crate) struct Material(Vec<u8>);
+
+impl Material {
+  // Parse a name such as "KRKAA": the red general and pieces, then the black general and pieces, in FEN letters
+  pub(crate) fn parse(name: &str) -> Result<Material, String> {
+    let upper = name.to_ascii_uppercase();
+    let sides: Vec<&str> = upper.split('K').collect();
+    let [first, red, black] = sides[..] else {
+      return Err(format!(
+        "material {name:?} should be a general and pieces for each side, like KRKAA"
+      ));
+    };
+    if !first.is_empty() {
+      return Err(format!("material {name:?} should start with the red general"));
+    }
+    let mut codes = Vec::new();
+    for (side, letters) in [(Color::Red, red), (Color::Black, black)] {
+      for c in letters.chars() {
+        let piece = piece_from_char(c).ok_or_else(|| format!("unknown piece {c:?} in material {name:?}"))?;
+        codes.push(Piece::new(piece.piece_type, side).to_u8());
+      }
+    }
+    codes.sort_unstable();
+    for &code in &codes {
+      let piece = Piece::from_u8(code).unwrap();
+      let most = match piece.piece_type {
+        PieceType::Soldier => 5,
+        _ => 2,
+      };
+      if codes.iter().filter(|&&c| c == code).count() > most {
+        let piece_type = format!("{:?}", piece.piece_type).to_lowercase();
+        return Err(format!(
+          "material {name:?} has more {piece_type}s than a side starts with"
+        ));
+      }
+    }
+    if codes.len() + 2 > MAX_MEN {
+      return Err(format!(
+        "tables hold at most {MAX_MEN} men, {name:?} has {}",
+        codes.len() + 2
+      ));
+    }
+    Ok(Material(codes))
+  }
+
+  pub(crate) fn name(&self) -> String {
+    let mut name = String::from("K");
+    for side in [Color::Red, Color::Black] {
+      if side == Color::Black {
+        name.push('K');
+      }
+      for piece in self.0.iter().filter_map(|&code| Piece::from_u8(code)) {
+        if piece.color == side {
+          name.push(piece_to_char(Piece::new(piece.piece_type, Color::Red)));
+        }
+      }
+    }
+    name
+  }
+
+  fn flipped(&self) -> Material {
+    let mut codes: Vec<u8> = self.0.iter().map(|code| code ^ 0x10).collect();
+    codes.sort_unstable();
+    Material(codes)
+  }
+
+  // The orientation the table is stored in, and whether that is the colour-flipped one. Either would do, the one
+  // whose red pieces come first when comparing piece types from the highest down is picked.
+  fn canonical(&self) -> (Material, bool) {
+    let types = |material: &Material, side: Color| {
+      let mut types: Vec<u8> = material
+        .0
+        .iter()
+        .filter_map(|&code| Piece::from_u8(code))
+        .filter(|piece| piece.color == side)
+        .map(|piece| piece.piece_type as u8)
+        .collect();
+      types.sort_unstable_by(|a, b| b.cmp(a));
+      types
+    };
+    if types(self, Color::Black) > types(self, Color::Red) {
+      (self.flipped(), true)
+    } else {
+      (self.clone(), false)
+    }
+  }
+
+  // The material left once the piece of `slot` is captured
+  fn without(&self, slot: usize) -> Material {
+    let mut codes = self.0.clone();
+    codes.remove(slot);
+    Material(codes)
+  }
+}
+
+// Where the men of a position stand: the two generals, then (code, square) of the other pieces
+#[derive(Clone, Copy, Debug)]
+struct Placement {
+  generals: [u8; 2],
+  pieces: [(u8, u8); MAX_MEN - 2],
+  len: usize,
+  turn: Color,
+}
+
+impl Placement {
+  // None if the board holds more men than a table, or a general is missing
+  fn of(board: &Board) -> Option<Placement> {
+    let mut placement = Placement {
+      generals: [0; 2],
+      pieces: [(0, 0); MAX_MEN - 2],
+      len: 0,
+      turn: board.turn,
+    };
+    let mut generals = 0;
+    for side in [Color::Red, Color::Black] {
+      for &sq in board.pieces[side.index()].squares() {
+        let code = board.board[sq as usize];
+        if code == Piece::new(PieceType::General, side).to_u8() {
+          placement.generals[side.index()] = sq;
+          generals += 1;
+        } else {
+          *placement.pieces.get_mut(placement.len)? = (code, sq);
+          placement.len += 1;
+        }
+      }
+    }
+    (generals == 2).then_some(placement)
+  }
+
+  fn material(&self) -> Material {
+    let mut codes: Vec<u8> = self.pieces[..self.len].iter().map(|&(code, _)| code).collect();
+    codes.sort_unstable();
+    Material(codes)
+  }
+
+  // The same position with colours swapped and the board turned around
+  fn flipped(&self) -> Placement {
+    let mut pieces = self.pieces;
+    for (code, sq) in &mut pieces[..self.len] {
+      *code ^= 0x10;
+      *sq = flip(*sq);
+    }
+    Placement {
+      generals: [flip(self.generals[1]), flip(self.generals[0])],
+      pieces,
+      len: self.len,
+      turn: self.turn.other(),
+    }
+  }
+}
+
+// Squares of the mailbox a piece can ever stand on: those it reaches on an empty board from where it starts
+fn reachable(piece: Piece) -> Vec<u8> {
+  let starts: &[(u8, u8)] = match piece.piece_type {
+    PieceType::General => &[(4, 0)],
+    PieceType::Advisor => &[(3, 0)],
+    PieceType::Elephant => &[(2, 0)],
+    PieceType::Soldier => &[(0, 3), (2, 3), (4, 3), (6, 3), (8, 3)],
+    _ => &[(0, 0)],
+  };
+  let mut seen = [false; 144];
+  let mut queue = Vec::new();
+  for &(file, rank) in starts {
+    let rank = match piece.color {
+      Color::Red => rank,
+      Color::Black => 9 - rank,
+    };
+    let sq = pos_to_idx(file, rank).unwrap();
+    seen[sq] = true;
+    queue.push(sq as u8);
+  }
+  let mut moves = Vec::new();
+  while let Some(sq) = queue.pop() {
+    moves.clear();
+    generate_piece_moves(&EMPTY_MAILBOX, sq as usize, piece, &mut moves);
+    for &(_, to) in &moves {
+      if !seen[to as usize] {
+        seen[to as usize] = true;
+        queue.push(to);
+      }
+    }
+  }
+  (0..144u8).filter(|&sq| seen[sq as usize]).collect()
+}
+
+// How the positions of one material are numbered
+struct Layout {
+  material: Material,
+  // Canonical (red, black) general squares, and their position in that list by red * 144 + black (u8::MAX if the
+  // placement is not canonical)
+  generals: Vec<[u8; 2]>,
+  general_index: Vec<u8>,
+  // Squares each piece ranges over, and the position of each square in that list (u8::MAX if out of range)
+  squares: Vec<Vec<u8>>,
+  square_index: Vec<[u8; 144]>,
+  // Positions per side to move
+  len: usize,
+}
+
+impl Layout {
+  fn new(material: Material) -> Layout {
+    let mut generals = Vec::new();
+    let mut general_index = vec![u8::MAX; 144 * 144];
+    for red in reachable(Piece::new(PieceType::General, Color::Red)) {
+      for black in reachable(Piece::new(PieceType::General, Color::Black)) {
+        if file(red) < 4 || (file(red) == 4 && file(black) <= 4) {
+          general_index[red as usize * 144 + black as usize] = generals.len() as u8;
+          generals.push([red, black]);
+        }
+      }
+    }
+    let squares: Vec<Vec<u8>> = material
+      .0
+      .iter()
+      .map(|&code| reachable(Piece::from_u8(code).unwrap()))
+      .collect();
+    let square_index = squares
+      .iter()
+      .map(|list| {
+        let mut index = [u8::MAX; 144];
+        for (i, &sq) in list.iter().enumerate() {
+          index[sq as usize] = i as u8;
+        }
+        index
+      })
+      .collect();
+    let len = squares.iter().fold(generals.len(), |len, list| len * list.len());
+    Layout {
+      material,
+      generals,
+      general_index,
+      squares,
+      square_index,
+      len,
+    }
+  }
+
+  fn placement(&self, turn: Color, mut index: usize) -> Placement {
+    let mut placement = Placement {
+      generals: [0; 2],
+      pieces: [(0, 0); MAX_MEN - 2],
+      len: self.squares.len(),
+      turn,
+    };
+    for slot in (0..self.squares.len()).rev() {
+      let list = &self.squares[slot];
+      placement.pieces[slot] = (self.material.0[slot], list[index % list.len()]);
+      index /= list.len();
+    }
+    placement.generals = self.generals[index];
+    placement
+  }
+
+  // Index of a placement of this material, mirrored as needed. Identical pieces may come in any order.
+  fn locate(&self, placement: &Placement) -> Option<usize> {
+    let [red, black] = placement.generals;
+    let mirrored = file(red) > 4 || (file(red) == 4 && file(black) > 4);
+    let square = |sq: u8| if mirrored { mirror(sq) } else { sq };
+    let pair = self.general_index[square(red) as usize * 144 + square(black) as usize];
+    if pair == u8::MAX {
+      return None;
+    }
+    let mut pieces = placement.pieces;
+    let pieces = &mut pieces[..placement.len];
+    for (_, sq) in pieces.iter_mut() {
+      *sq = square(*sq);
+    }
+    pieces.sort_unstable();
+
+    let mut index = pair as usize;
+    for (slot, &(code, sq)) in pieces.iter().enumerate() {
+      let i = self.square_index[slot][sq as usize];
+      if code != self.material.0[slot] || i == u8::MAX {
+        return None;
+      }
+      index = index * self.squares[slot].len() + i as usize;
+    }
+    Some(index)
+  }
+}
+
+// A table being generated, or read back to generate a larger one
+struct Table {
+  layout: Layout,
+  // By side to move
+  values: [Vec<AtomicU16>; 2],
+}
+
+impl Table {
+  fn value(&self, placement: &Placement) -> u16 {
+    self.layout.locate(placement).map_or(UNKNOWN, |index| {
+      self.values[placement.turn.index()][index].load(Ordering::Relaxed)
+    })
+  }
+
+  // Longest decided distance to mate in plies
+  fn longest(&self) -> u16 {
+    self
+      .values
+      .iter()
+      .flatten()
+      .map(|value| value.load(Ordering::Relaxed))
+      .filter(|&value| value > INVALID)
+      .map(|value| value - 2)
+      .max()
+      .unwrap_or(0)
+  }
+
+  fn generate(layout: Layout, subtables: &HashMap<Material, Table>, threads: usize) -> Table {
+    let unknown = || (0..layout.len).map(|_| AtomicU16::new(UNKNOWN)).collect();
+    let table = Table {
+      values: [unknown(), unknown()],
+      layout,
+    };
+    // Table reached by capturing the piece of each slot, and whether it is stored colour-flipped
+    let captures: Vec<(&Table, bool)> = (0..table.layout.material.0.len())
+      .map(|slot| {
+        let (material, flipped) = table.layout.material.without(slot).canonical();
+        (&subtables[&material], flipped)
+      })
+      .collect();
+    let longest = captures.iter().map(|(sub, _)| sub.longest()).max().unwrap_or(0);
+
+    // Nothing can be decided after a pass without progress once the longest mate of the smaller tables is passed
+    let mut ply = 0;
+    while table.pass(ply, &captures, threads) > 0 || ply <= longest + 1 {
+      ply += 1;
+    }
+    table
+  }
+
+  // Decide the positions that are won or lost in `ply` plies, returns how many there were
+  fn pass(&self, ply: u16, captures: &[(&Table, bool)], threads: usize) -> usize {
+    let len = self.layout.len;
+    let next = AtomicUsize::new(0);
+    thread::scope(|s| {
+      let workers: Vec<_> = (0..threads)
+        .map(|_| {
+          s.spawn(|| {
+            let mut moves = Vec::with_capacity(64);
+            let mut decided = 0;
+            loop {
+              let start = next.fetch_add(CHUNK, Ordering::Relaxed);
+              if start >= 2 * len {
+                return decided;
+              }
+              for i in start..(start + CHUNK).min(2 * len) {
+                let (turn, index) = if i < len {
+                  (Color::Red, i)
+                } else {
+                  (Color::Black, i - len)
+                };
+                let value = &self.values[turn.index()][index];
+                if value.load(Ordering::Relaxed) != UNKNOWN {
+                  continue;
+                }
+                if let Some(decision) = self.decide(turn, index, ply, captures, &mut moves) {
+                  value.store(decision, Ordering::Relaxed);
+                  decided += 1;
+                }
+              }
+            }
+          })
+        })
+        .collect();
+      workers.into_iter().map(|worker| worker.join().unwrap()).sum()
+    })
+  }
+
+  fn decide(
+    &self,
+    turn: Color,
+    index: usize,
+    ply: u16,
+    captures: &[(&Table, bool)],
+    moves: &mut Vec<(u8, u8)>,
+  ) -> Option<u16> {
+    let placement = self.layout.placement(turn, index);
+    let mut board = EMPTY_MAILBOX;
+    let [red, black] = placement.generals;
+    let men = [
+      (Piece::new(PieceType::General, Color::Red).to_u8(), red),
+      (Piece::new(PieceType::General, Color::Black).to_u8(), black),
+    ];
+    for &(code, sq) in men.iter().chain(&placement.pieces[..placement.len]) {
+      if board[sq as usize] != EMPTY {
+        return Some(INVALID);
+      }
+      board[sq as usize] = code;
+    }
+    // The side that just moved can't have left its general attacked
+    let enemy = turn.other();
+    if attacked(&board, placement.generals[enemy.index()] as usize, enemy) {
+      return Some(INVALID);
+    }
+
+    moves.clear();
+    for &(code, sq) in men.iter().chain(&placement.pieces[..placement.len]) {
+      let piece = Piece::from_u8(code).unwrap();
+      if piece.color == turn {
+        generate_piece_moves(&board, sq as usize, piece, moves);
+      }
+    }
+    let general = placement.generals[turn.index()];
+    let mut any_move = false;
+    let mut all_lost = true;
+    for &(from, to) in moves.iter() {
+      let captured = board[to as usize];
+      board[to as usize] = board[from as usize];
+      board[from as usize] = EMPTY;
+      let own = if from == general { to } else { general };
+      let legal = !attacked(&board, own as usize, turn);
+      board[from as usize] = board[to as usize];
+      board[to as usize] = captured;
+      if !legal {
+        continue;
+      }
+      any_move = true;
+
+      let value = self.child_value(&placement, from, to, captures);
+      if value > INVALID {
+        let plies = value - 2;
+        if plies % 2 == 0 {
+          // The opponent loses after this move: a win, now if it loses in ply - 1, otherwise it was or will be found
+          if plies + 1 == ply {
+            return Some(ply + 2);
+          }
+          all_lost = false;
+        } else if plies >= ply {
+          all_lost = false;
+        }
+      } else {
+        all_lost = false;
+      }
+    }
+    if !any_move {
+      return Some(2);
+    }
+    all_lost.then_some(ply + 2)
+  }
+
+  // Value of the position after `from` -> `to`, looked up in this table or, after a capture, in a smaller one
+  fn child_value(&self, placement: &Placement, from: u8, to: u8, captures: &[(&Table, bool)]) -> u16 {
+    let mut child = *placement;
+    child.turn = placement.turn.other();
+    let mut captured_slot = None;
+    for (slot, (_, sq)) in child.pieces[..child.len].iter_mut().enumerate() {
+      if *sq == to {
+        captured_slot = Some(slot);
+      } else if *sq == from {
+        *sq = to;
+      }
+    }
+    let side = placement.turn.index();
+    if child.generals[side] == from {
+      child.generals[side] = to;
+    }
+
+    match captured_slot {
+      None => self.value(&child),
+      Some(slot) => {
+        child.pieces.copy_within(slot + 1..child.len, slot);
+        child.len -= 1;
+        let (table, flipped) = captures[slot];
+        if flipped {
+          table.value(&child.flipped())
+        } else {
+          table.value(&child)
+        }
+      },
+    }
+  }
+
+  fn write(&self, dir: &Path) -> io::Result<()> {
+    let name = self.layout.material.name();
+    let len = self.layout.len;
+    let header = |magic: &[u8; 8]| {
+      let mut data = Vec::with_capacity(HEADER_LEN + 2 * len);
+      data.extend_from_slice(magic);
+      data.extend_from_slice(&(len as u64).to_le_bytes());
+      data
+    };
+    let mut wdl = header(WDL_MAGIC);
+    wdl.resize(HEADER_LEN + (2 * len).div_ceil(4), 0);
+    let mut dtm = header(DTM_MAGIC);
+
+    for (i, value) in self.values.iter().flatten().enumerate() {
+      let (code, moves) = match value.load(Ordering::Relaxed) {
+        UNKNOWN => (WDL_DRAW, 0),
+        INVALID => (WDL_INVALID, 0),
+        value if value % 2 == 1 => (WDL_WIN, (value - 1) / 2),
+        value => (WDL_LOSS, (value - 2) / 2),
+      };
+      let moves = u8::try_from(moves)
+        .map_err(|_| io::Error::other(format!("{name}: a mate in {moves} moves does not fit the DTM file")))?;
+      wdl[HEADER_LEN + i / 4] |= code << (2 * (i % 4));
+      dtm.push(moves);
+    }
+    fs::write(dir.join(format!("{name}.xqwdl")), wdl)?;
+    fs::write(dir.join(format!("{name}.xqdtm")), dtm)
+  }
+
+  // Read back a table written earlier, to generate larger ones from it
+  fn read(layout: Layout, dir: &Path) -> io::Result<Table> {
+    let name = layout.material.name();
+    let wdl = fs::read(dir.join(format!("{name}.xqwdl")))?;
+    let dtm = fs::read(dir.join(format!("{name}.xqdtm")))?;
+    check_header(&wdl, WDL_MAGIC, layout.len, (2 * layout.len).div_ceil(4))?;
+    check_header(&dtm, DTM_MAGIC, layout.len, 2 * layout.len)?;
+    let value = |i: usize| {
+      let moves = dtm[HEADER_LEN + i] as u16;
+      match (wdl[HEADER_LEN + i / 4] >> (2 * (i % 4))) & 3 {
+        WDL_DRAW => UNKNOWN,
+        WDL_WIN => 2 * moves + 1,
+        WDL_LOSS => 2 * moves + 2,
+        _ => INVALID,
+      }
+    };
+    let len = layout.len;
+    Ok(Table {
+      values: [
+        (0..len).map(|i| AtomicU16::new(value(i))).collect(),
+        (len..2 * len).map(|i| AtomicU16::new(value(i))).collect(),
+      ],
+      layout,
+    })
+  }
+}
+
+// Check the magic, the number of positions per side to move and the size of a file
+fn check_header(data: &[u8], magic: &[u8; 8], positions: usize, body: usize) -> io::Result<()> {
+  if data.len() != HEADER_LEN + body || !data.starts_with(magic) || data[8..16] != (positions as u64).to_le_bytes() {
+    return Err(io::Error::new(
+      io::ErrorKind::InvalidData,
+      "not a tablebase file of the expected layout",
+    ));
+  }
+  Ok(())
+}
+
+// Generate the table of `material` into `dir`, along with every smaller table its captures lead to that is not there
+// yet. Returns the names of the tables written.
+pub(crate) fn generate(material: &Material, dir: &Path, threads: usize) -> io::Result<Vec<String>> {
+  let threads = match threads {
+    0 => thread::available_parallelism().map_or(1, |n| n.get()),
+    n => n,
+  };
+  fs::create_dir_all(dir)?;
+  let mut tables = HashMap::new();
+  let mut written = Vec::new();
+  build(material.canonical().0, dir, threads, true, &mut tables, &mut written)?;
+  Ok(written)
+}
+
+fn build(
+  material: Material,
+  dir: &Path,
+  threads: usize,
+  regenerate: bool,
+  tables: &mut HashMap<Material, Table>,
+  written: &mut Vec<String>,
+) -> io::Result<()> {
+  if tables.contains_key(&material) {
+    return Ok(());
+  }
+  for slot in 0..material.0.len() {
+    build(
+      material.without(slot).canonical().0,
+      dir,
+      threads,
+      false,
+      tables,
+      written,
+    )?;
+  }
+  let layout = Layout::new(material.clone());
+  let name = material.name();
+  let table = if !regenerate && dir.join(format!("{name}.xqwdl")).exists() {
+    Table::read(layout, dir)?
+  } else {
+    let table = Table::generate(layout, tables, threads);
+    table.write(dir)?;
+    written.push(name);
+    table
+  };
+  tables.insert(material, table);
+  Ok(())
+}
+
+struct MappedTable {
+  layout: Layout,
+  wdl: Mmap,
+  dtm: Option<Mmap>,
+}
+
+// Tables memory-mapped from a directory
+pub(crate) struct Tablebase {
+  tables: HashMap<Material, MappedTable>,
+}
+
+impl Tablebase {
+  // Map every table in `dir`. The DTM file of a table is optional.
+  pub(crate) fn open(dir: &Path) -> io::Result<Tablebase> {
+    let mut tables = HashMap::new();
+    for entry in fs::read_dir(dir)? {
+      let path = entry?.path();
+      if path.extension().is_none_or(|ext| ext != "xqwdl") {
+        continue;
+      }
+      let Some(material) = path
+        .file_stem()
+        .and_then(|stem| stem.to_str())
+        .and_then(|stem| Material::parse(stem).ok())
+      else {
+        continue;
+      };
+      let layout = Layout::new(material.clone());
+      let wdl = Mmap::open(&path)?;
+      check_header(&wdl, WDL_MAGIC, layout.len, (2 * layout.len).div_ceil(4))?;
+      let dtm_path = path.with_extension("xqdtm");
+      let dtm = if dtm_path.exists() {
+        let dtm = Mmap::open(&dtm_path)?;
+        check_header(&dtm, DTM_MAGIC, layout.len, 2 * layout.len)?;
+        Some(dtm)
+      } else {
+        None
+      };
+      tables.insert(material, MappedTable { layout, wdl, dtm });
+    }
+    Ok(Tablebase { tables })
+  }
+
+  pub(crate) fn materials(&self) -> Vec<String> {
+    let mut names: Vec<String> = self.tables.keys().map(Material::name).collect();
+    names.sort_unstable();
+    names
+  }
+
+  // Result for the side to move, 1 for a win, 0 for a draw and -1 for a loss, and the plies to mate if the table has
+  // a DTM file. None if no table covers the position or it can't arise in a game.
+  pub(crate) fn probe(&self, board: &Board) -> Option<(i8, Option<u32>)> {
+    let placement = Placement::of(board)?;
+    let (material, flipped) = placement.material().canonical();
+    let table = self.tables.get(&material)?;
+    let placement = if flipped { placement.flipped() } else { placement };
+    let i = placement.turn.index() * table.layout.len + table.layout.locate(&placement)?;
+
+    let moves = table.dtm.as_ref().map(|dtm| dtm[HEADER_LEN + i] as u32);
+    match (table.wdl[HEADER_LEN + i / 4] >> (2 * (i % 4))) & 3 {
+      WDL_DRAW => Some((0, moves.map(|_| 0))),
+      WDL_WIN => Some((1, moves.map(|moves| (2 * moves).saturating_sub(1)))),
+      WDL_LOSS => Some((-1, moves.map(|moves| 2 * moves))),
+      _ => None,
+    }
+  }
+}
@@ -0,0 +1,138 @@
+// Transposition table.
+//
+// A fixed array of entries sized from a budget in MB and indexed by the low bits of the Zobrist key. Each entry is
+// two words: one packed word of best move, score, depth and bound, and the key XORed with that word. An entry is
+// replaced unless it holds the same position searched deeper.
+//
+// The table is shared by the search threads without locking. Both words are plain relaxed atomics, so two threads
+// storing to the same slot at once can leave the key word of one entry next to the data word of the other. Such a torn
+// entry no longer XORs back to any key it could be probed with and reads as a miss.
+
+use std::sync::atomic::{AtomicU64, Ordering};
+
+use crate::search::{MATE, MAX_PLY};
+
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub(crate) enum Bound {
+  Exact,
+  // Score is at least this much (fail high)
+  Lower,
+  // Score is at most this much (fail low)
+  Upper,
+}
+
+#[derive(Clone, Copy, Debug)]
+pub(crate) struct TtEntry {
+  pub(crate) best_move: Option<(u8, u8)>,
+  pub(crate) score: i32,
+  pub(crate) depth: u32,
+  pub(crate) bound: Bound,
+}
+
+#[derive(Default)]
+struct Slot {
+  // key ^ data
+  check: AtomicU64,
+  // from (8) | to (8) | score (16) | depth (8) | bound (8), bound 0 marks an empty slot
+  data: AtomicU64,
+}
+
+impl Slot {
+  // The packed data of the entry, if the slot holds `key` and was not torn by a concurrent store
+  fn read(&self, key: u64) -> Option<u64> {
+    let data = self.data.load(Ordering::Relaxed);
+    (self.check.load(Ordering::Relaxed) ^ data == key).then_some(data)
+  }
+}
+
+pub(crate) struct TranspositionTable {
+  slots: Box<[Slot]>,
+  mask: usize,
+}
+
+impl TranspositionTable {
+  // Largest power of two number of entries that fits in `mb` megabytes, at least one
+  pub(crate) fn new(mb: usize) -> Self {
+    let budget = (mb << 20) / std::mem::size_of::<Slot>();
+    let len = if budget == 0 { 1 } else { 1 << budget.ilog2() };
+    TranspositionTable {
+      slots: (0..len).map(|_| Slot::default()).collect(),
+      mask: len - 1,
+    }
+  }
+
+  pub(crate) fn probe(&self, key: u64, ply: usize) -> Option<TtEntry> {
+    let mut entry = unpack(self.slots[key as usize & self.mask].read(key)?)?;
+    entry.score = score_from_tt(entry.score, ply);
+    Some(entry)
+  }
+
+  pub(crate) fn store(&self, key: u64, ply: usize, entry: TtEntry) {
+    let slot = &self.slots[key as usize & self.mask];
+    if slot
+      .read(key)
+      .and_then(unpack)
+      .is_some_and(|old| old.depth > entry.depth)
+    {
+      return;
+    }
+    let data = pack(TtEntry {
+      score: score_to_tt(entry.score, ply),
+      ..entry
+    });
+    slot.check.store(key ^ data, Ordering::Relaxed);
+    slot.data.store(data, Ordering::Relaxed);
+  }
+}
+
+fn pack(entry: TtEntry) -> u64 {
+  let (from, to) = entry.best_move.unwrap_or((0, 0));
+  let bound = match entry.bound {
+    Bound::Exact => 1,
+    Bound::Lower => 2,
+    Bound::Upper => 3,
+  };
+  from as u64
+    | (to as u64) << 8
+    | (entry.score as i16 as u16 as u64) << 16
+    | (entry.depth.min(255) as u64) << 32
+    | bound << 40
+}
+
+fn unpack(data: u64) -> Option<TtEntry> {
+  let bound = match (data >> 40) as u8 {
+    1 => Bound::Exact,
+    2 => Bound::Lower,
+    3 => Bound::Upper,
+    _ => return None,
+  };
+  let (from, to) = (data as u8, (data >> 8) as u8);
+  Some(TtEntry {
+    best_move: (from != to).then_some((from, to)),
+    score: (data >> 16) as u16 as i16 as i32,
+    depth: (data >> 32) as u8 as u32,
+    bound,
+  })
+}
+
+// Mate scores count plies from the root. The table stores them relative to the node instead, so that the same
+// position reached at another ply reads back the right distance to mate.
+fn score_to_tt(score: i32, ply: usize) -> i32 {
+  if score >= MATE - MAX_PLY as i32 {
+    score + ply as i32
+  } else if score <= -MATE + MAX_PLY as i32 {
+    score - ply as i32
+  } else {
+    score
+  }
+}
+
+fn score_from_tt(score: i32, ply: usize) -> i32 {
+  if score >= MATE - MAX_PLY as i32 {
+    score - ply as i32
+  } else if score <= -MATE + MAX_PLY as i32 {
+    score + ply as i32
+  } else {
+    score
+  }
+}
@@ -0,0 +1,64 @@
+// Vectorized self-play environment.
+//
+// N games are held side by side and stepped together: one call plays one move in every game, given as actions of the
+// compact action space (see `actions`). A game ends when the side to move has no legal move, which loses in xiangqi
+// whether or not it is in check, or when it reaches the ply limit, a draw. A finished game is reset to the start
+// position within the same step, so every game always has a move to play.
+
+use crate::{actions, Board};
+
+pub(crate) struct VecEnv {
+  start: Board,
+  boards: Vec<Board>,
+  plies: Vec<u32>,
+  max_plies: u32,
+}
+
+impl VecEnv {
+  pub(crate) fn new(start: Board, n: usize, max_plies: u32) -> VecEnv {
+    VecEnv {
+      boards: vec![start.clone(); n],
+      plies: vec![0; n],
+      start,
+      max_plies,
+    }
+  }
+
+  pub(crate) fn boards(&self) -> &[Board] {
+    &self.boards
+  }
+
+  pub(crate) fn reset(&mut self) {
+    self.boards.fill(self.start.clone());
+    self.plies.fill(0);
+  }
+
+  // Play `actions[i]` in game i. `rewards[i]` is set to 1 if the move ends game i with a win for the side that played
+  // it and to 0 otherwise, `dones[i]` to whether game i ended and was reset. Nothing is played if an action is not
+  // legal in its game.
+  pub(crate) fn step(&mut self, actions: &[usize], rewards: &mut [f32], dones: &mut [bool]) -> Result<(), String> {
+    if actions.len() != self.boards.len() {
+      return Err(format!("{} actions for {} games", actions.len(), self.boards.len()));
+    }
+    let mut moves = Vec::with_capacity(actions.len());
+    for (i, (board, &action)) in self.boards.iter().zip(actions).enumerate() {
+      match actions::action_move(action, false) {
+        Some((from, to)) if board.is_pseudo_legal(from, to) && board.is_legal(from, to) => moves.push((from, to)),
+        _ => return Err(format!("game {i}: action {action} is not a legal move")),
+      }
+    }
+    for (i, (from, to)) in moves.into_iter().enumerate() {
+      let board = &mut self.boards[i];
+      board.apply_move(from, to);
+      self.plies[i] += 1;
+      let won = !board.any_legal_move();
+      rewards[i] = if won { 1.0 } else { 0.0 };
+      dones[i] = won || self.plies[i] >= self.max_plies;
+      if dones[i] {
+        *board = self.start.clone();
+        self.plies[i] = 0;
+      }
+    }
+    Ok(())
+  }
+}
@@ -0,0 +1,44 @@
+// Zobrist keys for incremental position hashing.
+
+use crate::bitboard::{piece_index, NUM_SQUARES};
+use crate::{Color, PieceType};
+
+// splitmix64, good enough to spread the keys and usable in a const context
+pub(crate) const fn splitmix64(state: u64) -> (u64, u64) {
+  let state = state.wrapping_add(0x9E37_79B9_7F4A_7C15);
+  let mut z = state;
+  z = (z ^ (z >> 30)).wrapping_mul(0xBF58_476D_1CE4_E5B9);
+  z = (z ^ (z >> 27)).wrapping_mul(0x94D0_49BB_1331_11EB);
+  (state, z ^ (z >> 31))
+}
+
+const fn build_piece_keys() -> [[[u64; NUM_SQUARES]; 7]; 2] {
+  let mut keys = [[[0; NUM_SQUARES]; 7]; 2];
+  let mut state = 0x5851_F42D_4C95_7F2D;
+  let mut side = 0;
+  while side < 2 {
+    let mut piece = 0;
+    while piece < 7 {
+      let mut sq = 0;
+      while sq < NUM_SQUARES {
+        let (next, key) = splitmix64(state);
+        state = next;
+        keys[side][piece][sq] = key;
+        sq += 1;
+      }
+      piece += 1;
+    }
+    side += 1;
+  }
+  keys
+}
+
+const PIECE_KEYS: [[[u64; NUM_SQUARES]; 7]; 2] = build_piece_keys();
+
+// Toggled whenever the side to move changes, black to move has it set
+pub(crate) const SIDE_KEY: u64 = splitmix64(0x2545_F491_4F6C_DD1D).1;
+
+#[inline]
+pub(crate) fn piece_key(piece_type: PieceType, side: Color, sq: usize) -> u64 {
+  PIECE_KEYS[side.index()][piece_index(piece_type)][sq]
+}
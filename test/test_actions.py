@@ -0,0 +1,74 @@
+import array
+
+import pytest
+
+from libxiangqi import NUM_ACTIONS, Board, VecBoard, action_to_move, legal_move_masks, move_to_action
+
+# The red advisor on e0, off its usual squares, can move to f1, which no compact action stands for
+STRAY_ADVISOR = "4k4/9/9/9/9/9/9/9/3K5/4A4 w - - 0 1"
+
+
+def test_action_numbering():
+    """Test that actions map to moves and back, in increasing order of the squares they join"""
+    assert NUM_ACTIONS == 2086
+    assert action_to_move(0) == (0, 0, 1, 0)
+    assert action_to_move(NUM_ACTIONS - 1) == (8, 9, 7, 9)
+    for action in range(NUM_ACTIONS):
+        assert move_to_action(action_to_move(action)) == action
+    assert move_to_action((1, 2, 4, 2), full=True) == 19 * 90 + 22
+    assert action_to_move(19 * 90 + 22, full=True) == (1, 2, 4, 2)
+
+
+def test_invalid_actions():
+    """Test that moves no piece can make and actions out of range are rejected"""
+    with pytest.raises(ValueError):
+        move_to_action((0, 0, 1, 1))
+    with pytest.raises(ValueError):
+        move_to_action((0, 0, 0, 10))
+    with pytest.raises(ValueError):
+        action_to_move(NUM_ACTIONS)
+    with pytest.raises(ValueError):
+        action_to_move(90 * 90, full=True)
+
+
+def test_legal_move_mask():
+    """Test that the mask marks exactly the legal moves"""
+    b = Board()
+    mask = b.legal_move_mask()
+    assert len(mask) == NUM_ACTIONS
+    legal = {move_to_action(move) for move in b.get_legal_moves()}
+    assert {i for i, v in enumerate(mask) if v} == legal
+    assert len(legal) == 44
+    full = b.legal_move_mask(full=True)
+    assert {i for i, v in enumerate(full) if v} == {move_to_action(move, full=True) for move in b.get_legal_moves()}
+
+
+def test_legal_move_masks():
+    """Test that a batch of masks is written into a preallocated buffer"""
+    boards = [Board(), Board()]
+    boards[1].push((7, 2, 4, 2))
+    out = bytearray(b"\x07") * (2 * NUM_ACTIONS)
+    assert legal_move_masks(boards, out) is out
+    assert out[:NUM_ACTIONS] == boards[0].legal_move_mask()
+    assert out[NUM_ACTIONS:] == boards[1].legal_move_mask()
+
+    out = array.array("f", [0.0]) * (2 * 90 * 90)
+    legal_move_masks(boards, out, full=True)
+    assert out[90 * 90 :] == array.array("f", list(boards[1].legal_move_mask(full=True)))
+    with pytest.raises(ValueError):
+        legal_move_masks(boards, bytearray(NUM_ACTIONS))
+
+
+def test_moves_without_action_left_out():
+    """Test that a legal move with no compact action is left out of the mask, but not of the full one"""
+    b = Board.from_fen(STRAY_ADVISOR)
+    assert (4, 0, 5, 1) in b.get_legal_moves()
+    with pytest.raises(ValueError):
+        move_to_action((4, 0, 5, 1))
+    actions = {i for i, v in enumerate(b.legal_move_mask()) if v}
+    assert actions == {move_to_action(move) for move in b.get_legal_moves() if move != (4, 0, 5, 1)}
+    assert sum(b.legal_move_mask(full=True)) == len(b.get_legal_moves())
+    out = bytearray(NUM_ACTIONS)
+    legal_move_masks([b], out)
+    assert out == b.legal_move_mask()
+    assert VecBoard(2, fen=STRAY_ADVISOR).legal_move_masks().tobytes() == b.legal_move_mask() * 2
@@ -0,0 +1,31 @@
+import random
+
+import pytest
+from libxiangqi import Board
+
+
+def test_unknown_backend():
+    """Test that an unknown backend name is rejected"""
+    with pytest.raises(ValueError):
+        Board(backend="0x88")
+
+
+def test_bitboard_initial_moves_match_mailbox():
+    """Test both backends generate the same moves from the start position"""
+    assert sorted(Board(backend="bitboard").get_legal_moves()) == sorted(Board().get_legal_moves())
+
+
+def test_bitboard_matches_mailbox_in_random_games():
+    """Test both backends generate the same moves along random games"""
+    rng = random.Random(2024)
+    for _ in range(50):
+        mailbox = Board(backend="mailbox")
+        bitboard = Board(backend="bitboard")
+        for _ in range(120):
+            moves = sorted(mailbox.get_legal_moves())
+            assert sorted(bitboard.get_legal_moves()) == moves
+            if not moves:
+                break
+            move = rng.choice(moves)
+            mailbox.make_move(*move)
+            bitboard.make_move(*move)
@@ -0,0 +1,90 @@
+import pytest
+
+from libxiangqi import Board, Book, IllegalMove, build_book
+
+GAMES = [
+    [(1, 2, 4, 2), (7, 9, 6, 7), (1, 0, 2, 2)],
+    [(1, 2, 4, 2), (1, 9, 2, 7)],
+    [(1, 2, 4, 2), (7, 9, 6, 7)],
+    [(7, 2, 4, 2), (7, 9, 6, 7)],
+    [(2, 3, 2, 4)],
+]
+
+
+@pytest.fixture
+def book(tmp_path):
+    path = tmp_path / "opening.xqbook"
+    assert build_book(path, GAMES) == 7
+    return Book(path)
+
+
+def test_moves_most_played_first(book):
+    """Test that the book moves of a position come with their weights, most played first"""
+    assert len(book) == 7
+    moves = book.moves(Board())
+    assert moves[0] == ((1, 2, 4, 2), 3, 0)
+    assert sorted(move for move, _, _ in moves[1:]) == [(2, 3, 2, 4), (7, 2, 4, 2)]
+    assert book.best_move(Board()) == (1, 2, 4, 2)
+
+
+def test_moves_after_opening_move(book):
+    """Test that the replies to each opening move are counted separately"""
+    b = Board()
+    b.push((7, 2, 4, 2))
+    assert book.moves(b) == [((7, 9, 6, 7), 1, 0)]
+    b = Board()
+    b.push((1, 2, 4, 2))
+    assert book.moves(b) == [((7, 9, 6, 7), 2, 0), ((1, 9, 2, 7), 1, 0)]
+
+
+def test_transpositions_share_entries(tmp_path):
+    """Test that a position is found whatever move order led to it"""
+    path = tmp_path / "opening.xqbook"
+    games = [
+        [(0, 3, 0, 4), (0, 6, 0, 5), (8, 3, 8, 4), (8, 6, 8, 5)],
+        [(8, 3, 8, 4), (0, 6, 0, 5), (0, 3, 0, 4), (8, 6, 8, 5)],
+    ]
+    build_book(path, games)
+    b = Board()
+    for move in games[0][:3]:
+        b.push(move)
+    assert Book(path).moves(b) == [((8, 6, 8, 5), 2, 0)]
+
+
+def test_out_of_book(book):
+    """Test that a position the games never reached has no book moves"""
+    b = Board()
+    b.push((0, 3, 0, 4))
+    assert book.moves(b) == []
+    assert book.best_move(b) is None
+
+
+def test_max_ply_and_min_count(tmp_path):
+    """Test that only the opening moves are entered and that rare moves can be left out"""
+    path = tmp_path / "opening.xqbook"
+    assert build_book(path, GAMES, max_ply=1) == 3
+    assert build_book(path, GAMES, min_count=2) == 2
+    book = Book(path)
+    assert book.moves(Board()) == [((1, 2, 4, 2), 3, 0)]
+
+
+def test_illegal_move_raises(tmp_path):
+    """Test that a game with an illegal move is rejected"""
+    with pytest.raises(IllegalMove):
+        build_book(tmp_path / "opening.xqbook", [[(1, 2, 4, 2), (1, 2, 1, 5)]])
+
+
+def test_rejects_other_files(tmp_path):
+    """Test that a file that is not a book can't be opened"""
+    path = tmp_path / "opening.xqbook"
+    path.write_bytes(b"not a book")
+    with pytest.raises(OSError):
+        Book(path)
+
+
+def test_repeated_move_counts_once_per_game(tmp_path):
+    """Test that a move played again in a repetition adds one game to its weight, not two"""
+    path = tmp_path / "opening.xqbook"
+    shuffle = [(1, 0, 2, 2), (1, 9, 2, 7), (2, 2, 1, 0), (2, 7, 1, 9)]
+    build_book(path, [shuffle * 2])
+    assert Book(path).moves(Board()) == [((1, 0, 2, 2), 1, 0)]
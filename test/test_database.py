@@ -0,0 +1,86 @@
+import pytest
+
+from libxiangqi import Board, GameDatabase, IllegalMove, read_games
+
+GAME_1 = [(7, 2, 4, 2), (7, 9, 6, 7)]
+GAME_2 = [(1, 2, 4, 2), (7, 9, 6, 7), (7, 0, 6, 2)]
+
+
+def after(moves):
+    b = Board()
+    for move in moves:
+        b.push(move)
+    return b
+
+
+def test_add_and_read_back(tmp_path):
+    """Test that appended games are stored with their moves and results"""
+    db = GameDatabase(tmp_path / "db")
+    assert len(db) == 0
+    assert db.add_games([GAME_1, GAME_2]) == 2
+    assert len(db) == 2
+    assert db.game(0) == (GAME_1, None)
+    assert db.game(1) == (GAME_2, None)
+    with pytest.raises(IndexError):
+        db.game(2)
+
+
+def test_find_games_by_position(tmp_path):
+    """Test that the index finds every game that reached a position"""
+    db = GameDatabase(tmp_path / "db")
+    db.add_games([GAME_1, GAME_2])
+    db.add_games([GAME_1])
+    assert db.find(Board()) == [0, 1, 2]
+    assert db.find(after(GAME_1[:1])) == [0, 2]
+    assert db.find(after(GAME_2)) == [1]
+    assert db.find(after([(0, 3, 0, 4)])) == []
+
+
+def test_reopen(tmp_path):
+    """Test that a database opened again sees the games written before"""
+    GameDatabase(tmp_path / "db").add_games([GAME_1, GAME_2])
+    db = GameDatabase(tmp_path / "db")
+    assert len(db) == 2
+    assert db.find(after(GAME_2)) == [1]
+
+
+def test_add_pgn(tmp_path):
+    """Test that PGN games are imported with their results, skipping games that don't replay from the start"""
+    path = tmp_path / "games.pgn"
+    path.write_text('h2e2 h9g7 1-0\n\n[FEN "3k5/9/9/9/9/9/9/R8/R8/4K4 w - - 0 1"]\n\n+R.2 *\n\nh2e2 h2e2 *\n')
+    db = GameDatabase(tmp_path / "db")
+    assert db.add_pgn(path) == 1
+    assert db.game(0) == (GAME_1, "1-0")
+    assert db.add_games(read_games(path)) == 1
+    assert len(db) == 2
+    assert db.game(1) == (GAME_1, "1-0")
+
+
+def test_many_small_appends(tmp_path):
+    """Test that games added one at a time are all found, before and after reopening"""
+    db = GameDatabase(tmp_path / "db")
+    for i in range(50):
+        db.add_games([GAME_2 if i % 3 == 0 else GAME_1])
+    found = [i for i in range(50) if i % 3 != 0]
+    assert db.find(after(GAME_1[:1])) == found
+    assert db.find(Board()) == list(range(50))
+    assert GameDatabase(tmp_path / "db").find(after(GAME_1[:1])) == found
+
+
+def test_open_handle_survives_appends(tmp_path):
+    """Test that a database opened before other appends keeps finding the games it saw"""
+    db = GameDatabase(tmp_path / "db")
+    db.add_games([GAME_1])
+    reader = GameDatabase(tmp_path / "db")
+    for _ in range(20):
+        db.add_games([GAME_1, GAME_2])
+    assert reader.find(after(GAME_1[:1])) == [0]
+    assert len(GameDatabase(tmp_path / "db").find(after(GAME_1[:1]))) == 21
+
+
+def test_illegal_game_adds_nothing(tmp_path):
+    """Test that a batch with an illegal move is rejected as a whole"""
+    db = GameDatabase(tmp_path / "db")
+    with pytest.raises(IllegalMove):
+        db.add_games([GAME_1, [(7, 2, 4, 2), (7, 2, 4, 2)]])
+    assert len(db) == 0
@@ -0,0 +1,38 @@
+from libxiangqi import START_FEN, Board
+
+
+def test_start_position_is_balanced():
+    """Test that the symmetric start position scores zero for either side"""
+    assert Board().evaluate() == 0
+    assert Board.from_fen(START_FEN.replace(" w ", " b ")).evaluate() == 0
+
+
+def test_score_is_for_side_to_move():
+    """Test that the same position scores with opposite signs for the two sides"""
+    red = Board.from_fen("4k4/9/9/9/9/9/9/9/9/3K1R3 w - - 0 1")
+    black = Board.from_fen("4k4/9/9/9/9/9/9/9/9/3K1R3 b - - 0 1")
+    assert red.evaluate() > 800
+    assert black.evaluate() == -red.evaluate()
+
+
+def test_capture_changes_material():
+    """Test that losing a chariot costs about a chariot"""
+    g = Board()
+    without = Board.from_fen("rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/1NBAKABNR w - - 0 1")
+    assert 850 < g.evaluate() - without.evaluate() < 950
+
+
+def test_incremental_matches_fresh_board():
+    """Test that make_move and pop keep the evaluation equal to a freshly built board"""
+    g = Board()
+    moves = [(7, 2, 4, 2), (7, 9, 6, 7), (4, 2, 4, 6), (6, 7, 4, 6), (1, 2, 1, 9), (0, 9, 1, 9)]
+    scores = [g.evaluate()]
+    for move in moves:
+        g.push(move)
+        assert g.evaluate() == Board.from_fen(g.fen()).evaluate()
+        scores.append(g.evaluate())
+    for _ in moves:
+        scores.pop()
+        g.pop()
+        assert g.evaluate() == scores[-1]
+
@@ -0,0 +1,77 @@
+import pytest
+
+from libxiangqi import Board, GameDatabase, OpeningExplorer, build_explorer
+
+CANNON = (7, 2, 4, 2)
+HORSE = (7, 9, 6, 7)
+
+PGN = "h2e2 h9g7 1-0\n\nh2e2 h9g7 1/2-1/2\n\nh2e2 b9c7 0-1\n\nb2e2 *\n"
+
+
+def after(*moves):
+    b = Board()
+    for move in moves:
+        b.push(move)
+    return b
+
+
+def write_pgn(tmp_path, name="games.pgn", text=PGN):
+    path = tmp_path / name
+    path.write_text(text)
+    return path
+
+
+def test_counts_moves_and_results(tmp_path):
+    """Test that each move of a position is counted with the results of the games that played it"""
+    path = tmp_path / "explorer.bin"
+    assert build_explorer(path, [write_pgn(tmp_path)], threads=2) == 4
+    explorer = OpeningExplorer(path)
+    assert explorer.games == 4
+    assert explorer.moves(Board()) == [(CANNON, (3, 1, 1, 1)), ((1, 2, 4, 2), (1, 0, 0, 0))]
+    assert explorer.stats(Board()) == (4, 1, 1, 1)
+    assert explorer.moves(after(CANNON))[0] == (HORSE, (2, 1, 1, 0))
+    assert explorer.stats(after(CANNON, HORSE)) == (0, 0, 0, 0)
+
+
+def test_max_ply(tmp_path):
+    """Test that moves past max_ply are not counted"""
+    path = tmp_path / "explorer.bin"
+    build_explorer(path, [write_pgn(tmp_path)], max_ply=1)
+    explorer = OpeningExplorer(path)
+    assert explorer.stats(Board()) == (4, 1, 1, 1)
+    assert explorer.moves(after(CANNON)) == []
+
+
+def test_update_with_pgn(tmp_path):
+    """Test that an update adds new games to the counts already there"""
+    path = tmp_path / "explorer.bin"
+    build_explorer(path, [write_pgn(tmp_path)])
+    assert build_explorer(path, [write_pgn(tmp_path, "new.pgn", "h2e2 h9g7 1-0\n")], update=True) == 1
+    explorer = OpeningExplorer(path)
+    assert explorer.games == 5
+    assert explorer.moves(after(CANNON))[0] == (HORSE, (3, 2, 1, 0))
+
+
+def test_update_with_other_max_ply(tmp_path):
+    """Test that an update counting to another ply than the file was built with is refused"""
+    path = tmp_path / "explorer.bin"
+    build_explorer(path, [write_pgn(tmp_path)], max_ply=10)
+    with pytest.raises(ValueError):
+        build_explorer(path, [write_pgn(tmp_path)], update=True)
+    assert OpeningExplorer(path).games == 4
+
+
+def test_update_from_database(tmp_path):
+    """Test that an update from a database only replays the games added since, and matches a full rebuild"""
+    db = GameDatabase(tmp_path / "db")
+    db.add_pgn(write_pgn(tmp_path))
+    path = tmp_path / "explorer.bin"
+    assert build_explorer(path, db) == 4
+    db.add_games([[CANNON, HORSE]] * 3)
+    assert build_explorer(path, db, update=True) == 3
+    assert build_explorer(tmp_path / "full.bin", db) == 7
+    explorer, full = OpeningExplorer(path), OpeningExplorer(tmp_path / "full.bin")
+    assert explorer.games == full.games == 7
+    for b in [Board(), after(CANNON)]:
+        assert explorer.moves(b) == full.moves(b)
+    assert explorer.moves(Board())[0] == (CANNON, (6, 1, 1, 1))
@@ -0,0 +1,77 @@
+import pytest
+from libxiangqi import START_FEN, Board, load_fens
+
+
+def test_start_position_fen():
+    """Test that the start position serializes to the standard FEN"""
+    assert Board().fen() == START_FEN
+    assert Board.from_fen(START_FEN) == Board()
+
+
+def test_fen_round_trip_after_moves():
+    """Test that a position survives a FEN round trip"""
+    g = Board()
+    g.make_move(7, 2, 4, 2)
+    g.make_move(7, 9, 6, 7)
+    g.make_move(7, 0, 6, 2)
+    h = Board.from_fen(g.fen())
+    assert h == g
+    assert h.fen() == g.fen()
+    assert repr(h) == repr(g)
+    assert sorted(h.get_legal_moves()) == sorted(g.get_legal_moves())
+
+
+def test_fen_side_to_move():
+    """Test that the side to move is read from the FEN"""
+    g = Board.from_fen("4k4/9/9/9/9/9/9/9/9/4K4 b - - 0 1")
+    assert g.turn is False
+    assert g.fen() == "4k4/9/9/9/9/9/9/9/9/4K4 b - - 0 1"
+
+
+def test_fen_alternative_letters():
+    """Test that E/H are accepted for elephant and horse"""
+    g = Board.from_fen("rheakaehr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RHEAKAEHR w")
+    assert g.fen() == START_FEN
+
+
+@pytest.mark.parametrize(
+    "fen",
+    [
+        "",
+        "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9 w",
+        "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNRR w",
+        "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABN w",
+        "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNX w",
+        "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR x",
+        "rnbakabnr/9/1c5c1/p1p1p1p1p/" + "9" * 29 + "4/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w",
+        "rnbakabnr/9/1c5c1/p1p1p1p1p/55/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w",
+    ],
+)
+def test_invalid_fen(fen):
+    """Test that malformed FENs raise ValueError"""
+    with pytest.raises(ValueError):
+        Board.from_fen(fen)
+
+
+def test_load_fens_from_list():
+    """Test bulk loading FENs from a list"""
+    boards = load_fens([START_FEN, "", "4k4/9/9/9/9/9/9/9/9/4K4 b - - 0 1"])
+    assert len(boards) == 2
+    assert boards[0] == Board()
+    assert boards[1].turn is False
+
+
+def test_load_fens_from_file(tmp_path):
+    """Test bulk loading FENs from a file, one per line"""
+    path = tmp_path / "positions.fen"
+    path.write_text(f"{START_FEN}\n4k4/9/9/9/9/9/9/9/9/4K4 b - - 0 1\n")
+    boards = load_fens(path, backend="bitboard")
+    assert [b.fen() for b in boards] == [START_FEN, "4k4/9/9/9/9/9/9/9/9/4K4 b - - 0 1"]
+
+
+def test_load_fens_reports_line(tmp_path):
+    """Test that a bad line in a FEN file is reported with its line number"""
+    path = tmp_path / "positions.fen"
+    path.write_text(f"{START_FEN}\nnot a fen\n")
+    with pytest.raises(ValueError, match="line 2"):
+        load_fens(str(path))
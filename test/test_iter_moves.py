@@ -0,0 +1,45 @@
+import pytest
+from libxiangqi import Board
+
+
+@pytest.mark.parametrize("backend", ["mailbox", "bitboard"])
+@pytest.mark.parametrize("captures_first", [True, False])
+def test_iter_matches_legal_moves(backend, captures_first):
+    """Test that the lazy iterator yields exactly the legal moves"""
+    g = Board.from_fen("r1ba1a3/4kn3/2n1b4/pNp1p1p1p/4c4/6P2/P1P2R2P/1CcC5/9/2BAKAB2 w - - 0 1", backend=backend)
+    moves = list(g.iter_legal_moves(captures_first=captures_first))
+    assert len(moves) == len(set(moves))
+    assert sorted(moves) == sorted(g.get_legal_moves())
+
+
+def test_plain_order_is_generation_order():
+    """Test that without captures_first the moves come in the same order as get_legal_moves"""
+    g = Board()
+    assert list(g.iter_legal_moves(captures_first=False)) == g.get_legal_moves()
+
+
+def test_captures_come_first():
+    """Test that captures are yielded before quiet moves, most valuable victim first"""
+    # The red chariot can take the black chariot or the soldier
+    g = Board.from_fen("3k5/9/9/9/9/p8/9/9/4K4/R7r w - - 0 1")
+    moves = list(g.iter_legal_moves())
+    assert moves[:2] == [(0, 0, 8, 0), (0, 0, 0, 4)]
+
+
+def test_iterator_skips_illegal_moves():
+    """Test that moves leaving the general in check are never yielded"""
+    g = Board.from_fen("4k4/9/9/9/4r4/9/9/9/4R4/4K4 w - - 0 1")
+    moves = set(g.iter_legal_moves())
+    assert (4, 1, 3, 1) not in moves
+    assert (4, 1, 4, 5) in moves
+
+
+def test_iterator_is_lazy_snapshot():
+    """Test that stopping early works and the iterator is unaffected by later moves"""
+    g = Board()
+    it = g.iter_legal_moves()
+    first = next(it)
+    g.push(first)
+    rest = list(it)
+    g.pop()
+    assert sorted([first, *rest]) == sorted(g.get_legal_moves())
@@ -0,0 +1,90 @@
+import pytest
+from libxiangqi import Board, IllegalMove
+
+
+def test_start_position_not_check():
+    """Test that the start position is neither check nor mate"""
+    g = Board()
+    assert not g.is_check()
+    assert not g.is_checkmate()
+    assert not g.is_stalemate()
+    assert g.has_legal_move()
+
+
+def test_generals_cannot_face_each_other():
+    """Test that the general cannot step onto the open file of the enemy general"""
+    g = Board.from_fen("3k5/9/9/9/9/9/9/9/9/4K4 w - - 0 1")
+    assert sorted(g.get_legal_moves()) == [(4, 0, 4, 1), (4, 0, 5, 0)]
+    with pytest.raises(IllegalMove):
+        g.make_move(4, 0, 3, 0)
+
+
+def test_facing_generals_is_check():
+    """Test that generals facing each other on an open file counts as check"""
+    assert Board.from_fen("4k4/9/9/9/9/9/9/9/9/4K4 w - - 0 1").is_check()
+
+
+def test_screen_cannot_leave_file_between_generals():
+    """Test that the last piece between the generals cannot step aside"""
+    g = Board.from_fen("4k4/9/9/9/9/4r4/9/9/9/4K4 b - - 0 1")
+    with pytest.raises(IllegalMove):
+        g.make_move(4, 4, 3, 4)
+    g.make_move(4, 4, 4, 2)
+
+
+def test_pinned_chariot_stays_on_file():
+    """Test that a pinned chariot can only move along the pinning line"""
+    g = Board.from_fen("4k4/9/9/9/4r4/9/9/9/4R4/3K5 w - - 0 1", backend="bitboard")
+    g.make_move(3, 0, 4, 0)
+    g.make_move(4, 9, 3, 9)
+    chariot_moves = [m for m in g.get_legal_moves() if m[:2] == (4, 1)]
+    assert chariot_moves and all(to_file == 4 for _, _, to_file, _ in chariot_moves)
+
+
+@pytest.mark.parametrize(
+    "fen",
+    [
+        "4k4/9/4a4/9/9/9/9/4C4/9/3K5 b - - 0 1",  # cannon with a screen
+        "4k4/9/3N5/9/9/9/9/9/9/3K5 b - - 0 1",  # horse
+        "4k4/4P4/9/9/9/9/9/9/9/3K5 b - - 0 1",  # soldier in front
+        "4kP3/9/9/9/9/9/9/9/9/3K5 b - - 0 1",  # soldier beside
+        "3k5/9/9/9/9/9/9/9/9/3R1K3 b - - 0 1",  # chariot
+    ],
+)
+def test_is_check(fen):
+    """Test check detection for each attacking piece"""
+    assert Board.from_fen(fen).is_check()
+
+
+def test_horse_leg_blocks_check():
+    """Test that a horse with a blocked leg does not give check"""
+    assert not Board.from_fen("4k4/3a5/3N5/9/9/9/9/9/9/3K5 b - - 0 1").is_check()
+
+
+def test_checkmate():
+    """Test a two chariot mate"""
+    g = Board.from_fen("3k5/4R4/3R5/9/9/9/9/9/9/4K4 b - - 0 1")
+    assert g.is_check()
+    assert g.is_checkmate()
+    assert not g.is_stalemate()
+    assert not g.has_legal_move()
+    assert g.get_legal_moves() == []
+
+
+def test_stalemate():
+    """Test a position where black has no move but is not in check"""
+    g = Board.from_fen("3k5/8R/4R4/9/9/9/9/9/9/5K3 b - - 0 1")
+    assert not g.is_check()
+    assert not g.is_checkmate()
+    assert g.is_stalemate()
+
+
+def test_must_answer_check():
+    """Test that every legal move in check resolves the check"""
+    g = Board.from_fen("4k4/9/9/9/9/9/9/9/4p4/3AKA3 w - - 0 1")
+    assert g.is_check()
+    for move in g.get_legal_moves():
+        g.push(move)
+        g.pop()
+    # The general may not take the soldier itself, that would open the file between the generals
+    assert sorted(g.get_legal_moves()) == [(3, 0, 4, 1), (5, 0, 4, 1)]
@@ -0,0 +1,55 @@
+import pytest
+
+from libxiangqi import NUM_ACTIONS, Board
+
+# Red to move, the chariot on b1 mates on b9
+MATE_IN_ONE = "4k4/R8/9/9/9/9/9/9/1R7/3K5 w - - 0 1"
+
+
+def uniform(batches):
+    def evaluate(planes):
+        batches.append(planes.shape)
+        k = planes.shape[0]
+        return [1.0] * (k * NUM_ACTIONS), [0.0] * k
+
+    return evaluate
+
+
+def test_finds_mate():
+    """Test that the search settles on the mating move with a uniform evaluator"""
+    batches = []
+    result = Board.from_fen(MATE_IN_ONE).mcts(uniform(batches), simulations=400, batch_size=8)
+    assert result.best_move == (1, 1, 1, 9)
+    assert result.moves[0][0] == result.best_move
+    assert result.moves[0][2] == pytest.approx(1.0)
+    assert sum(visits for _, visits, _ in result.moves) == 399
+    assert all(shape[0] <= 8 and shape[1:] == (15, 10, 9) for shape in batches)
+
+
+def test_batches_leaves():
+    """Test that leaves are evaluated in batches, also with several search threads"""
+    for threads in [1, 2]:
+        batches = []
+        result = Board().mcts(uniform(batches), simulations=200, batch_size=16, threads=threads)
+        assert len(result.moves) == 44
+        assert sum(shape[0] for shape in batches) == 200
+        assert max(shape[0] for shape in batches) == 16
+
+
+def test_evaluator_errors():
+    """Test that an error raised by the evaluator, or output of the wrong size, stops the search"""
+
+    def failing(planes):
+        raise RuntimeError("no network")
+
+    with pytest.raises(RuntimeError):
+        Board().mcts(failing, simulations=10)
+    with pytest.raises(ValueError):
+        Board().mcts(lambda planes: ([0.0], [0.0]), simulations=10)
+
+
+def test_move_without_action():
+    """Test that a legal move with no compact action, from an advisor off its usual squares, is searched with no prior"""
+    b = Board.from_fen("4k4/9/9/9/9/9/9/9/3K5/4A4 w - - 0 1")
+    result = b.mcts(uniform([]), simulations=50)
+    assert sorted(move for move, _, _ in result.moves) == sorted(b.get_legal_moves())
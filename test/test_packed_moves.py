@@ -0,0 +1,83 @@
+import array
+
+import pytest
+
+from libxiangqi import Board, IllegalMove, Move, Square, simulate_games
+
+
+def test_move_packing():
+    """Test that a move packs as from_square | to_square << 7 with squares numbered rank * 9 + file"""
+    move = Move(Square.B1, Square.C3)
+    assert move.packed == int(move) == 1 | 20 << 7
+    assert move.tuple() == (1, 0, 2, 2)
+    assert Move.from_packed(move.packed) == move
+    assert Move.from_tuple((1, 0, 2, 2)) == move
+    assert move.from_square == Square.B1 and move.to_square == Square.C3
+    assert len({move, Move.from_packed(move.packed)}) == 1
+
+
+def test_invalid_packed_move():
+    """Test that packed values off the board are rejected"""
+    with pytest.raises(ValueError):
+        Move.from_packed(90)
+    with pytest.raises(ValueError):
+        Move.from_packed(1 << 14)
+
+
+def test_legal_moves_packed():
+    """Test that the packed legal moves are the legal moves"""
+    b = Board()
+    moves = b.legal_moves_packed()
+    assert moves.typecode == "H"
+    assert sorted(Move.from_packed(mv).tuple() for mv in moves) == sorted(b.get_legal_moves())
+    assert sorted(m.packed for m in b.legal_move_objects()) == sorted(moves)
+    played, pushed = Board(), Board()
+    played.make_moves(moves[:1])
+    pushed.push(Move.from_packed(moves[0]).tuple())
+    assert played == pushed
+
+
+def test_push_packed():
+    """Test that push_packed plays the move like push"""
+    a, b = Board(), Board()
+    a.push((1, 0, 2, 2))
+    b.push_packed(Move.from_tuple((1, 0, 2, 2)).packed)
+    assert a.fen() == b.fen()
+    assert b.pop() == (1, 0, 2, 2)
+    with pytest.raises(IllegalMove):
+        b.push_packed(Move.from_tuple((1, 0, 1, 1)).packed)
+
+
+def test_make_moves_forms():
+    """Test that make_moves takes array('H'), little endian bytes, ints and Move objects"""
+    moves = [Move.from_tuple(mv) for mv in [(1, 0, 2, 2), (1, 9, 2, 7), (2, 2, 1, 0), (2, 7, 1, 9)]]
+    packed = array.array("H", [mv.packed for mv in moves])
+    for form in [packed, b"".join(mv.packed.to_bytes(2, "little") for mv in moves), list(packed), moves]:
+        b = Board()
+        b.make_moves(form)
+        assert b.fen() == Board().fen()
+        assert b.is_repetition(2)
+
+
+def test_make_moves_replays_games():
+    """Test that recorded games replay in one call each"""
+    result = simulate_games(20, max_plies=100, seed=1, record=True)
+    for moves in result.moves:
+        b = Board()
+        b.make_moves(moves)
+        slow = Board()
+        for i in range(0, len(moves), 2):
+            slow.push(Move.from_packed(int.from_bytes(moves[i : i + 2], "little")).tuple())
+        assert b.fen() == slow.fen()
+
+
+def test_make_moves_is_all_or_nothing():
+    """Test that an illegal move in the sequence leaves the board as it was"""
+    b = Board()
+    good = Move.from_tuple((1, 0, 2, 2)).packed
+    bad = Move.from_tuple((1, 0, 2, 2)).packed
+    with pytest.raises(IllegalMove):
+        b.make_moves([good, bad])
+    assert b.fen() == Board().fen()
+    with pytest.raises(IndexError):
+        b.pop()
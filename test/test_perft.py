@@ -0,0 +1,68 @@
+import pytest
+from libxiangqi import Board
+
+# Published xiangqi perft results
+START_POSITION = [(1, 44), (2, 1920), (3, 79666), (4, 3290240)]
+MIDDLEGAME = [
+    ("r1ba1a3/4kn3/2n1b4/pNp1p1p1p/4c4/6P2/P1P2R2P/1CcC5/9/2BAKAB2 w - - 0 1", [38, 1128, 43929, 1339047]),
+    ("1cbak4/9/n2a5/2p1p3p/5cp2/2n2N3/6PCP/3AB4/2C6/3A1K1N1 w - - 0 1", [7, 281, 8620, 326201]),
+    ("5a3/3k5/3aR4/9/5r3/5n3/9/3A1A3/5K3/2BC2B2 w - - 0 1", [25, 424, 9850, 202884]),
+    ("C1nNk4/9/9/9/9/9/n1pp5/B3C4/9/3A1K3 w - - 0 1", [28, 222, 6241, 64971]),
+]
+
+
+@pytest.mark.parametrize("backend", ["mailbox", "bitboard"])
+@pytest.mark.parametrize("depth,nodes", START_POSITION)
+def test_perft_start_position(backend, depth, nodes):
+    """Test perft node counts from the start position"""
+    assert Board(backend=backend).perft(depth) == nodes
+
+
+@pytest.mark.parametrize("backend", ["mailbox", "bitboard"])
+@pytest.mark.parametrize("fen,counts", MIDDLEGAME)
+def test_perft_middlegame(backend, fen, counts):
+    """Test perft node counts from middlegame positions"""
+    g = Board.from_fen(fen, backend=backend)
+    assert [g.perft(depth) for depth in range(1, len(counts) + 1)] == counts
+
+
+def test_perft_depth_zero():
+    """Test that perft(0) counts the position itself"""
+    assert Board().perft(0) == 1
+
+
+def test_perft_divide_sums_to_perft():
+    """Test that the divide counts add up to perft and cover every root move"""
+    g = Board()
+    divide = g.perft_divide(3)
+    assert sum(count for _, count in divide) == g.perft(3)
+    assert sorted(move for move, _ in divide) == sorted(g.get_legal_moves())
+
+
+def test_perft_leaves_board_unchanged():
+    """Test that perft restores the position it started from"""
+    g = Board()
+    g.make_move(1, 0, 2, 2)
+    before = g.zobrist_hash
+    g.perft(3)
+    assert g.zobrist_hash == before
+    assert g.pop() == (1, 0, 2, 2)
+
+
+@pytest.mark.parametrize("threads", [0, 2, 5])
+def test_parallel_perft_matches_serial(threads):
+    """Test that splitting perft across threads gives the same counts"""
+    g = Board()
+    g.make_move(7, 2, 4, 2)
+    assert g.perft(3, threads=threads) == g.perft(3)
+    assert sorted(g.perft_divide(3, threads=threads)) == sorted(g.perft_divide(3))
+
+
+def test_perft_from_python_threads():
+    """Test that perft can run from several Python threads at once on one board"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    g = Board()
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: g.perft(3), range(8)))
+    assert results == [START_POSITION[2][1]] * 8
@@ -0,0 +1,83 @@
+from libxiangqi import Board, read_games
+
+WXF_GAME = """[Event "Test"]
+[Result "1-0"]
+
+1. C2.5 H8+7 2. H2+3 {a comment
+
+over two lines} R9.8 (2... H2+3 3. R1.2) 3. R1.2 H2+3 $1 4. R2+6!? 1-0
+"""
+
+ICCS_MOVES = [(7, 2, 4, 2), (7, 9, 6, 7), (7, 0, 6, 2), (8, 9, 7, 9), (8, 0, 7, 0), (1, 9, 2, 7), (7, 0, 7, 6)]
+
+
+def write(tmp_path, text):
+    path = tmp_path / "games.pgn"
+    path.write_text(text)
+    return path
+
+
+def test_wxf_game(tmp_path):
+    """Test that a WXF game is replayed past comments, variations and annotations"""
+    (game,) = read_games(write(tmp_path, WXF_GAME))
+    assert game.headers == {"Event": "Test", "Result": "1-0"}
+    assert game.moves == ICCS_MOVES
+    assert game.result == "1-0"
+    assert game.error is None
+    assert game.positions is None
+
+
+def test_iccs_games(tmp_path):
+    """Test that ICCS games are read one after another, with or without headers"""
+    text = '[Event "One"]\n1. h2e2 h9g7 2. H0-G2 *\n\nh2e2 h9g7\n\n[Event "Three"]\n\nh2e2 0-1\n'
+    games = list(read_games(write(tmp_path, text)))
+    assert [len(game.moves) for game in games] == [3, 2, 1]
+    assert [game.result for game in games] == [None, None, "0-1"]
+    assert games[2].headers == {"Event": "Three"}
+
+
+def test_stray_brackets_are_skipped(tmp_path):
+    """Test that an unmatched } or ) in movetext is skipped rather than stalling the reader"""
+    (game,) = read_games(write(tmp_path, "1. h2e2 } h9g7 ) 2. h0g2 *\n"))
+    assert len(game.moves) == 3
+    assert game.error is None
+
+
+def test_positions(tmp_path):
+    """Test that the positions reached are the ones the moves lead to"""
+    (game,) = read_games(write(tmp_path, WXF_GAME), positions=True)
+    b = Board()
+    assert len(game.positions) == len(ICCS_MOVES) + 1
+    for move, position in zip(ICCS_MOVES, game.positions):
+        assert position == b
+        b.push(move)
+    assert game.positions[-1] == b
+
+
+def test_fen_and_tandem_pieces(tmp_path):
+    """Test that a game starts from its FEN header and that front and rear pieces on a file are told apart"""
+    fen = "3k5/9/9/9/9/9/9/R8/R8/4K4 w - - 0 1"
+    text = f'[FEN "{fen}"]\n\n1. +R.2 K4+1 2. R9.2\n\n[FEN "{fen}"]\n\n1. R9.2\n\n[FEN "{fen}"]\n\n1. +R.2 K4+1 2. -R.2\n'
+    good, ambiguous, apart = read_games(write(tmp_path, text))
+    assert good.moves == [(0, 2, 7, 2), (3, 9, 3, 8), (0, 1, 7, 1)]
+    assert ambiguous.moves == []
+    assert "ambiguous" in ambiguous.error
+    # The chariots no longer share a file, so neither is a front or rear one
+    assert apart.moves == good.moves[:2]
+    assert apart.error.startswith("ply 3")
+
+
+def test_illegal_move_stops_replay(tmp_path):
+    """Test that a game stops at its first illegal move and keeps the moves before it"""
+    (game,) = read_games(write(tmp_path, "1. C2.5 C3.5 2. R1+1\n"), positions=True)
+    assert game.moves == [(7, 2, 4, 2)]
+    assert game.error.startswith("ply 2")
+    assert len(game.positions) == 2
+
+
+def test_reads_lazily(tmp_path):
+    """Test that games are yielded one at a time"""
+    games = read_games(write(tmp_path, "h2e2 1-0\nh2e2 h9g7 0-1\n"))
+    assert next(games).moves == [(7, 2, 4, 2)]
+    assert next(games).result == "0-1"
+    assert next(games, None) is None
@@ -0,0 +1,62 @@
+import array
+
+import pytest
+
+from libxiangqi import Board, encode_boards
+
+CANNON = (7, 2, 4, 2)
+
+
+def test_start_position_planes():
+    """Test that each piece is set on the plane of its type and color, and the last plane marks red to move"""
+    planes = Board().planes()
+    assert planes.shape == (15, 10, 9)
+    assert planes.format == "B"
+    assert planes.readonly
+    assert planes[0, 0, 4] == 1  # red general
+    assert planes[4, 0, 0] == planes[4, 0, 8] == 1  # red chariots
+    assert planes[7, 9, 4] == 1  # black general
+    assert [planes[13, 6, f] for f in range(9)] == [1, 0, 1, 0, 1, 0, 1, 0, 1]
+    assert sum(planes.tobytes()[: 14 * 90]) == 32
+    assert set(planes.tobytes()[14 * 90 :]) == {1}
+
+
+def test_planes_after_move():
+    """Test that the planes follow a move and the side to move"""
+    b = Board()
+    b.push(CANNON)
+    planes = b.planes("float32")
+    assert planes.format == "f"
+    assert planes[5, 2, 4] == pytest.approx(1.0)
+    assert planes[5, 2, 7] == pytest.approx(0.0)
+    assert all(planes[14, r, f] == pytest.approx(0.0) for r in range(10) for f in range(9))
+
+
+def test_unknown_dtype():
+    """Test that an unsupported dtype is rejected"""
+    with pytest.raises(ValueError):
+        Board().planes("int64")
+
+
+def test_encode_boards():
+    """Test that a batch of boards is written into a preallocated buffer, matching the planes of each board"""
+    boards = [Board(), Board()]
+    boards[1].push(CANNON)
+    out = array.array("f", [7.0]) * (2 * 15 * 90)
+    assert encode_boards(boards, out) is out
+    for i, b in enumerate(boards):
+        assert out[i * 15 * 90 : (i + 1) * 15 * 90] == array.array("f", b.planes("float32").tobytes())
+
+    out = bytearray(2 * 15 * 90)
+    encode_boards(boards, out)
+    assert out[15 * 90 :] == boards[1].planes().tobytes()
+
+
+def test_encode_boards_checks_out():
+    """Test that a buffer of the wrong size, type or writability is rejected"""
+    with pytest.raises(ValueError):
+        encode_boards([Board()], bytearray(15 * 90 - 1))
+    with pytest.raises(ValueError):
+        encode_boards([Board()], bytes(15 * 90))
+    with pytest.raises(TypeError):
+        encode_boards([Board()], array.array("q", [0]) * (15 * 90))
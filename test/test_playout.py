@@ -0,0 +1,48 @@
+import array
+
+import pytest
+
+from libxiangqi import Board, simulate_games
+
+# Black to move and checkmated
+MATED = "1R2k4/R8/9/9/9/9/9/9/9/3K5 b - - 0 1"
+
+
+def test_statistics():
+    """Test that every game is counted once, with the plies played"""
+    result = simulate_games(50, max_plies=100, threads=2)
+    assert result.games == 50
+    assert result.red_wins + result.black_wins + result.draws == 50
+    assert 0 < result.plies <= 50 * 100
+    assert result.moves is None and result.results is None
+
+
+def test_same_games_on_any_number_of_threads():
+    """Test that the seed decides the games, not the number of threads"""
+    one = simulate_games(40, policy="capture_first", threads=1, seed=3, record=True)
+    three = simulate_games(40, policy="capture_first", threads=3, seed=3, record=True)
+    assert one.moves == three.moves
+    assert one.results == three.results
+    assert simulate_games(40, seed=4, record=True).moves != simulate_games(40, seed=5, record=True).moves
+
+
+def test_recorded_moves_replay():
+    """Test that the recorded moves are legal and lead to the recorded result"""
+    result = simulate_games(5, max_plies=300, record=True)
+    for moves, outcome in zip(result.moves, result.results):
+        b = Board()
+        for packed in array.array("H", moves):
+            b.push((packed % 128 % 9, packed % 128 // 9, (packed >> 7) % 9, (packed >> 7) // 9))
+        if outcome == "1/2-1/2":
+            assert len(moves) == 2 * 300
+        else:
+            assert not b.has_legal_move()
+            assert b.turn == (outcome == "0-1")
+
+
+def test_from_fen():
+    """Test that games start from the given position"""
+    result = simulate_games(20, fen=MATED)
+    assert (result.red_wins, result.plies) == (20, 0)
+    with pytest.raises(ValueError):
+        simulate_games(1, policy="minimax")
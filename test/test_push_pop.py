@@ -0,0 +1,61 @@
+import pytest
+from libxiangqi import Board, IllegalMove
+
+
+def test_pop_restores_position():
+    """Test that pop takes back a pushed move"""
+    g = Board()
+    g.push((1, 0, 2, 2))
+    assert g.pop() == (1, 0, 2, 2)
+    assert g == Board()
+    assert g.turn is True
+
+
+def test_pop_restores_capture():
+    """Test that pop puts a captured piece back"""
+    g = Board()
+    g.push((1, 2, 1, 9))
+    assert g.get_piece(1, 9) is not None
+    g.pop()
+    assert g == Board()
+    assert repr(g) == repr(Board())
+
+
+def test_pop_takes_back_make_move():
+    """Test that moves played with make_move can be popped too"""
+    g = Board()
+    g.make_move(4, 3, 4, 4)
+    g.make_move(4, 6, 4, 5)
+    assert g.pop() == (4, 6, 4, 5)
+    assert g.pop() == (4, 3, 4, 4)
+    assert g == Board()
+
+
+def test_pop_empty_stack():
+    """Test that popping with no moves played raises IndexError"""
+    g = Board()
+    with pytest.raises(IndexError):
+        g.pop()
+
+
+def test_push_illegal_move():
+    """Test that push validates the move and leaves the stack untouched"""
+    g = Board()
+    with pytest.raises(IllegalMove):
+        g.push((0, 0, 0, 5))
+    with pytest.raises(IndexError):
+        g.pop()
+
+
+def test_walk_tree_and_back():
+    """Test walking every two-ply line from the start returns to the start"""
+    g = Board()
+    start_moves = sorted(g.get_legal_moves())
+    for move in start_moves:
+        g.push(move)
+        for reply in g.get_legal_moves():
+            g.push(reply)
+            g.pop()
+        g.pop()
+    assert g == Board()
+    assert sorted(g.get_legal_moves()) == start_moves
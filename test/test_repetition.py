@@ -0,0 +1,78 @@
+import pytest
+
+from libxiangqi import Board
+
+HORSE_SHUFFLE = [(1, 0, 2, 2), (1, 9, 2, 7), (2, 2, 1, 0), (2, 7, 1, 9)]
+
+# The red chariot checks on rank 9, then on rank 8, as the black general steps between them
+PERPETUAL_CHECK = "4k4/R8/9/9/9/9/9/9/9/3K5 w - - 0 1"
+CHECKS = [(0, 8, 0, 9), (4, 9, 4, 8), (0, 9, 0, 8), (4, 8, 4, 9)]
+
+# The red chariot follows the unprotected black cannon from rank to rank
+PERPETUAL_CHASE = "4k4/9/9/8c/R8/9/9/9/9/3K5 w - - 0 1"
+# Same, with the cannon protected by the black chariot
+PROTECTED = "4k3r/9/9/8c/R8/9/9/9/9/3K5 w - - 0 1"
+CHASES = [(0, 5, 0, 6), (8, 6, 8, 5), (0, 6, 0, 5), (8, 5, 8, 6)]
+
+
+def play(board, moves, times):
+    for _ in range(times):
+        for move in moves:
+            board.push(move)
+
+
+def test_repetition_count():
+    """Test that is_repetition counts the occurrences of the position"""
+    b = Board()
+    assert not b.is_repetition(2)
+    play(b, HORSE_SHUFFLE, 1)
+    assert b.is_repetition(2)
+    assert not b.is_repetition()
+    play(b, HORSE_SHUFFLE, 1)
+    assert b.is_repetition()
+    b.pop()
+    assert not b.is_repetition(2)
+
+
+def test_no_adjudication_before_repetition():
+    """Test that nothing is adjudicated until the position has occurred count times"""
+    b = Board.from_fen(PERPETUAL_CHECK)
+    play(b, CHECKS, 1)
+    assert b.adjudicate_repetition() is None
+    assert b.adjudicate_repetition(2) == "0-1"
+
+
+def test_plain_repetition_is_a_draw():
+    """Test that a repetition without checks or chases is drawn"""
+    b = Board()
+    play(b, HORSE_SHUFFLE, 2)
+    assert b.adjudicate_repetition() == "1/2-1/2"
+
+
+@pytest.mark.parametrize("rules", ["asian", "check"])
+def test_perpetual_check_loses(rules):
+    """Test that the side giving perpetual check loses"""
+    b = Board.from_fen(PERPETUAL_CHECK)
+    play(b, CHECKS, 2)
+    assert b.adjudicate_repetition(rules=rules) == "0-1"
+
+
+def test_perpetual_chase():
+    """Test that perpetually chasing an unprotected piece loses only under the asian rules"""
+    b = Board.from_fen(PERPETUAL_CHASE)
+    play(b, CHASES, 2)
+    assert b.adjudicate_repetition() == "0-1"
+    assert b.adjudicate_repetition(rules="check") == "1/2-1/2"
+
+
+def test_attacking_a_protected_piece_is_not_a_chase():
+    """Test that attacking a piece that can be recaptured doesn't count as a chase"""
+    b = Board.from_fen(PROTECTED)
+    play(b, CHASES, 2)
+    assert b.adjudicate_repetition() == "1/2-1/2"
+
+
+def test_unknown_rules():
+    """Test that unknown rules are rejected"""
+    with pytest.raises(ValueError):
+        Board().adjudicate_repetition(rules="fide")
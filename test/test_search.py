@@ -0,0 +1,98 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from libxiangqi import MATE_SCORE, Board
+
+
+def test_search_returns_legal_move_and_pv():
+    """Test that the best move and the principal variation can be played out"""
+    g = Board()
+    result = g.search(depth=3)
+    assert result.depth == 3
+    assert result.best_move in g.get_legal_moves()
+    assert result.pv[0] == result.best_move
+    for move in result.pv:
+        g.push(move)
+
+
+@pytest.mark.parametrize("backend", ["mailbox", "bitboard"])
+def test_search_wins_hanging_chariot(backend):
+    """Test that the search takes a free chariot"""
+    g = Board.from_fen("3k5/9/9/9/9/9/9/9/r8/R3K4 w - - 0 1", backend=backend)
+    result = g.search(depth=3)
+    assert result.best_move == (0, 0, 0, 1)
+    assert result.score > 0
+
+
+def test_search_avoids_defended_soldier():
+    """Test that quiescence search sees the recapture behind a capture at the horizon"""
+    g = Board.from_fen("r3k4/4a4/9/9/p8/9/9/9/9/R3K4 w - - 0 1")
+    result = g.search(depth=1)
+    assert result.best_move != (0, 0, 0, 5)
+
+
+def test_search_finds_mate_in_one():
+    """Test that a move leaving the opponent without a legal move scores as mate"""
+    g = Board.from_fen("3k5/8R/9/9/9/9/9/9/9/R3K4 w - - 0 1")
+    result = g.search(depth=4)
+    assert result.score == MATE_SCORE - 1
+    g.push(result.best_move)
+    assert not g.has_legal_move()
+
+
+def test_search_mated_side_has_no_move():
+    """Test searching a position where the side to move has already lost"""
+    g = Board.from_fen("R2k5/8R/9/9/9/9/9/9/9/4K4 b - - 0 1")
+    assert g.is_checkmate()
+    result = g.search(depth=2)
+    assert result.best_move is None
+    assert result.pv == []
+    assert result.score == -MATE_SCORE
+
+
+def test_search_node_limit():
+    """Test that the node budget stops the search"""
+    result = Board().search(nodes=5000)
+    assert result.nodes <= 5000
+    assert result.best_move is not None
+
+
+def test_search_movetime_limit():
+    """Test that the time budget stops the search"""
+    start = time.perf_counter()
+    result = Board().search(movetime_ms=200)
+    assert time.perf_counter() - start < 2
+    assert result.best_move is not None
+
+
+def test_search_needs_a_limit():
+    """Test that an unbounded search is rejected"""
+    with pytest.raises(ValueError):
+        Board().search()
+
+
+def test_search_from_python_threads():
+    """Test that searches run side by side from several Python threads"""
+    g = Board()
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: g.search(depth=3, hash_mb=1), range(4)))
+    assert len({(r.best_move, r.score) for r in results}) == 1
+
+
+@pytest.mark.parametrize("threads", [2, 4])
+def test_threaded_search(threads):
+    """Test that a Lazy SMP search reaches the depth and returns a playable line"""
+    g = Board()
+    result = g.search(depth=4, threads=threads)
+    assert result.depth == 4
+    assert result.best_move in g.get_legal_moves()
+    for move in result.pv:
+        g.push(move)
+
+
+def test_threaded_search_finds_mate():
+    """Test that helper threads don't disturb the main thread's result"""
+    g = Board.from_fen("3k5/8R/9/9/9/9/9/9/9/R3K4 w - - 0 1")
+    result = g.search(depth=4, threads=3)
+    assert result.score == MATE_SCORE - 1
@@ -0,0 +1,44 @@
+import pytest
+
+from libxiangqi import Board, IllegalMove
+
+
+def test_hanging_piece():
+    """Test that taking an undefended horse wins the horse"""
+    g = Board.from_fen("3k5/9/9/9/n8/9/9/9/9/R3K4 w - - 0 1")
+    assert g.see((0, 0, 0, 5)) == 400
+
+
+def test_defended_exchange():
+    """Test that taking a defended soldier with a chariot loses the chariot for the soldier"""
+    g = Board.from_fen("r2k5/9/9/9/p8/9/9/9/9/R3K4 w - - 0 1")
+    assert g.see((0, 0, 0, 5)) == 100 - 900
+
+
+def test_quiet_move():
+    """Test that a safe quiet move scores zero"""
+    assert Board().see((7, 2, 4, 2)) == 0
+
+
+def test_cannon_loses_its_screen():
+    """Test that a cannon can't recapture once the chariot in front of it has left the file"""
+    g = Board.from_fen("r2k5/9/n8/9/9/9/R8/9/9/C3K4 w - - 0 1")
+    assert g.see((0, 3, 0, 7)) == 400 - 900
+
+
+def test_cannon_gains_a_screen():
+    """Test that a cannon blocked by two pieces recaptures once one of them has moved"""
+    g = Board.from_fen("r2k5/9/n8/9/9/9/R8/N8/9/C3K4 w - - 0 1")
+    assert g.see((0, 3, 0, 7)) == 400
+
+
+def test_cannon_capture():
+    """Test that a cannon capture over a screen is exchanged like any other capture"""
+    g = Board.from_fen("r2k5/9/n8/9/9/9/P8/9/9/C3K4 w - - 0 1")
+    assert g.see((0, 0, 0, 7)) == 400 - 450
+
+
+def test_not_a_move():
+    """Test that a move the piece can't make is rejected"""
+    with pytest.raises(IllegalMove):
+        Board().see((0, 0, 0, 5))
@@ -0,0 +1,76 @@
+import pytest
+
+from libxiangqi import Board, Tablebase, generate_tablebase
+
+
+@pytest.fixture(scope="module")
+def tablebase(tmp_path_factory):
+    path = tmp_path_factory.mktemp("tablebases")
+    generate_tablebase("KRK", path)
+    generate_tablebase("KCKA", path)
+    return Tablebase(path)
+
+
+def test_generates_smaller_tables(tmp_path):
+    """Test that the tables reached by captures are written too, and reused afterwards"""
+    assert sorted(generate_tablebase("KRKA", tmp_path, threads=2)) == ["KAK", "KK", "KRK", "KRKA"]
+    assert generate_tablebase("KRKA", tmp_path) == ["KRKA"]
+    assert sorted(Tablebase(tmp_path).materials) == ["KAK", "KK", "KRK", "KRKA"]
+
+
+def test_rejects_bad_material(tmp_path):
+    """Test that malformed or oversized materials are rejected"""
+    for material in ["RK", "KXK", "KRRRK", "KRNCKA"]:
+        with pytest.raises(ValueError):
+            generate_tablebase(material, tmp_path)
+
+
+def test_chariot_wins(tablebase):
+    """Test that a lone chariot beats a bare general"""
+    g = Board.from_fen("4k4/9/9/9/9/9/9/9/9/R2K5 w - - 0 1")
+    assert tablebase.probe_wdl(g) == 1
+    assert tablebase.probe_dtm(g) == 3
+
+
+def test_mate_distance_follows_best_play(tablebase):
+    """Test that the best move shortens the mate by one ply and the loser's best reply keeps it"""
+    g = Board.from_fen("9/4k4/9/9/9/9/9/9/4R4/3K5 b - - 0 1")
+    dtm = tablebase.probe_dtm(g)
+    assert dtm == -4
+    while dtm != 0:
+        children = []
+        for move in g.get_legal_moves():
+            g.push(move)
+            children.append((tablebase.probe_dtm(g), move))
+            g.pop()
+        if dtm > 0:
+            best = min((d, m) for d, m in children if d < 0 and d == 1 - dtm)
+        else:
+            best = max(children)
+            assert best[0] == -1 - dtm
+        g.push(best[1])
+        dtm = tablebase.probe_dtm(g)
+    assert g.is_checkmate() or g.is_stalemate()
+
+
+def test_colour_and_mirror_symmetry(tablebase):
+    """Test that a position, its mirror image and its colour-flipped twin probe the same"""
+    red = Board.from_fen("3k5/9/9/9/9/9/9/9/9/R3K4 w - - 0 1")
+    mirrored = Board.from_fen("5k3/9/9/9/9/9/9/9/9/4K3R w - - 0 1")
+    black = Board.from_fen("4k3r/9/9/9/9/9/9/9/9/5K3 b - - 0 1")
+    assert tablebase.probe_dtm(red) == tablebase.probe_dtm(mirrored) == tablebase.probe_dtm(black)
+
+
+def test_cannon_cannot_mate_alone(tablebase):
+    """Test that a cannon against a general and an advisor is a draw"""
+    g = Board.from_fen("4k4/4a4/9/9/9/9/9/9/9/C3K4 w - - 0 1")
+    assert tablebase.probe_wdl(g) == 0
+    assert tablebase.probe_dtm(g) == 0
+
+
+def test_uncovered_positions(tablebase):
+    """Test that positions without a table, or that can't arise, are not probed"""
+    assert tablebase.probe_wdl(Board()) is None
+    assert tablebase.probe_wdl(Board.from_fen("3k5/9/9/9/9/9/9/9/9/N3K4 w - - 0 1")) is None
+    # Black is in check with red to move
+    assert tablebase.probe_wdl(Board.from_fen("3k5/9/9/9/9/9/9/9/9/3RK4 w - - 0 1")) is None
@@ -0,0 +1,71 @@
+import array
+
+import pytest
+
+from libxiangqi import NUM_ACTIONS, Board, IllegalMove, VecBoard, move_to_action
+
+# Bytes of the uint8 planes of one game
+PLANES_BYTES = 15 * 10 * 9
+
+CANNON = (7, 2, 4, 2)
+# Red to move, the chariot on b1 mates on b9
+MATE_IN_ONE = "4k4/R8/9/9/9/9/9/9/1R7/3K5 w - - 0 1"
+
+
+def test_step_plays_every_game():
+    """Test that a step plays one move in each game and returns the new observations"""
+    env = VecBoard(3)
+    assert len(env) == 3
+    observations, rewards, dones = env.step([move_to_action(CANNON)] * 3)
+    assert observations.shape == (3, 15, 10, 9)
+    assert rewards.tolist() == [0.0, 0.0, 0.0]
+    assert dones.tolist() == [False, False, False]
+    after = Board()
+    after.push(CANNON)
+    assert env.board(2) == after
+    assert observations.tobytes()[PLANES_BYTES : 2 * PLANES_BYTES] == after.planes().tobytes()
+
+
+def test_win_resets_game():
+    """Test that a winning move is rewarded and its game starts over"""
+    env = VecBoard(2, fen=MATE_IN_ONE, dtype="float32")
+    mate = move_to_action((1, 1, 1, 9))
+    quiet = move_to_action((1, 1, 2, 1))
+    observations, rewards, dones = env.step(array.array("q", [mate, quiet]))
+    assert rewards.tolist() == [1.0, 0.0]
+    assert dones.tolist() == [True, False]
+    assert env.board(0) == Board.from_fen(MATE_IN_ONE)
+    assert observations.tobytes()[: 4 * PLANES_BYTES] == Board.from_fen(MATE_IN_ONE).planes("float32").tobytes()
+
+
+def test_ply_limit():
+    """Test that a game reaching the ply limit ends without a reward"""
+    env = VecBoard(1, max_plies=2)
+    env.step([move_to_action(CANNON)])
+    _, rewards, dones = env.step([move_to_action((7, 9, 6, 7))])
+    assert rewards.tolist() == [0.0]
+    assert dones.tolist() == [True]
+    assert env.board(0) == Board()
+
+
+def test_illegal_action_plays_nothing():
+    """Test that an illegal action in one game rejects the whole step"""
+    env = VecBoard(2)
+    with pytest.raises(IllegalMove):
+        env.step([move_to_action(CANNON), move_to_action((0, 0, 0, 5))])
+    assert env.board(0) == Board()
+
+
+def test_wrong_number_of_actions():
+    """Test that a step needs exactly one action per game"""
+    env = VecBoard(2)
+    with pytest.raises(ValueError):
+        env.step([move_to_action(CANNON)])
+
+
+def test_legal_move_masks():
+    """Test that the masks of every game are returned in one array"""
+    env = VecBoard(2)
+    masks = env.legal_move_masks()
+    assert masks.shape == (2, NUM_ACTIONS)
+    assert masks.tobytes()[NUM_ACTIONS:] == Board().legal_move_mask()
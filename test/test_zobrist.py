@@ -0,0 +1,56 @@
+from libxiangqi import Board
+
+
+def test_initial_positions_are_equal():
+    """Test that two fresh boards hash and compare equal"""
+    a, b = Board(), Board()
+    assert a.zobrist_hash == b.zobrist_hash
+    assert a == b
+    assert len({a, b}) == 1
+
+
+def test_move_changes_hash():
+    """Test that making a move changes the hash"""
+    g = Board()
+    before = g.zobrist_hash
+    g.make_move(1, 0, 2, 2)
+    assert g.zobrist_hash != before
+    assert g != Board()
+
+
+def test_transposition_has_same_hash():
+    """Test that reaching a position by different move orders gives the same hash"""
+    a = Board()
+    a.make_move(1, 0, 2, 2)
+    a.make_move(1, 9, 2, 7)
+    a.make_move(7, 0, 6, 2)
+
+    b = Board()
+    b.make_move(7, 0, 6, 2)
+    b.make_move(1, 9, 2, 7)
+    b.make_move(1, 0, 2, 2)
+
+    assert a.zobrist_hash == b.zobrist_hash
+    assert a == b
+
+
+def test_side_to_move_is_hashed():
+    """Test that the same placement with a different side to move hashes differently"""
+    g = Board()
+    g.make_move(1, 0, 2, 2)
+    g.make_move(1, 9, 2, 7)
+    g.make_move(2, 2, 1, 0)
+    assert g.zobrist_hash != Board().zobrist_hash
+
+    g.make_move(2, 7, 1, 9)
+    assert g.zobrist_hash == Board().zobrist_hash
+    assert g == Board()
+
+
+def test_capture_updates_hash():
+    """Test that captures are reflected in the hash"""
+    a = Board()
+    a.make_move(1, 2, 1, 9)
+    b = Board()
+    b.make_move(7, 2, 7, 9)
+    assert a.zobrist_hash != b.zobrist_hash